@@ -0,0 +1,136 @@
+import argparse
+import bz2
+import hashlib
+import json
+import multiprocessing
+import os
+import random
+import subprocess
+import tempfile
+import time
+
+import WikimediaDumpDownloader as wdd
+
+#words of generated pages, so that data compresses about as well as wiki dumps
+WORDS = ["chat", "chien", "maison", "arbre", "soleil", "lune", "pain", "eau", "feu", "terre", "{{S|nom|fr}}", "{{pron|ʃa|fr}}", "[[lien]]", "'''mot'''", "==", "\n"]
+
+"""generates a stream of a synthetic multistream dump : xml pages compressed as a bz2 stream of their own
+
+Args:
+seed_size (tuple(int, int)): seed of generator and size of uncompressed stream
+
+Returns:
+bytes : compressed stream
+"""
+def generate_stream(seed_size):
+    seed, size = seed_size
+    rnd = random.Random(seed)
+    pages = []
+    length = 0
+    while length < size:
+        page = "  <page>\n    <title>" + rnd.choice(WORDS) + str(seed) + "</title>\n    <text>" + " ".join(rnd.choice(WORDS) for i in range(200)) + "</text>\n  </page>\n"
+        pages.append(page)
+        length += len(page)
+    return bz2.compress("".join(pages).encode("utf-8"))
+
+"""generates a synthetic multistream bz2 dump, as wikimedia's *-multistream.xml.bz2 (streams are generated by a pool of processes)
+
+Args:
+path_to_dump (str): path of generated dump
+size_mb (int): size of uncompressed dump in MB
+stream_kb (int): size of uncompressed streams in KB
+
+Returns:
+None
+"""
+def generate_dump(path_to_dump, size_mb, stream_kb):
+    streams = (size_mb * 1024) // stream_kb
+    with multiprocessing.Pool() as pool, open(path_to_dump, "wb") as dump:
+        for stream in pool.imap(generate_stream, [(seed, stream_kb * 1024) for seed in range(streams)]):
+            dump.write(stream)
+
+#hexadecimal sha1 of file at path
+def file_sha1(path):
+    hasher = hashlib.sha1()
+    with open(path, "rb") as fp:
+        chunk = fp.read(16*1024*1024)
+        while chunk:
+            hasher.update(chunk)
+            chunk = fp.read(16*1024*1024)
+    return hasher.hexdigest()
+
+"""runs funct repeat times, returning its best time
+
+Args:
+funct (funct): function () -> None
+repeat (int): number of runs
+
+Returns:
+float : seconds of fastest run
+"""
+def best_time(funct, repeat):
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        funct()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best == None else min(best, elapsed)
+    return best
+
+"""decompresses dump with bzip2 subprocess (as download_dump did) then in process with each number of workers, checking that outputs are the same
+
+Args:
+path_to_dump (str): path of multistream bz2 dump
+workers_list (list(int)): numbers of worker processes of decompress_bz2 to benchmark
+repeat (int): number of runs of each stage, best one is reported
+
+Returns:
+dict : seconds, MB/sec (of decompressed data) and speedup against bzip2 of each stage
+"""
+def run_benchmark(path_to_dump, workers_list, repeat=1):
+    report = {"dump": path_to_dump, "compressed_mb": round(os.path.getsize(path_to_dump) / 1024**2, 1), "cores": os.cpu_count(), "stages": {}}
+    path_to_output = path_to_dump + ".out"
+
+    def run_bzip2():
+        with open(path_to_output, "wb") as output:
+            subprocess.run(["bzip2", "-d", "-c", path_to_dump], stdout=output, check=True)
+    seconds = best_time(run_bzip2, repeat)
+    reference_sha1 = file_sha1(path_to_output)
+    size_mb = os.path.getsize(path_to_output) / 1024**2
+    report["decompressed_mb"] = round(size_mb, 1)
+    report["stages"]["bzip2"] = {"seconds": round(seconds, 3), "mb_per_sec": round(size_mb / seconds, 1)}
+
+    for workers in workers_list:
+        seconds_workers = best_time(lambda: wdd.decompress_bz2(path_to_dump, path_to_output, workers, keep=True), repeat)
+        report["stages"]["decompress_bz2 (" + str(workers) + " workers)"] = {"seconds": round(seconds_workers, 3), "mb_per_sec": round(size_mb / seconds_workers, 1), "speedup": round(seconds / seconds_workers, 2), "same_output": file_sha1(path_to_output) == reference_sha1}
+    os.remove(path_to_output)
+    return report
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark of in process decompression of multistream bz2 dumps against bzip2')
+    parser.add_argument("-p", "--path", help="Path for multistream bz2 dump to benchmark on (a synthetic dump is generated there if missing, or in a temporary file if not given).", default=None)
+    parser.add_argument("-m", "--size", help="Size in MB of uncompressed generated dump (default 200)", type=int, default=200)
+    parser.add_argument("-s", "--stream", help="Size in KB of uncompressed streams of generated dump (default 1000, about 100 pages as in wikimedia's multistream dumps)", type=int, default=1000)
+    parser.add_argument("-w", "--workers", help="Numbers of worker processes to benchmark, separated by commas (default '1,<number of cores>')", default=None)
+    parser.add_argument("-r", "--repeat", help="Number of runs of each stage, best one is reported (default 1)", type=int, default=1)
+    parser.add_argument("-o", "--out", help="Path for json report (printed on terminal by default).", default=None)
+    args = parser.parse_args()
+
+    path_to_dump = args.path
+    if not path_to_dump:
+        path_to_dump = tempfile.mkstemp(suffix="-multistream.xml.bz2")[1]
+        os.remove(path_to_dump)
+    if not os.path.exists(path_to_dump):
+        generate_dump(path_to_dump, args.size, args.stream)
+
+    workers_list = [int(workers) for workers in args.workers.split(",")] if args.workers else sorted(set([1, os.cpu_count()]))
+    report = run_benchmark(path_to_dump, workers_list, args.repeat)
+    if not args.path:
+        os.remove(path_to_dump)
+
+    if args.out:
+        with open(args.out, "w") as fp:
+            json.dump(report, fp, indent=4)
+    else:
+        print(json.dumps(report, indent=4))
@@ -1,7 +1,231 @@
 import argparse
+import bz2
+import collections
+import concurrent.futures
+import datetime
+import hashlib
+import html
+import http.client
+import json
+import math
+import multiprocessing
 import os
+import queue
 import re
-import subprocess
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import zlib
+
+#user agent of requests streaming dumps (wikimedia asks for a descriptive one), WikiPageParser.py ("../2- Transperfect") sending its own as _USER_AGENT
+USER_AGENT = "WikimediaDumpDownloader (https://github.com/sheldu45/Samples)"
+
+#writes content (str or bytes) at path through a temporary file unique to the writer, so that concurrent downloads never read nor replace a partial file
+def _write_atomically(path, content):
+    fd, path_to_tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path)+".", suffix=".tmp")
+    with os.fdopen(fd, "wb" if isinstance(content, bytes) else "w") as fp:
+        fp.write(content)
+    os.replace(path_to_tmp, path)
+
+#magic bytes starting each bz2 stream, followed by a block size digit and the magic of the first block (or of the end of an empty stream)
+#_BZ2_STREAM_MAGIC, _rfind_bz2_stream and _decompress_streams are the same as in WikiPageParser.py ("../2- Transperfect"), which reads multistream dumps by the same batches of streams : both scripts are run on their own from their folder, so each one keeps its copy, to be changed along with the other one
+_BZ2_STREAM_MAGIC = b"BZh"
+_BZ2_BLOCK_MAGICS = (b"1AY&SY", b"\x17\x72\x45\x38\x50\x90")
+
+#returns the offset of the last bz2 stream header found in data after start, or -1 if there is none
+def _rfind_bz2_stream(data, start=0):
+    offset = data.rfind(_BZ2_STREAM_MAGIC, start)
+    while offset != -1:
+        if data[offset+3:offset+4].isdigit() and data[offset+4:offset+10] in _BZ2_BLOCK_MAGICS:
+            return offset
+        offset = data.rfind(_BZ2_STREAM_MAGIC, start, offset)
+    return -1
+
+#decompresses data of a file made of one or many bz2 streams (the remainder of a file whose streams could not be split), a chunk after the other
+def _decompress_sequentially(data, raw, batch_size):
+    decompressor = bz2.BZ2Decompressor()
+    while data:
+        yield decompressor.decompress(data)
+        #next stream, if the file goes on
+        if decompressor.eof:
+            data = decompressor.unused_data or raw.read(batch_size)
+            decompressor = bz2.BZ2Decompressor() if data else None
+        else:
+            data = raw.read(batch_size)
+    if decompressor and not decompressor.eof:
+        raise EOFError("Compressed file ended before the end-of-stream marker was reached.")
+
+#decompresses a batch of whole bz2 streams (task of decompress_bz2's processes) : unlike bz2.decompress, invalid data after a stream raises an error instead of being ignored
+def _decompress_streams(data):
+    chunks = []
+    while data:
+        decompressor = bz2.BZ2Decompressor()
+        chunks.append(decompressor.decompress(data))
+        if not decompressor.eof:
+            raise EOFError("Compressed file ended before the end-of-stream marker was reached.")
+        data = decompressor.unused_data
+    return b"".join(chunks)
+
+"""decompresses a bz2 file on many cores : multistream (or concatenated) files are split at stream boundaries into batches of streams decompressed in parallel, and written back in order. Files of a single stream (or which streams are too large) are decompressed sequentially.
+Batches are decompressed by a pool of processes, started by spawn rather than fork : decompress_bz2 is called while other threads of concurrent downloads are running, which a forked process would copy in whatever state they are
+
+Args:
+path_to_bz2 (str): path of compressed file
+path_to_output (str): path of decompressed file, written as path_to_output + ".part" then renamed (default None : path of compressed file without ".bz2")
+workers (int): number of processes decompressing streams (default None : number of cores)
+batch_size (int): size of compressed data read at once, streams being decompressed by batches of about that size
+buffer_size (int): size of buffer of writes in output file
+keep (bool): should compressed file be kept (it is removed by default, as bzip2 -d does)
+
+Returns:
+str : path of decompressed file
+"""
+def decompress_bz2(path_to_bz2, path_to_output=None, workers=None, batch_size=4*1024*1024, buffer_size=64*1024*1024, keep=False):
+    if path_to_output == None:
+        path_to_output = path_to_bz2[:-len(".bz2")] if path_to_bz2.endswith(".bz2") else path_to_bz2+".out"
+    workers = workers if workers else os.cpu_count()
+    pool = concurrent.futures.ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) if workers > 1 else None
+    try:
+        with open(path_to_bz2, "rb") as raw, open(path_to_output+".part", "wb", buffering=buffer_size) as output:
+            pending_batches = collections.deque()
+            buffer = bytearray()
+            eof = False
+            while not eof:
+                data = raw.read(batch_size)
+                eof = not data
+                buffer += data
+                #cut at the last stream starting in buffer, unless all the file has been read
+                cut = len(buffer) if eof else _rfind_bz2_stream(buffer, 1)
+                #no stream boundary in many batches : the file is not multistream, the rest of it is decompressed as it is read (as it is with a single worker)
+                if pool == None or (cut <= 0 and len(buffer) > 4 * batch_size):
+                    while pending_batches:
+                        output.write(pending_batches.popleft().result())
+                    for chunk in _decompress_sequentially(bytes(buffer), raw, batch_size):
+                        output.write(chunk)
+                    break
+                if cut > 0:
+                    pending_batches.append(pool.submit(_decompress_streams, bytes(buffer[:cut])))
+                    del buffer[:cut]
+                #only a bounded number of batches are in memory
+                while pending_batches and (eof or len(pending_batches) > 2 * workers):
+                    output.write(pending_batches.popleft().result())
+    except(Exception):
+        if os.path.exists(path_to_output+".part"):
+            os.remove(path_to_output+".part")
+        raise
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+    os.replace(path_to_output+".part", path_to_output)
+    if not keep:
+        os.remove(path_to_bz2)
+    return path_to_output
+
+#extensions of dumps (and of their decompressed copies) replaced by newer dumps
+_DUMP_EXTENSIONS = (".xml", ".xml.bz2", ".json", ".json.bz2", ".json.gz")
+
+#deletes previous dumps of a folder, their partial downloads (".part", and ".part.json" of resumable downloads) and decompressed copies : other files (store of incremental updates, index of multistream dump, ...) are kept, as well as kept_filenames
+def _delete_previous_dumps(folder, kept_filenames):
+    for f in os.listdir(folder):
+        if f in kept_filenames:
+            continue
+        name = f
+        for suffix in [".part.json", ".part"]:
+            if name.endswith(suffix):
+                name = name[:-len(suffix)]
+                break
+        if name.endswith(_DUMP_EXTENSIONS):
+            os.remove(folder+"/"+f)
+
+#title, namespace and id of a page, at its start
+_PAGE_KEYS = re.compile(rb"<title>([^<]*)</title>\s*<ns>(-?[0-9]+)</ns>\s*<id>([0-9]+)</id>")
+#id of a revision, at its start
+_REVISION_ID = re.compile(rb"<revision>\s*<id>([0-9]+)</id>")
+
+#opens an xml dump, compressed (.bz2, of one or many streams) or not
+def _open_xml_dump(path_to_dump):
+    if path_to_dump.endswith(".bz2"):
+        return bz2.open(path_to_dump, "rb")
+    return open(path_to_dump, "rb")
+
+"""splits an xml dump into its head (mediawiki element and siteinfo) and its pages, without parsing them
+
+Args:
+fp (file): binary file of xml dump
+chunk_size (int): size of data read at once
+
+Returns:
+generator(bytes) : head of dump (up to the line of its first page), then each page from "<page>" to "</page>"
+"""
+def _split_dump(fp, chunk_size=4*1024*1024):
+    buffer = b""
+    head = None
+    chunk = fp.read(chunk_size)
+    while chunk:
+        buffer += chunk
+        if head == None:
+            start = buffer.find(b"<page>")
+            if start == -1:
+                chunk = fp.read(chunk_size)
+                continue
+            head = buffer[:buffer.rfind(b"\n", 0, start)+1]
+            yield head
+            buffer = buffer[start:]
+        #whole pages of buffer, the last one being completed by next chunks
+        position = 0
+        end = buffer.find(b"</page>", position)
+        while end != -1:
+            end += len(b"</page>")
+            yield buffer[buffer.find(b"<page>", position):end]
+            position = end
+            end = buffer.find(b"</page>", position)
+        buffer = buffer[position:]
+        chunk = fp.read(chunk_size)
+    #dump without pages
+    if head == None:
+        yield buffer[:buffer.rfind(b"</mediawiki>")]
+
+"""keys of a page of an xml dump, keeping its latest revision only (pages of history dumps hold many)
+
+Args:
+page (bytes): page from "<page>" to "</page>"
+
+Returns:
+tuple(int, int, str, int, bytes) : id, namespace, title and revision id of page, and page with its latest revision only (None if page has no title, id or revision)
+"""
+def _latest_revision(page):
+    matcher_keys = _PAGE_KEYS.search(page)
+    revisions = [(int(matcher_revision.group(1)), matcher_revision.start()) for matcher_revision in _REVISION_ID.finditer(page)]
+    if matcher_keys == None or not revisions:
+        return None
+    revision_id, start = max(revisions)
+    if len(revisions) > 1:
+        #lines of the page before its first revision, the latest revision, and the end of the page after its last revision
+        end = page.find(b"</revision>", start) + len(b"</revision>")
+        page = page[:page.rfind(b"\n", 0, revisions[0][1])+1] + page[page.rfind(b"\n", 0, start)+1:end] + page[page.rfind(b"</revision>")+len(b"</revision>"):]
+    return int(matcher_keys.group(3)), int(matcher_keys.group(2)), html.unescape(matcher_keys.group(1).decode("utf-8")), revision_id, page
+
+#returns the day before date (as "YYYYMMDD")
+def _day_before(date):
+    return (datetime.datetime.strptime(date, "%Y%m%d") - datetime.timedelta(days=1)).strftime("%Y%m%d")
+
+#returns the day after date (as "YYYYMMDD")
+def _day_after(date):
+    return (datetime.datetime.strptime(date, "%Y%m%d") + datetime.timedelta(days=1)).strftime("%Y%m%d")
+
+#returns path and date (as "YYYYMMDD") of the latest dated xml dump (or its bz2) of a folder, (None, None) if there is none
+def _latest_dated_dump(folder):
+    latest = (None, None)
+    for f in os.listdir(folder):
+        matcher_date = re.search("-([0-9]{8})-", f)
+        if matcher_date and f.endswith((".xml", ".xml.bz2")) and (latest[1] == None or matcher_date.group(1) > latest[1]):
+            latest = (folder+"/"+f, matcher_date.group(1))
+    return latest
 
 #a class to download amongst wikimedia's following dumps : wikidata, wikipedia, wikisource and wiktionary.
 #This class is meant to be a library or executed through bash.
@@ -20,10 +244,18 @@ class WikimediaDumpDownloader():
         self.url_wiki_dumps = "https://dumps.wikimedia.org/backup-index.html"
         #url to wikidata
         self.prefix_url_wiki_dumps = "https://dumps.wikimedia.org/"
+        #url to daily incremental dumps of wikis (or local folder of the same layout : <wiki>/<YYYYMMDD>/<wiki>-<YYYYMMDD>-pages-meta-hist-incr.xml.bz2, with status.txt and md5sums.txt)
+        self.url_incremental_dumps = "https://dumps.wikimedia.org/other/incr/"
         #local path to the root of the project
         self.path_root_project = path_root_project
         #index summerizing dumps urls
         self.path_index_wikis_dumps = None
+        #index parsed into urls of wrap-up pages of each project and langage (and urls of dumps already found in those pages)
+        self.index_wikis = None
+        #urls of dumps are added to index by concurrent downloads
+        self.index_lock = threading.Lock()
+        #kept-alive connections to hosts of dumps, shared by downloads
+        self.pool = ConnectionPool()
 
         #normalize path
         path_root_project=path_root_project.rstrip("/").rstrip("WikimediaDumps")+"/"
@@ -86,165 +318,507 @@ class WikimediaDumpDownloader():
         if not bool_exists_allready2:
             os.mkdir(self.path_root_project+"/.temp/index_wikis")
 
-    #In order to download indexes properly, we target their urls into an output folder and return the absolute path of the downladed index
-    def _download_file_and_return_absolute_path(self, output_folder, target_url):
-        
-        #delete all previous files downloaded in the same emplacement
-        for root, dirs, files in os.walk(output_folder):
-            for filename in files:
-                try:
-                    os.remove(output_folder+filename)
-                except(FileNotFoundError):
-                    pass
-
-        #download wikidata dump
-        subprocess.run(["wget", target_url, "--directory-prefix="+output_folder])
-
-        #file just downloaded has name we can deduct from target url
-        downloaded_file_name = target_url.split("/")[-1]
-
-        #return absolute path of this fils
-        return output_folder+downloaded_file_name
-
-    #downloads wikidata dump and keeps its absolute path in self.path_index_wikidata_dumps
-    def _wget_url_wikidata_dump(self):
-        self.path_index_wikidata_dumps = self._download_file_and_return_absolute_path(self.path_root_project+"/.temp/index_wikidata/", self.url_wikidata_dump)
+        self.path_index_wikidata_dumps = self.path_root_project+".temp/index_wikidata/index.html"
+        self.path_index_wikis_dumps = self.path_root_project+".temp/index_wikis/backup-index.html"
+        #index parsed in a previous session is reused until it is updated
+        if os.path.exists(self.path_index_wikis_dumps+".parsed"):
+            with open(self.path_index_wikis_dumps+".parsed") as fp:
+                self.index_wikis = json.load(fp)
 
-    #downloads wikidata dump and keeps its absolute path in self.path_index_wikis_dumps
-    def _wget_url_wiki_dumps(self):
-        self.path_index_wikis_dumps = self._download_file_and_return_absolute_path(self.path_root_project+"/.temp/index_wikis/", self.url_wiki_dumps)
+    #downloads url at path unless it is unchanged since its previous download there (conditional request, with the validators of the previous response kept in path + ".json"), returns whether it was downloaded
+    def _conditional_download(self, url, path):
+        path_to_validators = path+".json"
+        headers = {"User-Agent": USER_AGENT}
+        if os.path.exists(path) and os.path.exists(path_to_validators):
+            with open(path_to_validators) as fp:
+                validators = json.load(fp)
+            if validators["etag"]:
+                headers["If-None-Match"] = validators["etag"]
+            if validators["last_modified"]:
+                headers["If-Modified-Since"] = validators["last_modified"]
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=60) as response:
+                content = response.read()
+                validators = {"etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified")}
+        except(urllib.error.HTTPError):
+            e = sys.exc_info()[1]
+            #not modified
+            if e.code == 304:
+                return False
+            raise
+        _write_atomically(path, content)
+        _write_atomically(path_to_validators, json.dumps(validators))
+        return True
 
-    #to get most recent versions of wikimedia project, update indexes 
+    #to get most recent versions of wikimedia project, update indexes (only downloaded and parsed again if they changed since previous update)
     def update_index(self):
-        self._wget_url_wikidata_dump()
-        self._wget_url_wiki_dumps()
+        self._conditional_download(self.url_wikidata_dump, self.path_index_wikidata_dumps)
+        if self._conditional_download(self.url_wiki_dumps, self.path_index_wikis_dumps) or self.index_wikis == None:
+            index_wikis = self._get_table_wikis(self.path_index_wikis_dumps)
+            #urls of dumps found in wrap-up pages which are still listed are kept
+            wrap_up_urls = set(url for langages in index_wikis.values() for url, date in langages.values())
+            dump_urls = {url: href for url, href in (self.index_wikis or {}).get("dump_urls", {}).items() if url.split("#")[0] in wrap_up_urls}
+            self.index_wikis = {"wikis": index_wikis, "dump_urls": dump_urls}
+            self._save_index_wikis()
+
+    #persists parsed index (and urls of dumps found in its wrap-up pages) for next sessions
+    def _save_index_wikis(self):
+        _write_atomically(self.path_index_wikis_dumps+".parsed", json.dumps(self.index_wikis))
 
-    #from html index file we extract a list of url which are urls to wrap-up pages of project for given langage (the url to final dump can be found in those pages)
+    #from html index file we extract the urls of wrap-up pages of projects for each langage (the url to final dump can be found in those pages), as a dict project -> langage -> (url, date)
     def _get_table_wikis(self, path_index_wikis_dumps):
         reg_extr_url = re.compile("^<li>[0-9 :\-]{20}<a href=\"([^\"]+)\"")
-        list_href = []
-        with open(self.path_index_wikis_dumps) as fp:
+        #each url can be associated to a project using a regex on it
+        project2prefix_suffixe_reg = {"wikipedia": re.compile("^(.+)(wiki)$"),"wikisource":re.compile("^(.+)(wikisource)$"),"wiktionary":re.compile("^(.+)(wiktionary)$")}
+        table_wikis = {project: {} for project in project2prefix_suffixe_reg.keys()}
+        with open(path_index_wikis_dumps) as fp:
             for line in fp:
                 matcher_reg_extr = reg_extr_url.search(line)
                 if not matcher_reg_extr == None:
-                    value_href = matcher_reg_extr.group(1)
-                    list_href.append(value_href)
-        return list_href
+                    link = matcher_reg_extr.group(1)
+                    #split url
+                    splitted=link.split('/')
+                    url_lg_project = splitted[0]
+                    url_date = splitted[1]
+                    #figure which project it links to using adequate regex, and extract langage
+                    for project in project2prefix_suffixe_reg.keys():
+                        matcher_reg_project = project2prefix_suffixe_reg[project].search(url_lg_project)
+                        if not matcher_reg_project == None and not matcher_reg_project.group(1) in table_wikis[project]:
+                            table_wikis[project][matcher_reg_project.group(1)] = (self.prefix_url_wiki_dumps+link, url_date)
+        return table_wikis
+
+    #returns url of wrap-up page of latest dump of specified project and langage, and its date, found in index (None if they are not in index)
+    def wrap_up_page(self, project, langage):
+        #if index aren't present (first download), download them
+        if self.index_wikis == None:
+            self.update_index()
+        return self.index_wikis["wikis"].get(project, {}).get(langage)
+
+    #returns langages of specified project found in index
+    def langages(self, project):
+        if self.index_wikis == None:
+            self.update_index()
+        return sorted(self.index_wikis["wikis"].get(project, {}).keys())
 
-    #downloads dump of specified project and langage into adequate folder and unzips it
-    def download_dump(self, project, langage=None):
+    #downloads dump of specified project and langage into adequate folder and unzips it (unless decompress is False : WikiPageParser can parse .bz2 dumps directly, and WikidataExtractor wikidata's one)
+    #the dump is downloaded by parallel connections, resumed if a previous download of it was interrupted, and verified against its published checksum : previous dump is only deleted once the new one is complete
+    #workers : number of processes decompressing the dump (None for number of cores)
+    def download_dump(self, project, langage=None, decompress=True, connections=4, workers=None):
         #will contain absolute path of downloaded file
         retour = ""
-        #case 1: targeted project is wikidata
+        href = self.dump_url(project, langage)
+        if href:
+            folder = self._dump_folder(project, langage)
+            filename = href.split("/")[-1]
+
+            #download dump!
+            hash_name, checksum = self._published_checksum(href)
+            ParallelDownloader(connections, pool=self.pool).download(href, folder+"/"+filename, checksum, hash_name)
+
+            #delete previous dump
+            _delete_previous_dumps(folder, [filename])
+
+            #unzip dump
+            if decompress:
+                #return the file's path (striping ".bz2" away)
+                retour = decompress_bz2(folder+"/"+filename, workers=workers)
+            else:
+                retour = folder+"/"+filename
+        return retour
+
+    """downloads dumps of many projects and langages concurrently (see download_dump). Each dump is downloaded in its own folder, where its partial download is kept, and connections to the host of dumps are shared between downloads
+
+    Args:
+    targets (list(tuple(str, str))): (project, langage) couples of dumps to download (langage being None for wikidata)
+    decompress (bool): should dumps be unzipped
+    jobs (int): maximum number of dumps downloaded at the same time
+    connections (int): number of parallel connections downloading each dump
+    workers (int): number of processes decompressing each dump (None for number of cores)
+
+    Returns:
+    list(dict) : report of each download, in the order of targets : its project, langage, path of dump (None if it failed), error (None if it succeeded) and seconds it took
+    """
+    def download_dumps(self, targets, decompress=True, jobs=4, connections=4, workers=None):
+        targets = list(dict.fromkeys(targets))
+        #index is read before jobs start, instead of being downloaded by each one
+        if self.index_wikis == None and any(not project == "wikidata" for project, langage in targets):
+            self.update_index()
+        def download(target):
+            project, langage = target
+            start = time.time()
+            path = None
+            error = None
+            try:
+                path = self.download_dump(project, langage, decompress, connections, workers) or None
+                if not path:
+                    error = "No dump found in index, nor in its wrap-up page."
+            except(Exception):
+                e = sys.exc_info()[1]
+                error = type(e).__name__ + ": " + str(e)
+            return {"project": project, "langage": langage, "path": path, "error": error, "seconds": round(time.time() - start, 3)}
+
+        with concurrent.futures.ThreadPoolExecutor(jobs) as executor:
+            return list(executor.map(download, targets))
+
+    #returns hash function name and checksum of dump at href, as published by wikimedia next to it (in <wiki>-<date>-sha1sums.txt, or md5sums.txt), (None, None) if there is none (i.e. for latest wikidata dump)
+    def _published_checksum(self, href):
+        folder_url, filename = href.rsplit("/", 1)
+        matcher_prefix = re.search("^(.+-[0-9]{8})-", filename)
+        if matcher_prefix == None:
+            return None, None
+        for hash_name in ["sha1", "md5"]:
+            try:
+                response, content = self.pool.read(folder_url+"/"+matcher_prefix.group(1)+"-"+hash_name+"sums.txt")
+                for line in content.decode("utf-8").splitlines():
+                    fields = line.split()
+                    if len(fields) == 2 and fields[1] == filename:
+                        return hash_name, fields[0]
+            except(urllib.error.HTTPError):
+                pass
+        return None, None
+
+    #returns url of the dump of specified project and langage, found in the wrap-up page of its latest dump listed in index (None if project and langage are not in index, or their wrap-up page has no dump)
+    def dump_url(self, project, langage=None):
         if project=="wikidata":
-            print("lang", langage)
             if langage:
                 raise Exception("Wikidata is multilingual, should not target a language while extracting wikidata.")
+            return self.url_wikidata_dump+"latest-all.json.bz2"
+        if langage=="None":
+            raise Exception("Specify language")
+        wrap_up_page = self.wrap_up_page(project, langage)
+        if wrap_up_page == None:
+            return None
+        target_url = wrap_up_page[0]
+        #wrap-up page was already read for this dump
+        if target_url in self.index_wikis["dump_urls"]:
+            return self.index_wikis["dump_urls"][target_url]
+
+        #in those wrap-up pages the final dump to download is the first href of this form
+        reg_page_dump_extractor = re.compile("<li class='file'><a href=\"([^\"]+)\">")
+        content = self._read_wrap_up_page(target_url)
+        if content == None:
+            return None
+        matcher_url_dump = reg_page_dump_extractor.search(content)
+        if matcher_url_dump == None:
+            return None
+        #href to final dump
+        href = urllib.parse.urljoin(self.prefix_url_wiki_dumps, matcher_url_dump.group(1))
+        with self.index_lock:
+            self.index_wikis["dump_urls"][target_url] = href
+            self._save_index_wikis()
+        return href
+
+    """downloads only the given pages of specified project and langage instead of its whole dump : the index of its multistream dump (a small file kept in the folder of the dump) resolves their titles to the offsets of the bz2 streams holding them (of about 100 pages each), which are fetched by HTTP range requests, streams close to each other being fetched by the same request.
+    Pages are written with the siteinfo of the dump in a small xml dump, in the order of the dump, which WikiPageParser.parse_dump parses as any other dump
+
+    Args:
+    project (str): one of 'wikipedia', 'wikisource', 'wiktionary'
+    langage (str): language of dump
+    titles (iterable(str)): titles of pages (as written in the multistream index, i.e. "chat")
+    path_to_output (str): path of xml dump of pages (written as path_to_output + ".part", then renamed)
+    connections (int): number of parallel connections fetching ranges
+    max_gap (int): streams less than max_gap bytes apart are fetched by the same request (bytes in between are downloaded for nothing, but a request is saved)
+    max_range (int): maximum size of a range fetched by a request
+    retries (int): number of attempts of a range before the fetch fails
+
+    Returns:
+    list(str) : titles which were not found in index (their pages are missing from output)
+    """
+    def fetch_pages(self, project, langage, titles, path_to_output, connections=4, max_gap=128*1024, max_range=16*1024*1024, retries=3):
+        urls = self.multistream_urls(project, langage)
+        if not urls:
+            raise Exception("No multistream dump found in index for project " + project + " and language " + str(langage) + ".")
+        href, index_href = urls
+        path_to_index = self._dump_folder(project, langage)+"/"+index_href.split("/")[-1]
+        if not os.path.exists(path_to_index):
+            hash_name, checksum = self._published_checksum(index_href)
+            ParallelDownloader(connections, pool=self.pool).download(index_href, path_to_index, checksum, hash_name)
+
+        #ids of wanted pages by offset of their stream, and end of each of those streams (offset of the next one in index, the last stream of the dump ending with the file)
+        titles = list(titles)
+        missing_titles = set(titles)
+        ids_by_offset = collections.defaultdict(set)
+        stream_ends = {}
+        first_offset = None
+        previous_offset = None
+        with bz2.open(path_to_index, "rt", encoding="utf-8") as index:
+            for line in index:
+                offset, page_id, title = line.rstrip("\n").split(":", 2)
+                offset = int(offset)
+                if not offset == previous_offset:
+                    if previous_offset in ids_by_offset:
+                        stream_ends[previous_offset] = offset
+                    first_offset = offset if first_offset == None else first_offset
+                    previous_offset = offset
+                if title in missing_titles:
+                    ids_by_offset[offset].add(int(page_id))
+                    missing_titles.discard(title)
+        if first_offset == None:
+            raise Exception("Multistream index " + path_to_index + " is empty.")
+
+        #first stream holds the head of the dump (siteinfo), ranges are [start, end, offsets of streams in range]
+        ranges = []
+        for start, end in [(0, first_offset)] + [(offset, stream_ends.get(offset)) for offset in sorted(ids_by_offset)]:
+            if ranges and not ranges[-1][1] == None and start - ranges[-1][1] <= max_gap and not end == None and end - ranges[-1][0] <= max_range:
+                ranges[-1][1] = end
+                ranges[-1][2].append(start)
             else:
-                #delete previous version
-                for root, dirs, files in os.walk(self.path_root_project+"wikidata"):
-                    for filename in files:
-                        os.remove(self.path_root_project+"wikidata/"+filename)
-                subprocess.run(["wget", self.url_wikidata_dump+"/latest-all.json.bz2", "--directory-prefix="+self.path_root_project+"wikidata"])
-                zip=""
-                for root, dirs, files in os.walk(self.path_root_project+"wikidata"):
-                    for f in files:
-                        zip = f
-                subprocess.run(["bzip2", "-d", self.path_root_project+"wikidata/"+zip])
-                #return the file's path
-                filename = zip[:-4]
-                retour = self.path_root_project+"wikidata/"+filename
-
-        #case 2: targeted project is not  wikidata
+                ranges.append([start, end, [start]])
+
+        #fetches a range and returns the decompressed streams it holds (wanted pages of each one, or the head of the dump)
+        def fetch(fetched_range):
+            start, end, offsets = fetched_range
+            for attempt in range(retries):
+                try:
+                    data = self.pool.read_range(href, start, end)
+                    break
+                except(OSError, http.client.HTTPException):
+                    if attempt == retries - 1:
+                        raise
+            pieces = []
+            for offset in offsets:
+                decompressor = bz2.BZ2Decompressor()
+                stream = decompressor.decompress(memoryview(data)[offset - start:])
+                if not decompressor.eof:
+                    raise EOFError("Stream at offset " + str(offset) + " of " + href + " is truncated.")
+                if offset == 0:
+                    pieces.append(stream)
+                    continue
+                page_end = stream.find(b"</page>")
+                while page_end != -1:
+                    page = stream[stream.rfind(b"<page>", 0, page_end):page_end + len(b"</page>")]
+                    matcher_keys = _PAGE_KEYS.search(page)
+                    if matcher_keys and int(matcher_keys.group(3)) in ids_by_offset[offset]:
+                        pieces.append(b"  " + page + b"\n")
+                    page_end = stream.find(b"</page>", page_end + len(b"</page>"))
+            return pieces
+
+        with concurrent.futures.ThreadPoolExecutor(connections) as executor, open(path_to_output+".part", "wb") as output:
+            for pieces in executor.map(fetch, ranges):
+                output.writelines(pieces)
+            output.write(b"</mediawiki>\n")
+        os.replace(path_to_output+".part", path_to_output)
+        return [title for title in dict.fromkeys(titles) if title in missing_titles]
+
+    #returns content of wrap-up page at target_url, None if it is listed in index but missing
+    def _read_wrap_up_page(self, target_url):
+        try:
+            response, content = self.pool.read(target_url)
+        except(urllib.error.HTTPError):
+            if sys.exc_info()[1].code == 404:
+                return None
+            raise
+        return content.decode("utf-8")
+
+    #returns urls of the multistream dump of specified project and langage and of its index (offset of the stream of each page), found in the wrap-up page of its latest dump (None if there is none)
+    def multistream_urls(self, project, langage):
+        wrap_up_page = self.wrap_up_page(project, langage)
+        if wrap_up_page == None:
+            return None
+        key = wrap_up_page[0]+"#multistream"
+        if key in self.index_wikis["dump_urls"]:
+            return self.index_wikis["dump_urls"][key]
+        content = self._read_wrap_up_page(wrap_up_page[0])
+        matcher_url_dump = re.search("<li class='file'><a href=\"([^\"]+-pages-articles-multistream\\.xml\\.bz2)\">", content or "")
+        matcher_url_index = re.search("<li class='file'><a href=\"([^\"]+-pages-articles-multistream-index\\.txt\\.bz2)\">", content or "")
+        if matcher_url_dump == None or matcher_url_index == None:
+            return None
+        hrefs = [urllib.parse.urljoin(self.prefix_url_wiki_dumps, matcher.group(1)) for matcher in [matcher_url_dump, matcher_url_index]]
+        with self.index_lock:
+            self.index_wikis["dump_urls"][key] = hrefs
+            self._save_index_wikis()
+        return hrefs
+
+    #returns urls of dumps of specified project for each of given langages (all langages of project in index if None), langages without dump being left out
+    def dump_urls(self, project, langages=None):
+        if langages == None:
+            langages = self.langages(project)
+        dump_urls = {}
+        for langage in langages:
+            href = self.dump_url(project, langage)
+            if href:
+                dump_urls[langage] = href
+        return dump_urls
+
+    #returns folder of dumps of specified project and langage, created if it does not exist yet
+    def _dump_folder(self, project, langage=None):
+        if project=="wikidata":
+            return self.path_root_project+"wikidata"
+        folder = self.path_root_project+project+"/"+langage
+        if not os.path.isdir(folder):
+            os.mkdir(folder)
+        return folder
+
+    """streams dump of specified project and langage into output without intermediate file (i.e. standard output piped into "WikiPageParser.py -p -", which parses it as it is downloaded), copying it into adequate folder as it is streamed
+
+    Args:
+    project (str): one of 'wikidata', 'wikipedia', 'wikisource', 'wiktionary'
+    langage (str): language of dump (None for wikidata)
+    output (file): binary file in which the compressed dump is written (default None : standard output)
+    keep (bool): should the streamed dump be copied in its folder (as if it was downloaded with decompress=False), replacing the previous one once the whole dump is streamed
+    chunk_size (int): size of chunks read at once from the response
+
+    Returns:
+    str : path of the copy of the dump (None if it is not kept)
+    """
+    def stream_dump(self, project, langage=None, output=None, keep=True, chunk_size=1024*1024):
+        href = self.dump_url(project, langage)
+        if not href:
+            raise Exception("No dump found in index for project " + project + " and language " + str(langage) + ".")
+        if output is None:
+            output = sys.stdout.buffer
+
+        path = None
+        copy = None
+        if keep:
+            folder = self._dump_folder(project, langage)
+            path = folder+"/"+href.split("/")[-1]
+            copy = open(path+".part", "wb")
+            #the copy is checked against published checksum, hashed as it is streamed
+            hash_name, checksum = self._published_checksum(href)
+            hasher = hashlib.new(hash_name) if checksum else None
+        try:
+            with urllib.request.urlopen(urllib.request.Request(href, headers={"User-Agent": USER_AGENT})) as response:
+                chunk = response.read(chunk_size)
+                while chunk:
+                    output.write(chunk)
+                    if copy:
+                        copy.write(chunk)
+                        if hasher:
+                            hasher.update(chunk)
+                    chunk = response.read(chunk_size)
+                #response ends without error when the connection is lost, before the announced length
+                if response.length:
+                    raise IOError("Download of " + href + " ended " + str(response.length) + " bytes before its end.")
+            output.flush()
+        finally:
+            if copy:
+                copy.close()
+
+        #previous dump is only deleted once the new one is complete
+        if keep:
+            if hasher and not hasher.hexdigest() == checksum.lower():
+                os.remove(path+".part")
+                raise Exception("Copy of " + href + " does not match its published " + hash_name + " checksum.")
+            _delete_previous_dumps(folder, [path.split("/")[-1]+".part"])
+            os.replace(path+".part", path)
+        return path
+
+    #reads file at relative_path of incremental dumps (url_incremental_dumps being an url or a local folder), returns None if it is missing
+    def _read_incremental(self, relative_path):
+        if not re.match("https?://", self.url_incremental_dumps):
+            path = os.path.join(self.url_incremental_dumps, relative_path)
+            if not os.path.isfile(path):
+                return None
+            with open(path, "rb") as fp:
+                return fp.read()
+        try:
+            response, content = self.pool.read(self.url_incremental_dumps+relative_path)
+            return content
+        except(urllib.error.HTTPError):
+            if sys.exc_info()[1].code == 404:
+                return None
+            raise
+
+    #returns dates (as "YYYYMMDD") of incremental dumps of wiki (i.e. "frwiktionary"), in order
+    def _incremental_dates(self, wiki):
+        if not re.match("https?://", self.url_incremental_dumps):
+            folder = os.path.join(self.url_incremental_dumps, wiki)
+            dates = os.listdir(folder) if os.path.isdir(folder) else []
         else:
-            if langage=="None":
-                raise Exception("Specify language")
-            #if index aren't present (first download), download them
-            if not self.path_index_wikis_dumps:
-                self.update_index()
-            
-            #build list of href to wrap-up pages found in index. Those contain information of project's name and langage
-            list_href = self._get_table_wikis(self.path_index_wikis_dumps)
-
-            #each url can be associated to a project using a regex on it
-            project2prefix_suffixe_reg = {"wikipedia": re.compile("^(.+)(wiki)$"),"wikisource":re.compile("^(.+)(wikisource)$"),"wiktionary":re.compile("^(.+)(wiktionary)$")}
-
-            #in those wrap-up pages the final dump to download is the first href of this form
-            reg_page_dump_extractor = re.compile("<li class='file'><a href=\"([^\"]+)\">")
-            
-            #find which href to wrap-up page is required for download
-            target_url = ""
-            url_date = ""
-            for link in list_href:
-                #split url
-                splitted=link.split('/')
-                url_date = splitted[1]
-                url_lg_project = splitted[0]
-                #figure which project it links to using adequate regex
-                for key in project2prefix_suffixe_reg.keys():
-                    matcher_reg_extr = project2prefix_suffixe_reg[key].search(url_lg_project)
-                    if not matcher_reg_extr == None:
-                        #extract langage and project reading url
-                        extracted_langage = matcher_reg_extr.group(1)
-                        extracted_project = key
-                        #if url fits required project and langage, download it as file into temp folder
-                        if extracted_langage == langage and extracted_project == project:
-                            url_project = matcher_reg_extr.group(2)
-                            target_url = self.prefix_url_wiki_dumps+langage+url_project+"/"+url_date
-                            #downloaded url is a wrap-up page for given project and langage. In this html page we find the url to targeted dump.
-                            path_to_downloaded_url = self._download_file_and_return_absolute_path(self.path_root_project+".temp/", target_url)  
-                            with open(path_to_downloaded_url) as fp:
-                                for line in fp:
-                                    matcher_url_dump = reg_page_dump_extractor.search(line)
-                                    #breaks looping through file at first match
-                                    if not matcher_url_dump == None:
-                                        #href to final dump
-                                        href = "https://dumps.wikimedia.org"+matcher_url_dump.group(1)
-                                        #check if adequate langage folder exists in project folder
-                                        bool_exists_allready = False
-                                        for dirname in os.listdir(self.path_root_project+project):
-                                            if dirname == langage:
-                                                bool_exists_allready = True
-                                        #if not we create it
-                                        if not bool_exists_allready:
-                                            os.mkdir(self.path_root_project+project+"/"+langage)
-                                        #otherwise we delete previous dump inside it
-                                        else:
-                                            for root, dirs, files in os.walk(self.path_root_project+project+"/"+langage):
-                                                for f in files:
-                                                    filename = f
-                                                    os.remove(self.path_root_project+project+"/"+langage+"/"+f)
-
-                                        #download dump!
-                                        subprocess.run(["wget", href, "--directory-prefix="+self.path_root_project+project+"/"+langage])
-                                        
-                                        #unzip dump
-                                        zip = ""
-                                        for root, dirs, files in os.walk(self.path_root_project+project+"/"+langage):
-                                            for filename in files:
-                                                zip = filename
-                                                subprocess.run(["bzip2", "-d", self.path_root_project+project+"/"+langage+"/"+filename])
-                                                
-                                        #return the file's path (striping ".bz2" away)
-                                        filename = zip.rstrip(".bz2")
-                                        retour = self.path_root_project+project+"/"+langage+"/"+filename
-                                        break
-
-                            #remove all files from temp
-                            for root, dirs, files in os.walk(self.path_root_project+".temp"):
-                                for f in files:
-                                    try:
-                                        os.remove(self.path_root_project+".temp/"+f)
-                                    except(FileNotFoundError):
-                                        pass
-        return retour
+            content = self._read_incremental(wiki+"/")
+            dates = re.findall("href=\"([0-9]{8})/\"", content.decode("utf-8")) if content else []
+        return sorted(set(date for date in dates if re.match("^[0-9]{8}$", date)))
+
+    #returns path of incremental dump of wiki at date, downloaded in .temp and verified against its published md5 (or path in local folder of incremental dumps), and whether it was downloaded
+    def _fetch_incremental(self, wiki, date, connections=4):
+        filename = wiki+"-"+date+"-pages-meta-hist-incr.xml.bz2"
+        if not re.match("https?://", self.url_incremental_dumps):
+            return os.path.join(self.url_incremental_dumps, wiki, date, filename), False
+        checksum = None
+        md5sums = self._read_incremental(wiki+"/"+date+"/"+wiki+"-"+date+"-md5sums.txt")
+        for line in (md5sums.decode("utf-8").splitlines() if md5sums else []):
+            fields = line.split()
+            if len(fields) == 2 and fields[1] == filename:
+                checksum = fields[0]
+        path = self.path_root_project+".temp/"+filename
+        ParallelDownloader(connections, pool=self.pool).download(self.url_incremental_dumps+wiki+"/"+date+"/"+filename, path, checksum, "md5")
+        return path, True
 
-    #returns first xml at expected folder if dump exists, returns None otherwise
+    """brings the local dump of specified project and langage up to date with the daily "adds-changes" incremental dumps published since its date, instead of downloading the whole dump again.
+    Pages of the dump are loaded once in a PageStore kept next to it (<wiki>-pages.sqlite), then new and changed revisions of each incremental dump replace the stored ones, a day after the other. Days are applied in order until one which is not done yet, an interrupted day being applied again by next update.
+    A store is loaded again from the local dump when it is newer than the store (i.e. downloaded again since its last update). An error is raised when the incremental dump of a day is missing (wikimedia only keeps about two weeks of them) : the dump is then to be downloaded again.
+    Pages deleted from the wiki are not removed : adds-changes dumps only hold new revisions.
+
+    Args:
+    project (str): one of 'wikipedia', 'wikisource', 'wiktionary' (wikidata has no incremental xml dumps)
+    langage (str): language of dump
+    export (bool): should the store be written back as an xml dump once updated (<wiki>-<date>-pages-articles.xml, replacing previous dumps of the folder, to be parsed by WikiPageParser)
+    connections (int): number of parallel connections downloading each incremental dump
+
+    Returns:
+    str : path of the up to date xml dump (of the store if export is False)
+    """
+    def update_dump_incrementally(self, project, langage=None, export=True, connections=4):
+        if project=="wikidata":
+            raise Exception("Wikidata has no incremental xml dumps, download it again.")
+        folder = self._dump_folder(project, langage)
+        #wiki and date are the ones of the local dump until a store is loaded from it
+        stores = [f for f in os.listdir(folder) if f.endswith("-pages.sqlite")]
+        path_to_dump, dump_date = _latest_dated_dump(folder)
+        if path_to_dump == None:
+            path_to_dump = self.path_to_dump(project, langage)
+        if stores:
+            wiki = stores[0][:-len("-pages.sqlite")]
+        elif path_to_dump:
+            wiki = path_to_dump.split("/")[-1].split("-")[0]
+        else:
+            raise Exception("No local dump of project " + project + " and language " + str(langage) + " to update, download it first.")
+        store = PageStore(folder+"/"+wiki+"-pages.sqlite")
+        try:
+            #store is loaded from the local dump the first time, and again when a newer dump was downloaded since its last update
+            if store.date == None or (dump_date != None and dump_date > store.date):
+                if dump_date == None:
+                    raise Exception("No dated local dump of project " + project + " and language " + str(langage) + " to load.")
+                #incremental dump of the day of the dump may hold revisions made while it was dumped
+                store.load_dump(path_to_dump, _day_before(dump_date))
+
+            for date in self._incremental_dates(wiki):
+                if date <= store.date:
+                    continue
+                #dump of the day is not complete yet, it is applied by next update
+                status = self._read_incremental(wiki+"/"+date+"/status.txt")
+                if status == None or not status.decode("utf-8").strip().startswith("done"):
+                    break
+                #days are applied one after the other : a missing day (wikimedia only keeps about two weeks of incremental dumps) would lose its changes
+                if not date == _day_after(store.date):
+                    raise Exception("Incremental dumps of " + wiki + " from " + _day_after(store.date) + " to " + _day_before(date) + " are missing : download the dump again, the store being loaded from it by next update.")
+                path_to_incremental, downloaded = self._fetch_incremental(wiki, date, connections)
+                try:
+                    store.apply_dump(path_to_incremental, date)
+                finally:
+                    if downloaded:
+                        os.remove(path_to_incremental)
+
+            if not export:
+                return folder+"/"+wiki+"-pages.sqlite"
+            #previous dumps are deleted once the store is written back
+            filename = wiki+"-"+store.date+"-pages-articles.xml"
+            if not store.get_meta("exported") == store.date or not path_to_dump:
+                store.export(folder+"/"+filename)
+                _delete_previous_dumps(folder, [filename])
+                return folder+"/"+filename
+            return path_to_dump
+        finally:
+            store.close()
+
+    #returns first xml at expected folder if dump exists (or first compressed xml if it was kept compressed), returns None otherwise
     def path_to_dump(self, project, langage=None):
         folder_path = self.path_root_project + project + "/" + langage
-        for filename in os.listdir(folder_path):
-            if filename.endswith(".xml"):
-                return folder_path + "/" + filename
+        for extension in [".xml", ".xml.bz2"]:
+            for filename in os.listdir(folder_path):
+                if filename.endswith(extension):
+                    return folder_path + "/" + filename
         return None
 
     #deletes folder for specified project and langage if exists
@@ -265,6 +839,347 @@ class WikimediaDumpDownloader():
                                 os.remove(self.path_root_project+project+"/"+langage+"/"+file)
                         os.rmdir(self.path_root_project+project+"/"+langage)
 
+#a pool of kept-alive connections by host (scheme and netloc), so that connections opened by a download are reused by next ranges and downloads instead of being opened again.
+#It can be shared by downloads running in parallel threads.
+class ConnectionPool():
+
+    #timeout : seconds of inactivity after which a connection is given up
+    def __init__(self, timeout=60):
+        self.timeout = timeout
+        self.idle_connections = {}
+        self.lock = threading.Lock()
+
+    #returns an idle connection to host of url, or a new one if there is none
+    def get(self, url):
+        parsed_url = urllib.parse.urlsplit(url)
+        with self.lock:
+            idle_connections = self.idle_connections.get((parsed_url.scheme, parsed_url.netloc))
+            if idle_connections:
+                return idle_connections.pop()
+        if parsed_url.scheme == "https":
+            return http.client.HTTPSConnection(parsed_url.netloc, timeout=self.timeout)
+        return http.client.HTTPConnection(parsed_url.netloc, timeout=self.timeout)
+
+    """sends a GET request of url on a connection of the pool (a new one if the idle one was closed by the server), following redirections
+
+    Args:
+    url (str): url requested
+    headers (dict): headers of request, in addition to user agent
+    redirections (int): maximum number of redirections followed
+
+    Returns:
+    tuple(HTTPConnection, HTTPResponse, str) : connection, to be given back with put once response is read, its response, and the url it was redirected to
+    """
+    def request(self, url, headers={}, redirections=5):
+        for redirection in range(redirections + 1):
+            parsed_url = urllib.parse.urlsplit(url)
+            path = parsed_url.path + ("?" + parsed_url.query if parsed_url.query else "")
+            connection = self.get(url)
+            try:
+                connection.request("GET", path, headers=dict(headers, **{"User-Agent": USER_AGENT}))
+                response = connection.getresponse()
+            except(OSError, http.client.HTTPException):
+                #kept-alive connection may have been closed by the server in the meantime
+                connection.close()
+                connection.request("GET", path, headers=dict(headers, **{"User-Agent": USER_AGENT}))
+                response = connection.getresponse()
+            if not response.status in [301, 302, 303, 307, 308]:
+                return connection, response, url
+            response.read()
+            self.put(url, connection)
+            url = urllib.parse.urljoin(url, response.headers["Location"])
+        raise http.client.HTTPException("Too many redirections for " + url + ".")
+
+    #returns response to a GET request of url (see request) and its content, raising HTTPError for error statuses
+    def read(self, url, headers={}):
+        connection, response, url = self.request(url, headers)
+        content = response.read()
+        self.put(url, connection)
+        if response.status >= 400:
+            raise urllib.error.HTTPError(url, response.status, response.reason, response.headers, None)
+        return response, content
+
+    #returns bytes of file at url from start to end (excluded, None for the end of file), raising HTTPException if the server does not answer with this range (instead of reading a whole file it would send)
+    def read_range(self, url, start, end=None):
+        connection, response, url = self.request(url, {"Range": "bytes=%d-%s" % (start, "" if end == None else str(end - 1))})
+        if not response.status == 206:
+            connection.close()
+            raise http.client.HTTPException("Range " + str(start) + "-" + str(end) + " of " + url + " answered with status " + str(response.status) + ".")
+        content = response.read()
+        self.put(url, connection)
+        return content
+
+    #gives back a connection to host of url, whose responses were fully read (closed connections open again on their next request)
+    def put(self, url, connection):
+        parsed_url = urllib.parse.urlsplit(url)
+        with self.lock:
+            self.idle_connections.setdefault((parsed_url.scheme, parsed_url.netloc), []).append(connection)
+
+    def close(self):
+        with self.lock:
+            for idle_connections in self.idle_connections.values():
+                for connection in idle_connections:
+                    connection.close()
+            self.idle_connections = {}
+
+#a class to download a file as byte ranges fetched in parallel, each connection being kept alive to fetch many ranges.
+#Ranges already written by an interrupted download are kept in path + ".part" (listed in path + ".part.json"), so that running it again resumes it.
+#The file only replaces the one at path once it is complete and matches its checksum (if given).
+class ParallelDownloader():
+
+    #connections : number of parallel connections, chunk_size : size of each requested range, retries : number of attempts of a range before the download fails, timeout : seconds of inactivity after which a connection is given up, pool : ConnectionPool of kept-alive connections shared with other downloads (None for connections of its own)
+    def __init__(self, connections=4, chunk_size=16*1024*1024, retries=3, timeout=60, pool=None):
+        self.connections = connections
+        self.chunk_size = chunk_size
+        self.retries = retries
+        self.timeout = timeout
+        self.pool = pool if pool else ConnectionPool(timeout)
+
+    #downloads url at path, verified with checksum (hexadecimal digest of hash_name, i.e. "sha1" or "md5") unless it is None, and returns path
+    def download(self, url, path, checksum=None, hash_name="sha1"):
+        path_to_part = path+".part"
+        size, validator, url, response = self._probe(url)
+        #server ignoring ranges sends the whole file at once
+        if response:
+            self._download_whole(url, response, path_to_part)
+        else:
+            self._download_ranges(url, path_to_part, size, validator)
+
+        if checksum and not self.file_hash(path_to_part, hash_name) == checksum.lower():
+            os.remove(path_to_part)
+            raise Exception("Download of " + url + " does not match its " + hash_name + " checksum.")
+        os.replace(path_to_part, path)
+        return path
+
+    #returns size of file at url, its validator (etag or last modification date, telling whether a partial download is of the same file), the url it redirects to, and the response if the server ignored the range request (None otherwise)
+    def _probe(self, url):
+        connection, response, url = self.pool.request(url, {"Range": "bytes=0-0"})
+        validator = response.headers.get("ETag") or response.headers.get("Last-Modified")
+        if response.status == 200:
+            return response.length, validator, url, (connection, response)
+        response.read()
+        self.pool.put(url, connection)
+        if not response.status == 206:
+            raise urllib.error.HTTPError(url, response.status, response.reason, response.headers, None)
+        size = int(response.headers["Content-Range"].split("/")[-1])
+        return size, validator, url, None
+
+    #writes the whole response (sent on connection) at path_to_part
+    def _download_whole(self, url, connection_response, path_to_part):
+        connection, response = connection_response
+        with open(path_to_part, "wb") as fp:
+            chunk = response.read(1024*1024)
+            while chunk:
+                fp.write(chunk)
+                chunk = response.read(1024*1024)
+        #response ends without error when the connection is lost, before the announced length
+        if response.length:
+            connection.close()
+            raise IOError("Download of " + url + " ended " + str(response.length) + " bytes before its end.")
+        self.pool.put(url, connection)
+
+    #fetches missing ranges of file into path_to_part (of the file's size), ranges already written being listed in state file
+    def _download_ranges(self, url, path_to_part, size, validator):
+        path_to_state = path_to_part+".json"
+        state = {"url": url, "size": size, "validator": validator, "chunk_size": self.chunk_size, "done": []}
+        #resume previous download of the same file (unchanged validator) with the same ranges
+        if validator and os.path.exists(path_to_part) and os.path.exists(path_to_state):
+            with open(path_to_state) as fp:
+                previous_state = json.load(fp)
+            if [previous_state[key] for key in ["size", "validator", "chunk_size"]] == [size, validator, self.chunk_size]:
+                state["done"] = previous_state["done"]
+        if not state["done"]:
+            with open(path_to_part, "wb") as fp:
+                fp.truncate(size)
+
+        pending = queue.Queue()
+        for index in range(math.ceil(size / self.chunk_size)):
+            if not index in state["done"]:
+                pending.put(index)
+        lock = threading.Lock()
+        failed = threading.Event()
+
+        #each connection fetches pending ranges until there is none left (or a range failed), saving the state after each one
+        def fetch_ranges():
+            connection = None
+            try:
+                while not failed.is_set():
+                    try:
+                        index = pending.get_nowait()
+                    except(queue.Empty):
+                        break
+                    for attempt in range(self.retries):
+                        try:
+                            if connection == None:
+                                connection = self.pool.get(url)
+                            self._fetch_range(connection, url, fd, index, size)
+                            break
+                        except(OSError, http.client.HTTPException):
+                            if connection:
+                                connection.close()
+                            connection = None
+                            if attempt == self.retries - 1:
+                                failed.set()
+                                raise
+                    with lock:
+                        state["done"].append(index)
+                        _write_atomically(path_to_state, json.dumps(state))
+            finally:
+                #connection is left to next ranges or downloads (it is closed after an error)
+                if connection:
+                    self.pool.put(url, connection)
+
+        fd = os.open(path_to_part, os.O_WRONLY)
+        try:
+            with concurrent.futures.ThreadPoolExecutor(self.connections) as executor:
+                for future in [executor.submit(fetch_ranges) for i in range(self.connections)]:
+                    future.result()
+        finally:
+            os.close(fd)
+        if os.path.exists(path_to_state):
+            os.remove(path_to_state)
+
+    #fetches range of given index on connection, writing it at its offset in file descriptor fd
+    def _fetch_range(self, connection, url, fd, index, size):
+        parsed_url = urllib.parse.urlsplit(url)
+        start = index * self.chunk_size
+        end = min(start + self.chunk_size, size)
+        connection.request("GET", parsed_url.path + ("?" + parsed_url.query if parsed_url.query else ""), headers={"User-Agent": USER_AGENT, "Range": "bytes=%d-%d" % (start, end - 1)})
+        response = connection.getresponse()
+        if not response.status == 206:
+            response.read()
+            raise http.client.HTTPException("Range " + str(start) + "-" + str(end - 1) + " of " + url + " answered with status " + str(response.status) + ".")
+        offset = start
+        chunk = response.read(1024*1024)
+        while chunk:
+            os.pwrite(fd, chunk, offset)
+            offset += len(chunk)
+            chunk = response.read(1024*1024)
+        if not offset == end:
+            raise http.client.IncompleteRead(b"", end - offset)
+
+    #returns hexadecimal digest of file at path with hash function hash_name (i.e. "sha1" or "md5")
+    @staticmethod
+    def file_hash(path, hash_name="sha1"):
+        hasher = hashlib.new(hash_name)
+        with open(path, "rb") as fp:
+            chunk = fp.read(4*1024*1024)
+            while chunk:
+                hasher.update(chunk)
+                chunk = fp.read(4*1024*1024)
+        return hasher.hexdigest()
+
+#Local dump keyed by page (sqlite database), kept up to date by daily incremental dumps : each page is kept with its latest revision only (xml of the page, compressed), which newer revisions of the page found in "adds-changes" dumps replace.
+#The head of the dump it was loaded from (siteinfo) is kept to write it back as an xml dump, along with the namespaces of its pages (pages of other namespaces, i.e. talk pages which pages-articles dumps leave out, are not added from incremental dumps) and the date of the last dump applied.
+class PageStore():
+
+    #path_to_store : path of sqlite database (created if missing), batch_size : number of pages written at once while a dump is loaded
+    def __init__(self, path_to_store, batch_size=1000):
+        self.batch_size = batch_size
+        self.connection = sqlite3.connect(path_to_store)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS pages (page_id INTEGER PRIMARY KEY, ns INTEGER, title TEXT, revision_id INTEGER, xml BLOB)")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.connection.commit()
+
+    #returns value of key in metadata of store (None if it is not set)
+    def get_meta(self, key):
+        row = self.connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _set_meta(self, key, value):
+        self.connection.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, json.dumps(value)))
+
+    #date of the last dump applied to the store (None until a whole dump is loaded in it)
+    @property
+    def date(self):
+        return self.get_meta("date")
+
+    """loads a whole xml dump in the store, replacing its pages
+
+    Args:
+    path_to_dump (str): path of xml dump (.xml or .xml.bz2)
+    date (str): date of dump (as "YYYYMMDD"), incremental dumps of next days being applied to it
+
+    Returns:
+    int : number of pages loaded
+    """
+    def load_dump(self, path_to_dump, date):
+        with self.connection:
+            self.connection.execute("DELETE FROM pages")
+            self.connection.execute("DELETE FROM meta")
+        namespaces = set()
+        count = 0
+        rows = []
+        with _open_xml_dump(path_to_dump) as fp:
+            pieces = _split_dump(fp)
+            head = next(pieces)
+            for page in pieces:
+                row = _latest_revision(page)
+                if row:
+                    namespaces.add(row[1])
+                    rows.append(row[:4] + (zlib.compress(row[4]),))
+                if len(rows) >= self.batch_size:
+                    with self.connection:
+                        self.connection.executemany("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)", rows)
+                    count += len(rows)
+                    rows = []
+        #the store is complete once its date is set
+        with self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)", rows)
+            self._set_meta("head", head.decode("utf-8"))
+            self._set_meta("namespaces", sorted(namespaces))
+            self._set_meta("date", date)
+            self._set_meta("exported", date)
+        return count + len(rows)
+
+    """applies an incremental dump (of new and changed revisions) to the store, in one transaction : pages of the dump replace stored ones whose revision is older
+
+    Args:
+    path_to_dump (str): path of xml dump (.xml or .xml.bz2)
+    date (str): date of dump (as "YYYYMMDD")
+
+    Returns:
+    dict : number of pages added, replaced, removed (moved to a namespace out of the store), unchanged (whose revision was not newer) and ignored (of a namespace out of the store)
+    """
+    def apply_dump(self, path_to_dump, date):
+        namespaces = set(self.get_meta("namespaces"))
+        counts = {"added": 0, "replaced": 0, "removed": 0, "unchanged": 0, "ignored": 0}
+        with self.connection, _open_xml_dump(path_to_dump) as fp:
+            pieces = _split_dump(fp)
+            next(pieces)
+            for page in pieces:
+                row = _latest_revision(page)
+                if row == None:
+                    continue
+                stored = self.connection.execute("SELECT revision_id FROM pages WHERE page_id = ?", (row[0],)).fetchone()
+                if stored and stored[0] >= row[3]:
+                    counts["unchanged"] += 1
+                elif not row[1] in namespaces:
+                    if stored:
+                        self.connection.execute("DELETE FROM pages WHERE page_id = ?", (row[0],))
+                        counts["removed"] += 1
+                    else:
+                        counts["ignored"] += 1
+                else:
+                    self.connection.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)", row[:4] + (zlib.compress(row[4]),))
+                    counts["replaced" if stored else "added"] += 1
+            self._set_meta("date", date)
+        return counts
+
+    #writes pages of the store as an xml dump at path_to_output (in order of their ids, with the head of the dump loaded), through path_to_output + ".part"
+    def export(self, path_to_output):
+        with open(path_to_output+".part", "wb", buffering=16*1024*1024) as output:
+            output.write(self.get_meta("head").encode("utf-8"))
+            for (xml,) in self.connection.execute("SELECT xml FROM pages ORDER BY page_id"):
+                output.write(b"  " + zlib.decompress(xml) + b"\n")
+            output.write(b"</mediawiki>\n")
+        os.replace(path_to_output+".part", path_to_output)
+        with self.connection:
+            self._set_meta("exported", self.date)
+
+    def close(self):
+        self.connection.close()
+
 if __name__ == '__main__':
 
     parser = argparse.ArgumentParser(description='A partir de la racine donné en paramètre, permet de télécharger/supprimer un dump voulu')
@@ -273,17 +1188,32 @@ if __name__ == '__main__':
     parser.add_argument("-r", "--root", help="Root for storing dumps. Compulsory parameter when allready has been specified", default=None)
     #one of wikidata, wikipedia, wikisource and wiktionary
     #required except if -u argument is used
-    parser.add_argument("-p", "--project", help="Project targeted. Can be either 'wikidata', 'wikipedia', 'wikisource', 'wiktionary'.", default=None)
+    parser.add_argument("-p", "--project", help="Project targeted. Can be either 'wikidata', 'wikipedia', 'wikisource', 'wiktionary' (or many of them separated by commas, downloaded concurrently).", default=None)
     #if project is wikidata, this argument is to be skipped
-    parser.add_argument("-l", "--langage", help="Language targeted. (i.e. 'en', 'fr', 'de', 'es'...)", default=None)
+    parser.add_argument("-l", "--langage", help="Language targeted. (i.e. 'en', 'fr', 'de', 'es'...) (or many of them separated by commas, downloaded concurrently).", default=None)
     #if d request deletion of language in project
     parser.add_argument("-d", "--delete", help="Delete mode (takes no argument)", action='store_true', default=None)
+    #if k the dump is kept compressed (WikiPageParser reads .bz2 dumps directly)
+    parser.add_argument("-k", "--keep_compressed", help="Keep the dump compressed, do not unzip it (takes no argument)", action='store_true', default=False)
+    #number of parallel connections downloading the dump
+    parser.add_argument("-c", "--connections", help="Number of parallel connections downloading the dump (default 4)", type=int, default=4)
+    #number of dumps downloaded at the same time when many are targeted
+    parser.add_argument("-j", "--jobs", help="Number of dumps downloaded at the same time when many projects or languages are targeted (default 4)", type=int, default=4)
+    #number of processes decompressing the dump
+    parser.add_argument("-x", "--workers", help="Number of processes decompressing the dump, multistream dumps being split at stream boundaries (default : number of cores)", type=int, default=None)
+    #if s the dump is streamed to standard output (i.e. piped into WikiPageParser.py -p -), while being copied into its folder unless n
+    parser.add_argument("-s", "--stream", help="Stream the compressed dump to standard output, to be parsed while it is downloaded (i.e. piped into 'WikiPageParser.py -p -'). It is still copied into its folder, unless -n is used. (takes no argument)", action='store_true', default=False)
+    parser.add_argument("-n", "--no_copy", help="With -s, do not keep a copy of the streamed dump (takes no argument)", action='store_true', default=False)
+    #if w only the url of the dump is printed (i.e. given to WikiPageParser.py -p, which streams it)
+    parser.add_argument("-w", "--url", help="Print the url of the dump instead of downloading it (takes no argument)", action='store_true', default=False)
+    #if t only the pages of given titles are downloaded, from the multistream dump, into an xml dump at o
+    parser.add_argument("-t", "--titles", help="Path of a file of titles (one per line) : only their pages are downloaded (streams of the multistream dump holding them are fetched by range requests) into a small xml dump at the path given by -o.", default=None)
+    parser.add_argument("-o", "--output", help="With -t, path of the xml dump of pages.", default=None)
     #use this arument to update index files pointing to dumps
     parser.add_argument("-u", "--update_index", help="Update html index files. Use it when you want to update the date of the dumps, don't if you want to keep the same date as previous session. (takes no argument)", action='store_true', default=None)
 
-    '''#a feature we could integrate in future would be option to download dumps from n last days (history of modification)
-    parser.add_argument("-t", "--time", help="télécharger les dumps des d derniers jours (default = latest).",  default='latest')
-    '''
+    #if i the local dump is brought up to date with daily incremental dumps (history of modifications since its date) instead of being downloaded again
+    parser.add_argument("-i", "--incremental", help="Update the local dump with the daily incremental dumps (new and changed pages) published since its date, instead of downloading it again. The dump is kept in a database of pages next to it and written back as an xml dump. (takes no argument)", action='store_true', default=False)
     args = parser.parse_args()
 
     update_index=args.update_index
@@ -291,6 +1221,7 @@ if __name__ == '__main__':
     project = args.project
     langage = args.langage
     delete = args.delete
+    keep_compressed = args.keep_compressed
 
     #try to upload from config file if none in cmd line arguments
     if not path_root_project:
@@ -326,7 +1257,34 @@ if __name__ == '__main__':
         else:
             wikimedia_dumps.update_index()
     else:
-        if not delete:
-            path = wikimedia_dumps.download_dump(project, langage)
+        #targeted dumps : each project in each langage (wikidata having none)
+        targets = list(dict.fromkeys((p, None if p == "wikidata" else l) for p in project.split(",") for l in (langage.split(",") if langage else [None])))
+        #pages of titles and streamed dumps have a single output
+        if (args.titles or args.stream) and len(targets) > 1:
+            raise ValueError("Please specify only one project and one language with -t or -s (not " + str(len(targets)) + " dumps).")
+        if args.url:
+            for p, l in targets:
+                print(wikimedia_dumps.dump_url(p, l))
+        elif args.titles:
+            if not args.output:
+                raise ValueError("Please specify a path for the xml dump of pages to command line arguments (-o).")
+            with open(args.titles, encoding="utf-8") as fp:
+                titles = [line.rstrip("\n") for line in fp if line.strip()]
+            for title in wikimedia_dumps.fetch_pages(*targets[0], titles, args.output, args.connections):
+                print("Page not found in index : " + title, file=sys.stderr)
+        elif args.incremental:
+            for p, l in targets:
+                print(wikimedia_dumps.update_dump_incrementally(p, l, connections=args.connections))
+        elif args.stream:
+            wikimedia_dumps.stream_dump(*targets[0], keep=not args.no_copy)
+        elif not delete and len(targets) > 1:
+            #report of each download, failing if any of them failed
+            report = wikimedia_dumps.download_dumps(targets, not keep_compressed, args.jobs, args.connections, args.workers)
+            for download in report:
+                print("\t".join([download["project"], str(download["langage"]), "ok" if download["path"] else "failed", str(download["seconds"]), download["path"] or download["error"]]))
+            if any(not download["path"] for download in report):
+                sys.exit(1)
+        elif not delete:
+            path = wikimedia_dumps.download_dump(project, langage, not keep_compressed, args.connections, args.workers)
         else:
             wikimedia_dumps.delete_dump(project.lower(), langage.lower())
@@ -1,13 +1,33 @@
 import re
 import argparse
+import array
+import bz2
 import json
+import io
 import math
 import sys
 import os
+import collections
+import copy
+import heapq
+import hashlib
+import multiprocessing
+import sqlite3
+import threading
+import time
+import queue
+import urllib.request
+import xml.sax.saxutils
 import progressbar
 
 from lxml import etree
 
+#faster json serializer, if installed, used for compact output
+try:
+    import orjson
+except(ImportError):
+    orjson = None
+
 class InputError(Exception):
     """Exception raised for errors in the input. Those can be used to improve wikimedia projects.
 
@@ -18,6 +38,8 @@ class InputError(Exception):
     """
 
     def __init__(self, localization, expression, message):
+        #arguments are kept so that errors can be sent back from worker processes (pickled)
+        super().__init__(localization, expression, message)
         self.localization = localization
         self.expression = expression.replace("\n", "\\n")
         self.message = message
@@ -26,6 +48,622 @@ class InputError(Exception):
         return "".join([self.message, "\t",  self.localization, "\t", self.expression, "\n"])
 
 
+#state of a worker process of parse_dump : the parser, the arguments of toDict, the output format and the stats (inherited through fork)
+_worker_parser = None
+_worker_parsing_args = None
+_worker_output_format = None
+_worker_stats = None
+
+#initializer of parse_dump's worker processes
+def _init_parse_worker(parser, parsing_args, output_format, stats=None):
+    global _worker_parser, _worker_parsing_args, _worker_output_format, _worker_stats
+    _worker_parser = parser
+    _worker_parsing_args = parsing_args
+    _worker_output_format = output_format
+    _worker_stats = stats
+
+#task of parse_dump's worker processes : parses a batch of (title, id, ns, text) pages and returns their results in the same order (with stats of the batch, if any)
+def _parse_pages_in_worker(pages):
+    results = [_worker_parser._parse_page(title, page_id, ns, page, _worker_parsing_args, _worker_output_format, _worker_stats) for title, page_id, ns, page in pages]
+    if _worker_stats:
+        return results, _worker_stats.pop_delta()
+    return results
+
+
+#user agent of the requests of streamed dumps (wikimedia asks for a descriptive one), WikimediaDumpDownloader.py ("../1- OXOLO") sending its own as USER_AGENT
+_USER_AGENT = "WikiPageParser (https://github.com/sheldu45/Samples)"
+
+#dumps given by an url, or "-" for standard input, are streamed instead of being opened from disk
+def _is_streamed(path_to_dump):
+    return path_to_dump == "-" or path_to_dump.startswith(("http://", "https://"))
+
+
+#magic bytes starting each bz2 stream, followed by a block size digit and the magic of the first block (or of the end of an empty stream)
+#_BZ2_STREAM_MAGIC, _rfind_bz2_stream and _decompress_streams are the same as in WikimediaDumpDownloader.py ("../1- OXOLO"), whose decompress_bz2 splits multistream dumps by the same batches of streams : both scripts are run on their own from their folder, so each one keeps its copy, to be changed along with the other one
+_BZ2_STREAM_MAGIC = b"BZh"
+_BZ2_BLOCK_MAGICS = (b"1AY&SY", b"\x17\x72\x45\x38\x50\x90")
+
+"""returns the offset of the last bz2 stream header found in data after start, or -1 if there is none
+
+Args:
+data (bytes): compressed data
+start (int): offset after which stream headers are looked for
+
+Returns:
+int : offset of the last stream header
+"""
+def _rfind_bz2_stream(data, start=0):
+    offset = data.rfind(_BZ2_STREAM_MAGIC, start)
+    while offset != -1:
+        if data[offset+3:offset+4].isdigit() and data[offset+4:offset+10] in _BZ2_BLOCK_MAGICS:
+            return offset
+        offset = data.rfind(_BZ2_STREAM_MAGIC, start, offset)
+    return -1
+
+#decompresses a batch of whole bz2 streams (task of _MultistreamBz2Reader's processes) : unlike bz2.decompress, invalid data after a stream raises an error instead of being ignored
+def _decompress_streams(data):
+    chunks = []
+    while data:
+        decompressor = bz2.BZ2Decompressor()
+        chunks.append(decompressor.decompress(data))
+        if not decompressor.eof:
+            raise EOFError("Compressed file ended before the end-of-stream marker was reached.")
+        data = decompressor.unused_data
+    return b"".join(chunks)
+
+#A file-like object decompressing a multistream bz2 dump (as wikimedia's *-multistream.xml.bz2) : batches of independent streams are decompressed by a pool of processes and read back in order
+#The pool is started by spawn rather than fork : streamed dumps are already being read ahead by the thread of _StreamReader, which a forked process would copy in whatever state it is
+class _MultistreamBz2Reader:
+
+    """constructor
+
+    Args:
+    raw (file): compressed dump opened in binary mode
+    workers (int): number of processes decompressing streams
+    batch_size (int): minimal size in bytes of compressed data sent at once to a process
+    """
+    def __init__(self, raw, workers, batch_size=4*1024*1024):
+        self.raw = raw
+        self.workers = workers
+        self.batch_size = batch_size
+        self.pool = multiprocessing.get_context("spawn").Pool(workers)
+        self.chunks = self._decompressed_chunks()
+        self.chunk = b""
+        self.chunk_offset = 0
+
+    #decompresses batches of streams in the pool, yielding them in the order of the dump, while keeping a bounded number of batches in memory
+    def _decompressed_chunks(self):
+        pending_batches = collections.deque()
+        buffer = bytearray()
+        eof = False
+        while not eof:
+            data = self.raw.read(self.batch_size)
+            eof = not data
+            buffer += data
+            #cut at the last stream starting in buffer, unless all the file has been read
+            cut = len(buffer) if eof else _rfind_bz2_stream(buffer, 1)
+            if cut > 0:
+                pending_batches.append(self.pool.apply_async(_decompress_streams, (bytes(buffer[:cut]),)))
+                del buffer[:cut]
+            while pending_batches and (eof or len(pending_batches) > 2 * self.workers):
+                yield pending_batches.popleft().get()
+
+    def read(self, size=-1):
+        while self.chunk_offset >= len(self.chunk):
+            self.chunk = next(self.chunks, None)
+            self.chunk_offset = 0
+            if self.chunk is None:
+                self.chunk = b""
+                return b""
+        if size < 0:
+            size = len(self.chunk) - self.chunk_offset
+        data = self.chunk[self.chunk_offset:self.chunk_offset+size]
+        self.chunk_offset += len(data)
+        return data
+
+    def close(self):
+        self.pool.terminate()
+
+#A file-like object over a dump streamed from an url or from standard input, without intermediate file : chunks are read ahead by a thread (so that the download goes on while pages are parsed) and can be copied in a file as they are read
+class _StreamReader:
+
+    """constructor
+
+    Args:
+    stream (file): binary stream of the dump (http response, standard input)
+    path_to_tee (str): path of the file in which streamed bytes are copied, written as path_to_tee + ".part" and renamed once the whole stream is read (None for no copy)
+    chunk_size (int): size of chunks read at once
+    read_ahead (int): maximum number of chunks read ahead of the parsing
+    """
+    def __init__(self, stream, path_to_tee=None, chunk_size=1024*1024, read_ahead=64):
+        self.stream = stream
+        self.path_to_tee = path_to_tee
+        self.chunks = queue.Queue(read_ahead)
+        self.chunk = b""
+        self.chunk_offset = 0
+        self.offset = 0
+        self.eof = False
+        #set when the reader is closed : "drain" once the dump is parsed (the rest of the stream is still copied), "abort" otherwise
+        self.closing = None
+        self.thread = threading.Thread(target=self._read_stream, args=(chunk_size,), daemon=True)
+        self.thread.start()
+
+    #reads the stream in a thread, passing chunks (then b"" at the end of the stream, or the exception raised) to the parsing
+    def _read_stream(self, chunk_size):
+        tee = open(self.path_to_tee + ".part", "wb") if self.path_to_tee else None
+        try:
+            while self.closing != "abort":
+                chunk = self.stream.read(chunk_size)
+                if tee:
+                    tee.write(chunk)
+                if not self.closing:
+                    self._put(chunk)
+                if not chunk:
+                    #http responses end without error when the connection is lost, before the announced length
+                    if getattr(self.stream, "length", None):
+                        raise IOError("stream ended " + str(self.stream.length) + " bytes before its end.")
+                    break
+            if tee and self.closing != "abort":
+                tee.close()
+                os.replace(self.path_to_tee + ".part", self.path_to_tee)
+        except(Exception):
+            self._put(sys.exc_info()[1])
+        finally:
+            if tee:
+                tee.close()
+            self.stream.close()
+
+    #the queue is bounded, chunks are dropped once the reader is closed
+    def _put(self, item):
+        while not self.closing:
+            try:
+                self.chunks.put(item, timeout=0.1)
+                return
+            except(queue.Full):
+                pass
+
+    def _next_chunk(self):
+        item = self.chunks.get()
+        if isinstance(item, Exception):
+            raise item
+        self.eof = not item
+        return item
+
+    def read(self, size=-1):
+        pieces = []
+        remaining = size
+        while remaining != 0:
+            if self.chunk_offset >= len(self.chunk):
+                if self.eof:
+                    break
+                self.chunk = self._next_chunk()
+                self.chunk_offset = 0
+                continue
+            end = len(self.chunk) if remaining < 0 else self.chunk_offset + remaining
+            piece = self.chunk[self.chunk_offset:end]
+            self.chunk_offset += len(piece)
+            if remaining > 0:
+                remaining -= len(piece)
+            pieces.append(piece)
+        data = b"".join(pieces)
+        self.offset += len(data)
+        return data
+
+    #returns (at least) the next size bytes of the stream without consuming them (less at the end of the stream)
+    def peek(self, size):
+        while len(self.chunk) - self.chunk_offset < size and not self.eof:
+            self.chunk = self.chunk[self.chunk_offset:] + self._next_chunk()
+            self.chunk_offset = 0
+        return self.chunk[self.chunk_offset:]
+
+    #number of bytes read from the stream, for progress
+    def tell(self):
+        return self.offset
+
+    def seekable(self):
+        return False
+
+    """closes the reader
+
+    Args:
+    drain (bool): should the rest of the stream be read, so that its copy is complete (bytes following the dump, once it is parsed), instead of stopping the download
+    """
+    def close(self, drain=False):
+        if self.closing:
+            return
+        self.closing = "drain" if drain else "abort"
+        self.thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close(drain=exc_type is None)
+
+
+#A file-like object over a (decompressed) dump remembering where its last reads started : iterparse gives the events of an element once it has read it, and a page begins a few bytes before its title, so the start of the third to last read is a position before the page being parsed, from which parsing can be resumed
+class _OffsetTrackingReader:
+
+    """constructor
+
+    Args:
+    dump (file): decompressed dump
+    offset (int): offset in the dump of the first byte read
+    head (bytes): bytes read before those of the dump
+    kept_reads (int): number of last reads whose start is kept
+    """
+    def __init__(self, dump, offset=0, head=b"", kept_reads=3):
+        self.dump = dump
+        self.offset = offset
+        self.head = head
+        self.read_starts = collections.deque([offset], maxlen=kept_reads)
+
+    def read(self, size=-1):
+        self.read_starts.append(self.offset)
+        if not self.head:
+            data = self.dump.read(size)
+        elif size < 0:
+            data, self.head = self.head + self.dump.read(), b""
+        else:
+            data, self.head = self.head[:size], self.head[size:]
+        self.offset += len(data)
+        return data
+
+    #offset in the dump before the elements of the last events
+    def position(self):
+        return self.read_starts[0]
+
+
+"""opens a dump for reading, from disk, an url or standard input : streamed dumps are read ahead by a thread (and copied as they are read if path_to_tee is given), bz2 dumps are decompressed as they are read, multistream ones by a pool of processes if workers > 1.
+Used by parse_dump and iter_pages, and by WikidataExtractor for wikidata json dumps
+
+Args:
+path_to_dump (str): path to dump (xml, json or their bz2), http(s) url of dump, or "-" for standard input
+workers (int): number of processes decompressing multistream bz2 dumps (default 1 : decompressed as they are read)
+path_to_tee (str): path of the file in which a streamed dump is copied as it is read (default None : no copy)
+
+Returns:
+tuple(file, file) : compressed dump as it is read (to be closed once the dump is read), and decompressed dump (the same file if the dump is not compressed, to be closed as well otherwise)
+"""
+def open_dump(path_to_dump, workers=1, path_to_tee=None):
+    if _is_streamed(path_to_dump):
+        stream = sys.stdin.buffer if path_to_dump == "-" else urllib.request.urlopen(urllib.request.Request(path_to_dump, headers={"User-Agent": _USER_AGENT}))
+        raw_dump = _StreamReader(stream, path_to_tee)
+        is_bz2 = raw_dump.peek(len(_BZ2_STREAM_MAGIC)).startswith(_BZ2_STREAM_MAGIC)
+    else:
+        raw_dump = open(path_to_dump, 'rb')
+        is_bz2 = path_to_dump.endswith(".bz2")
+    if not is_bz2:
+        return raw_dump, raw_dump
+    if workers > 1 and _is_multistream(raw_dump):
+        return raw_dump, _MultistreamBz2Reader(raw_dump, workers)
+    return raw_dump, bz2.BZ2File(raw_dump)
+
+#a multistream dump has other streams after the first one (of siteinfo)
+def _is_multistream(raw_dump):
+    if isinstance(raw_dump, _StreamReader):
+        return _rfind_bz2_stream(raw_dump.peek(1024*1024), 1) != -1
+    is_multistream = _rfind_bz2_stream(raw_dump.read(16*1024*1024), 1) != -1
+    raw_dump.seek(0)
+    return is_multistream
+
+
+#beginning of a page in xml dumps : its title (escaped), namespace (missing in old dumps) and id
+_PAGE_HEAD = re.compile(rb"<page>\s*<title>([^<]*)</title>\s*(?:<ns>[^<]*</ns>\s*)?<id>([0-9]+)</id>")
+
+"""scans an xml dump (or its decompressed stream) for beginnings of pages, without parsing xml
+
+Args:
+dump (file): xml dump opened in binary mode
+chunk_size (int): size of data read at once
+
+Returns:
+generator(tuple(int, str, str)) : offset of each page in the dump, its id and its title
+"""
+def _scan_page_heads(dump, chunk_size=16*1024*1024):
+    base_offset = 0
+    buffer = b""
+    while True:
+        data = dump.read(chunk_size)
+        buffer += data
+        last_end = 0
+        for matcher in _PAGE_HEAD.finditer(buffer):
+            yield base_offset + matcher.start(), matcher.group(2).decode("utf-8"), _unescape_title(matcher.group(1))
+            last_end = matcher.end()
+        if not data:
+            return
+        #keep a page beginning which may be cut at the end of buffer
+        cut = buffer.rfind(b"<page>", last_end)
+        if cut == -1:
+            cut = max(last_end, len(buffer) - len(b"<page>"))
+        base_offset += cut
+        buffer = buffer[cut:]
+
+#titles are escaped in xml dumps
+def _unescape_title(escaped_title):
+    return xml.sax.saxutils.unescape(escaped_title.decode("utf-8"), {"&quot;": '"', "&#039;": "'", "&apos;": "'"})
+
+"""decompresses a multistream bz2 dump one stream at a time
+
+Args:
+raw (file): compressed dump opened in binary mode
+chunk_size (int): size of compressed data read at once
+
+Returns:
+generator(tuple(int, bytes)) : offset of each stream in the compressed dump, and its decompressed data
+"""
+def _bz2_streams(raw, chunk_size=1024*1024):
+    offset = 0
+    data = raw.read(chunk_size)
+    while data:
+        decompressor = bz2.BZ2Decompressor()
+        stream_offset = offset
+        decompressed = []
+        while not decompressor.eof:
+            if not data:
+                data = raw.read(chunk_size)
+                if not data:
+                    raise EOFError("compressed dump ended before the end of its stream at offset " + str(stream_offset) + ".")
+            decompressed.append(decompressor.decompress(data))
+            if decompressor.eof:
+                offset += len(data) - len(decompressor.unused_data)
+                data = decompressor.unused_data
+            else:
+                offset += len(data)
+                data = b""
+        yield stream_offset, b"".join(decompressed)
+        if not data:
+            data = raw.read(chunk_size)
+
+
+#A section of a page being transformed by toDict : its title and content are kept as offsets in the page (not as strings), until it is turned into a dict.
+#Offsets of all sections of a page are held in one flat array : start and end of the content, then start and end of the title, at 4 times the index of the section
+class _Section:
+
+    __slots__ = ("level", "offsets", "index", "title_index", "more_pieces", "absorb", "tail", "parent", "children")
+
+    """constructor
+
+    Args:
+    offsets (array.array): offsets of the sections of the page, to which those of the section are appended
+    level (int): level of the section (number of equals of its title)
+    start (int): start of the first span of the page forming the content of the section, -1 for a section without content
+    end (int): end of the first span of the content
+    title_start (int): start of the title of the section in the page, -1 for untitled sections (content preceding the first title of a level)
+    title_end (int): end of the title in the page
+    title_index (int): index of the title among the titles of the page, None for untitled sections
+    """
+    def __init__(self, offsets, level, start=-1, end=-1, title_start=-1, title_end=-1, title_index=None):
+        self.level = level
+        self.offsets = offsets
+        self.index = len(offsets) // 4
+        offsets.extend((start, end, title_start, title_end))
+        self.title_index = title_index
+        #offsets of further spans of the content (joined by line breaks), flattened : None for the common section of a single span
+        self.more_pieces = None
+        #whether blank lines at the beginning of the content are to be removed, and a title merged at the end of the content (span, whether blanks before it are removed, whether blank lines at the beginning are removed)
+        self.absorb = False
+        self.tail = None
+        self.parent = None
+        #sections without sub sections share an empty tuple
+        self.children = ()
+
+    def add(self, sub_section):
+        sub_section.parent = self
+        if not self.children:
+            self.children = []
+        self.children.append(sub_section)
+
+    #span of the first piece of the content, None for a section without content
+    def first_piece(self):
+        start = self.offsets[4*self.index]
+        if start < 0:
+            return None
+        return start, self.offsets[4*self.index + 1]
+
+    #replaces the content by a single span
+    def set_piece(self, start, end):
+        self.offsets[4*self.index] = start
+        self.offsets[4*self.index + 1] = end
+        self.more_pieces = None
+
+    def add_piece(self, start, end):
+        if self.offsets[4*self.index] < 0:
+            self.set_piece(start, end)
+        elif self.more_pieces is None:
+            self.more_pieces = [start, end]
+        else:
+            self.more_pieces += (start, end)
+
+    #spans of the page forming the content of the section
+    def pieces(self):
+        first_piece = self.first_piece()
+        if first_piece is None:
+            return []
+        pieces = [first_piece]
+        if self.more_pieces:
+            pieces += zip(self.more_pieces[0::2], self.more_pieces[1::2])
+        return pieces
+
+    #title of the section as written in the page, None for untitled sections
+    def title(self, page):
+        if self.title_index is None:
+            return None
+        return page[self.offsets[4*self.index + 2]:self.offsets[4*self.index + 3]]
+
+
+#A section of a page split by toTree : its title and content are spans of the page, turned into strings (or a dict) only when they are accessed
+class SectionNode:
+
+    __slots__ = ("tree", "section")
+
+    """constructor
+
+    Args:
+    tree (PageTree): tree of sections of the page
+    section (_Section): spans of the section
+    """
+    def __init__(self, tree, section):
+        self.tree = tree
+        self.section = section
+
+    #level of the section (number of equals of its title)
+    @property
+    def level(self):
+        return self.section.level
+
+    #title of the section as written in the page (i.e. "{{S|nom|fr}}"), None for untitled sections
+    @property
+    def title(self):
+        return self.section.title(self.tree.page)
+
+    #text of the section before its sub sections, as given to content_extraction_funct by toDict
+    @property
+    def content(self):
+        return self.tree.parser._section_content(self.tree.page, self.section)
+
+    @property
+    def children(self):
+        return [SectionNode(self.tree, sub_section) for sub_section in self.section.children]
+
+    """sections nested in this one, depth first in order of the page
+
+    Returns:
+    generator(SectionNode) : sub sections, and their own sub sections
+    """
+    def iter_sections(self):
+        for sub_section in self.section.children:
+            node = SectionNode(self.tree, sub_section)
+            yield node
+            yield from node.iter_sections()
+
+    """first section nested in this one (at any depth) whose title matches a regular expression
+
+    Args:
+    title_regex (str): regular expression searched in titles as written in the page
+
+    Returns:
+    SectionNode : matching section, None if there is none
+    """
+    def find(self, title_regex):
+        regex = self.tree.parser._compile(title_regex)
+        for node in self.iter_sections():
+            if node.title is not None and regex.search(node.title):
+                return node
+        return None
+
+    """dict of the section, the one toDict gives for it within the whole page (its context titles are the normalized titles of the sections it is in)
+
+    Args:
+    see toDict
+
+    Returns:
+    dictionary: a dictionary representing the content of the section
+    """
+    def to_dict(self, section_titles_normalisation_funct=lambda expr, context_titles: {expr}, content_extraction_funct=lambda content, context_titles : content, add_empty_contents=False, content_attribute_name="content", default_attribute_name="unnamed"):
+        return self.tree.parser._tree_to_dict(self.tree, self.section, section_titles_normalisation_funct, content_extraction_funct, add_empty_contents, content_attribute_name, default_attribute_name)
+
+    def __repr__(self):
+        return "SectionNode(level=" + str(self.level) + ", title=" + repr(self.title) + ")"
+
+#The tree of sections of a page built by toTree : the page itself is its root section, whose to_dict gives the same dict as toDict
+class PageTree(SectionNode):
+
+    __slots__ = ("parser", "page", "context_titles", "root", "first_unbalanced_title", "has_titles", "resplit")
+
+    """constructor
+
+    Args:
+    parser (WikiPageParser): parser which split the page
+    page (str): full page or section
+    context_titles (list(str)): succesion of titles in which the page is nested
+    root (_Section): section of the whole page
+    first_unbalanced_title (tuple(int, str)): index and expression of the first title of the page with unbalanced equals, raising an error in to_dict (None if there is none)
+    has_titles (bool): does the page have titles (default True)
+    resplit (bool): is the dict of the whole page built by splitting its sections again at each level, as titles spanning lines made of equal signs only are matched differently once their section is rebuilt (default False)
+    """
+    def __init__(self, parser, page, context_titles, root, first_unbalanced_title, has_titles=True, resplit=False):
+        super().__init__(self, root)
+        self.parser = parser
+        self.page = page
+        self.context_titles = context_titles
+        self.root = root
+        self.first_unbalanced_title = first_unbalanced_title
+        self.has_titles = has_titles
+        self.resplit = resplit
+
+    def to_dict(self, section_titles_normalisation_funct=lambda expr, context_titles: {expr}, content_extraction_funct=lambda content, context_titles : content, add_empty_contents=False, content_attribute_name="content", default_attribute_name="unnamed"):
+        return self.parser._tree_to_dict(self, None, section_titles_normalisation_funct, content_extraction_funct, add_empty_contents, content_attribute_name, default_attribute_name)
+
+    def __repr__(self):
+        return "PageTree(" + repr("/".join(self.context_titles)) + ")"
+
+
+"""marks a pure function (always giving the same result for the same expression and context) as cacheable : its results are memoized by parsers built with a cache_size, when it is given as section_titles_normalisation_funct, or as function or post-processing function of norm_bracket_expr.
+Errors it raises are never cached. Can be used as @cacheable or @cacheable(context=...)
+
+Args:
+funct (funct): function (str:expr, list(str):context_titles) -> object
+context (int): number of innermost context titles the result depends on (default 0 : only on the expression), None for the whole context
+
+Returns:
+funct : the same function, marked
+"""
+def cacheable(funct=None, context=0):
+    def mark(funct):
+        #methods are marked through their function
+        getattr(funct, "__func__", funct).cache_context = context
+        return funct
+    if funct is None:
+        return mark
+    return mark(funct)
+
+#default post-processing function of norm_bracket_expr
+@cacheable
+def _unchanged(expr, context_titles):
+    return expr
+
+#A bounded cache of results (least recently used ones are dropped first) counting its hits and misses, in the stats of parsing as well when it is given ones
+class MemoCache:
+
+    """constructor
+
+    Args:
+    name (str): name of cache, prefixing its counters in stats ("<name>_cache_hits" and "<name>_cache_misses")
+    maxsize (int): maximum number of results kept
+    """
+    def __init__(self, name, maxsize):
+        self.name = name
+        self.maxsize = maxsize
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.stats = None
+
+    #cached result of key (None if there is none)
+    def get(self, key):
+        result = self.entries.get(key)
+        if result is None:
+            self.misses += 1
+            if self.stats:
+                self.stats.count(self.name + "_cache_misses")
+        else:
+            self.hits += 1
+            if self.stats:
+                self.stats.count(self.name + "_cache_hits")
+            self.entries.move_to_end(key)
+        return result
+
+    def put(self, key, result):
+        self.entries[key] = result
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def to_dict(self):
+        lookups = self.hits + self.misses
+        return {"size":len(self.entries), "maxsize":self.maxsize, "hits":self.hits, "misses":self.misses, "hit_rate":round(self.hits / lookups, 4) if lookups else None}
+
+
 #A general parser for wiki pages (from Wiktionary or Wikipedia), converts html dumps into its equivalent dict structure, respecting nested structure of its sections.
 '''
 page_title: {
@@ -53,12 +691,15 @@ class WikiPageParser:
     ign (bool): if set to true, 'ignore' out of range errors during title normalization. Such errors will than be printed in error file, instead of stoping execution, and title won't be normalized.
     targeted_title (str) : in order to build the regex, we need to know the titles of bracketed expressions which we want to extract
     print_to_std (bool) : do we want the output also printed to terminal
+    cache_size (int) : number of results of cacheable functions kept by each cache (normalization of titles, normalization of bracketed expressions), no cache is used if 0 (default 0)
     """
-    def __init__(self, ignore=True, targeted_title=None, print_to_std=False):
+    def __init__(self, ignore=True, targeted_title=None, print_to_std=False, cache_size=0):
         #a couple of regular expressions which will be used by the parser
         #... to detect sections and titles
         self.regex_potential_section_title = re.compile("(\s*=={,7}\s*.*\s*[^=]=={,7}\s*)\n")
         self.regex_section_title_group_matcher = re.compile("(=={,7})\s*(.*\s*[^=])(=={,7})\s*$")
+        self.regex_leading_blank_lines = re.compile("\s*\n")
+        self.regex_equals_only_line = re.compile("(^|\n)\s*=+\s*(\n|$)")
         #... to detect bracketed expressions
         self.curly_bracketed_expr = re.compile("{{([^}])*}}")
         self.square_bracketed_expr = re.compile("\[\[([^\]])*\]\]")
@@ -66,10 +707,23 @@ class WikiPageParser:
         conc_reg = targeted_title+"\|" if targeted_title else ""
         self.titled_curly_bracketed_expr = re.compile("{{"+conc_reg+"([^}])*}}")
         self.titled_square_bracketed_expr = re.compile("\[\["+conc_reg+"([^\]])*\]\]")
+        #... built on the go, once compiled
+        self.compiled_regexes = {}
+        #tags of elements of dumps read by parse_dump
+        self.dump_tags = ["{*}" + tag for tag in ["page", "title", "ns", "id", "redirect", "text", "sha1"]]
+        #page indexes of dumps loaded by parse_page(s), by path of index
+        self.page_indexes = {}
+        #token regular expressions of scan_bracket_expr, by brackets
+        self.bracket_tokens = {}
+        #caches of results of cacheable functions, by kind of normalization (None when disabled), and last title normalization function memoized with its memoized version
+        self.caches = None
+        if cache_size:
+            self.caches = {name:MemoCache(name, cache_size) for name in ["title_normalisation", "bracket_normalisation"]}
+        self.memoized_title_funct = (None, None)
         self.ignore = ignore
         self.print_to_std = print_to_std
 
-    """this function reccursively transforms a wiki page into its equivalent dictionary form
+    """this function transforms a wiki page into its equivalent dictionary form. The page is scanned once for section titles, its nested sections are then built from a stack of titles and only slices of the page are given to content_extraction_funct
     
     Args:
     str_section (str): full page or section
@@ -79,196 +733,972 @@ class WikiPageParser:
     add_empty_contents (bool) : set to True if you want to keep (key, value) pairs for "content" key when value is empty
     content_attribute_name (str) : if you want "content" section to be named differently change this argement
     default_attribute_name (str) : Default name of title variables when none found
-    section_level (int) : reccursive arguement, not to be set externally  (default : 1)
+    section_level (int) : level of str_section, titles of level section_level + 1 are its sub sections (default : 1, a full page)
 
     Returns:
     dictionary: a dictionary representing the content of the wiki
     """
     def toDict(self, str_section, context_titles, section_titles_normalisation_funct, content_extraction_funct, add_empty_contents, content_attribute_name, default_attribute_name, section_level=1):
-        local_context_titles = context_titles.copy()
+        return self._tree_to_dict(self.toTree(str_section, context_titles, section_level), None, section_titles_normalisation_funct, content_extraction_funct, add_empty_contents, content_attribute_name, default_attribute_name)
 
-        #page is splitted over potential titles
-        splitted_page = self.regex_potential_section_title.split(str_section)
-        parsed_dict = {}
+    """this function splits a wiki page into the tree of its sections, without copying it : sections only hold spans of the page, their titles and contents being turned into strings (or dicts) when they are accessed.
+    It is lighter than toDict when only a few sections of pages are used, to_dict of the tree giving the same dict as toDict.
+
+    Args:
+    str_section (str): full page or section
+    context_titles (list(str)): succesion of titles in which current section is nested
+    section_level (int) : level of str_section, titles of level section_level + 1 are its sub sections (default : 1, a full page)
+
+    Returns:
+    PageTree : tree of sections of the page
+    """
+    def toTree(self, str_section, context_titles, section_level=1):
+        #page is scanned once over potential titles
+        title_matches = list(self.regex_potential_section_title.finditer(str_section))
+
+        #page without any title is only content
+        if not title_matches:
+            return PageTree(self, str_section, context_titles, _Section(array.array("l"), section_level, 0, len(str_section)), None, False)
+
+        page_section, title_groups = self._tokenize_sections(str_section, title_matches, section_level)
+        #first title with unbalanced equals, the only one raising an error (kept instead of matches of all titles)
+        first_unbalanced_title = None
+        for title_index, section_title_group_matcher in enumerate(title_groups):
+            if not section_title_group_matcher.group(1) == section_title_group_matcher.group(3):
+                first_unbalanced_title = (title_index, section_title_group_matcher.group(0))
+                break
+        #a potential title spanning a line made of equal signs only (i.e. "====") is matched differently once its section is rebuilt without the lines following it
+        resplit = any(self.regex_equals_only_line.search(title_match.group(1).strip()) for title_match in title_matches)
+        return PageTree(self, str_section, context_titles, page_section, first_unbalanced_title, True, resplit)
+
+    """builds the dict of a section of a tree of sections, as toDict does for the whole page
 
-        #initialisation of reccurence
-        if len(splitted_page) == 1:
-            content = content_extraction_funct(str_section, local_context_titles)
+    Args:
+    tree (PageTree): tree of sections of a page
+    section (_Section): section to transform, None for the whole page (whose titles are then checked)
+    (other args as in toDict)
+
+    Returns:
+    dictionary: a dictionary representing the content of the section
+    """
+    def _tree_to_dict(self, tree, section, section_titles_normalisation_funct, content_extraction_funct, add_empty_contents, content_attribute_name, default_attribute_name):
+        if content_attribute_name == "":
+            content_attribute_name = default_attribute_name
+        str_section = tree.page
+        context_titles = tree.context_titles
+
+        #page without any title is only content
+        if section is None and not tree.has_titles:
+            parsed_dict = {}
+            content = content_extraction_funct(str_section, context_titles.copy())
             if not(len(content) == 0 and not add_empty_contents):
-                if content_attribute_name == "":
-                    content_attribute_name = default_attribute_name
                 parsed_dict[content_attribute_name] = content
             return parsed_dict
 
-        #"content" for this level of reccursion
+        #normalized titles of cacheable function are memoized
+        if self.caches and hasattr(section_titles_normalisation_funct, "cache_context"):
+            if not self.memoized_title_funct[0] is section_titles_normalisation_funct:
+                self.memoized_title_funct = (section_titles_normalisation_funct, self._memoized(section_titles_normalisation_funct, self.caches["title_normalisation"]))
+            section_titles_normalisation_funct = self.memoized_title_funct[1]
+
+        #whole page whose titles are matched differently at each level
+        if section is None and tree.resplit:
+            return self._resplit_to_dict(str_section, context_titles, section_titles_normalisation_funct, content_extraction_funct, add_empty_contents, content_attribute_name, default_attribute_name, tree.root.level)
+
+        #sub section of page, in the context of the normalized titles of the sections it is in
+        if section is not None:
+            section_context_titles = context_titles.copy()
+            for enclosing_section in self._enclosing_sections(section):
+                section_context_titles.append(self._normalized_title(str_section, enclosing_section, section_context_titles, section_titles_normalisation_funct))
+            return self._section_to_dict(str_section, section, section_context_titles, section_titles_normalisation_funct, content_extraction_funct, add_empty_contents, content_attribute_name, default_attribute_name)
+
+        #titles are checked in order of the page, each one before the sub section preceding it is parsed : the first unbalanced title raises an error once titles up to it are checked
+        first_unbalanced_title = tree.first_unbalanced_title
+        def check_titles(until):
+            #unexpected syntax error in page
+            if first_unbalanced_title and (until is None or first_unbalanced_title[0] < until):
+                raise InputError("/".join(context_titles), first_unbalanced_title[1], "unbalanced_equals")
+
+        return self._section_to_dict(str_section, tree.root, context_titles.copy(), section_titles_normalisation_funct, content_extraction_funct, add_empty_contents, content_attribute_name, default_attribute_name, check_titles)
+
+    """builds the dict of a section by splitting it over its potential titles, then each of its sub sections rebuilt as strings, again at the next level.
+    Only used for pages having potential titles spanning lines made of equal signs only : such a title may only be matched on some of its lines in its rebuilt sub section (i.e. "=== B ===" followed by a line "==="), or raise an "unbalanced_equals" error there.
+
+    Args:
+    (as in toDict)
+
+    Returns:
+    dictionary: a dictionary representing the content of the section
+    """
+    def _resplit_to_dict(self, str_section, context_titles, section_titles_normalisation_funct, content_extraction_funct, add_empty_contents, content_attribute_name, default_attribute_name, section_level):
+        local_context_titles = context_titles.copy()
+        splitted_page = self.regex_potential_section_title.split(str_section)
+        parsed_dict = {}
+
+        #"content" for this level of recursion
         header = splitted_page.pop(0)
-        if header:
+        if header or not splitted_page:
             content = content_extraction_funct(header, local_context_titles)
             if not(len(content) == 0 and not add_empty_contents):
-                if content_attribute_name == "":
-                    content_attribute_name = default_attribute_name
                 parsed_dict[content_attribute_name] = content
+        if not splitted_page:
+            return parsed_dict
 
-        i = -1
         current_title = ""
-        last_title = ""
         last_sub_section = ""
-        #looping through splits
-        for split in splitted_page:
-            i+=1
-            #split is a potential title
-            if i%2 == 0:
-                #matches and groups from titles
-                section_title_group_matcher = self.regex_section_title_group_matcher.search(split)
-                whole_match = section_title_group_matcher.group(0)
-                left_equals = section_title_group_matcher.group(1)
-                right_equals = section_title_group_matcher.group(3)
-                
-                #unexpected syntax error in page
-                if not left_equals == right_equals:
-                    raise InputError("/".join(context_titles), whole_match, "unbalanced_equals")
-
-                #title is of expected level for this reccursion step
-                if len(left_equals) == section_level + 1:
-                    #extract title group from regex
-                    last_title = current_title
-                    current_title = section_title_group_matcher.group(2)
-                    #normalization function outputs a set, title normalization should be of only one element
-                    try:
-                        set_output_normalization_function = section_titles_normalisation_funct(current_title, local_context_titles)
-                        if len(set_output_normalization_function) > 1:
-                            #TODO(2) find a better exception type
-                            raise Exception(str("normalization function for title unexpectedly returned a set of more than 1 element : ", set_output_normalization_function))
-                        current_title = set_output_normalization_function.pop()
-                    except(InputError):
-                            current_title = current_title
-
-                    #add to parsed_dict last parsed sub section if exists
-                    if last_sub_section:
-                        local_context_titles.append(last_title)
-                        #adding parsed section to dict
-                        if last_title == "":
-                            last_title = default_attribute_name
-                        parsed_dict[last_title] = self.toDict(last_sub_section.rstrip("\n"), local_context_titles, section_titles_normalisation_funct, content_extraction_funct, add_empty_contents, content_attribute_name, default_attribute_name, section_level+1)
-                        local_context_titles.pop(-1)
-                        last_sub_section = ""
-                #title is of a subtitle
-                elif len(left_equals) > section_level + 1:
-                    last_sub_section += "\n"+whole_match+"\n"
-            #split is a section
-            else:
-                last_sub_section += split+"\n"
+        for i in range(0, len(splitted_page), 2):
+            section_title_group_matcher = self.regex_section_title_group_matcher.search(splitted_page[i])
+            title_level = len(section_title_group_matcher.group(1))
+            #unexpected syntax error in page
+            if not section_title_group_matcher.group(1) == section_title_group_matcher.group(3):
+                raise InputError("/".join(context_titles), section_title_group_matcher.group(0), "unbalanced_equals")
+
+            #title is of expected level : the preceding sub section is parsed
+            if title_level == section_level + 1:
+                last_title = current_title
+                current_title = self._normalized_title_of(section_title_group_matcher.group(2), local_context_titles, section_titles_normalisation_funct)
+                if last_sub_section:
+                    local_context_titles.append(last_title)
+                    parsed_dict[last_title or default_attribute_name] = self._resplit_to_dict(last_sub_section.rstrip("\n"), local_context_titles, section_titles_normalisation_funct, content_extraction_funct, add_empty_contents, content_attribute_name, default_attribute_name, section_level + 1)
+                    local_context_titles.pop(-1)
+                    last_sub_section = ""
+            #title of a deeper sub section
+            elif title_level > section_level + 1:
+                last_sub_section += "\n" + section_title_group_matcher.group(0) + "\n"
+            last_sub_section += splitted_page[i+1] + "\n"
 
-        #adding last parsed section to dict
         local_context_titles.append(current_title)
-        parsed_dict[current_title] = self.toDict(last_sub_section.rstrip("\n"), local_context_titles, section_titles_normalisation_funct, content_extraction_funct, add_empty_contents, content_attribute_name, default_attribute_name, section_level+1)
-        local_context_titles.pop(-1)
+        parsed_dict[current_title] = self._resplit_to_dict(last_sub_section.rstrip("\n"), local_context_titles, section_titles_normalisation_funct, content_extraction_funct, add_empty_contents, content_attribute_name, default_attribute_name, section_level + 1)
+        return parsed_dict
+
+    #sections in which a section is nested (from the outermost one, page excluded) and the section itself
+    def _enclosing_sections(self, section):
+        enclosing_sections = []
+        while section.parent is not None:
+            enclosing_sections.append(section)
+            section = section.parent
+        return enclosing_sections[::-1]
+
+    """splits a page into its nested sections in a single pass over its titles, using a stack of the sections currently opened
+
+    Args:
+    page (str): full page or section
+    title_matches (list(re.Match)): matches of regex_potential_section_title in page
+    section_level (int): level of page
+
+    Returns:
+    tuple(_Section, list(re.Match)) : the section of the whole page, and the matches of regex_section_title_group_matcher for each title
+    """
+    def _tokenize_sections(self, page, title_matches, section_level):
+        offsets = array.array("l")
+        page_section = _Section(offsets, section_level, 0, title_matches[0].start())
+        title_groups = []
+        #spans of whole titles (followed by the end of their closing equals), only used while tokenizing
+        whole_matches = {}
+        opened_sections = [page_section]
+        for i, title_match in enumerate(title_matches):
+            section_title_group_matcher = self.regex_section_title_group_matcher.search(title_match.group(1))
+            title_groups.append(section_title_group_matcher)
+            title_level = len(section_title_group_matcher.group(1))
+            #content of a title runs until next title
+            content_start = title_match.end()
+            content_end = title_matches[i+1].start() if i+1 < len(title_matches) else len(page)
+
+            #titles of lower level than page are ignored, their content goes on the deepest opened section
+            if title_level <= section_level:
+                section = opened_sections[-1]
+                if section is page_section:
+                    section = _Section(offsets, section_level + 1, content_start, content_end)
+                    page_section.add(section)
+                    opened_sections.append(section)
+                else:
+                    section.add_piece(content_start, content_end)
+                    section.absorb = section.parent is not page_section
+                continue
+
+            #close sections of same or deeper level, then open missing levels as untitled sections
+            while opened_sections[-1].level >= title_level:
+                opened_sections.pop()
+            while opened_sections[-1].level + 1 < title_level:
+                section = _Section(offsets, opened_sections[-1].level + 1)
+                opened_sections[-1].add(section)
+                opened_sections.append(section)
+            offset = title_match.start(1)
+            section = _Section(offsets, title_level, content_start, content_end, offset + section_title_group_matcher.start(2), offset + section_title_group_matcher.end(2), i)
+            whole_matches[i] = (offset + section_title_group_matcher.start(), offset + section_title_group_matcher.end(), offset + section_title_group_matcher.end(3))
+            opened_sections[-1].add(section)
+            opened_sections.append(section)
+
+        for section in page_section.children:
+            self._merge_unterminated_titles(page, section, whole_matches)
+        return page_section, title_groups
+
+    """A title ending a section with no content after it is not followed by a line break once the section is stripped, so it is not a title but content of what precedes it. Such titles are merged back into preceding content, from the outermost sections down.
+
+    Args:
+    page (str): full page
+    section (_Section): section in which the last title is checked
+    whole_matches (dict(int, tuple(int))): span of each title of sections by its index, followed by the end of its closing equals
+    """
+    def _merge_unterminated_titles(self, page, section, whole_matches):
+        last_section = section
+        while last_section.children:
+            last_section = last_section.children[-1]
+        if last_section is not section and not self._section_content(page, last_section):
+            whole_match_start, whole_match_end, equals_end = whole_matches[last_section.title_index]
+            while whole_match_end > whole_match_start and page[whole_match_end-1] == "\n":
+                whole_match_end -= 1
+            line_break = page.rfind("\n", equals_end, whole_match_end)
+            if line_break != -1:
+                #remaining blanks after a line break are content of the title
+                last_section.set_piece(line_break + 1, whole_match_end)
+            else:
+                #remove the title and the untitled sections it was the only sub section of
+                previous_section = last_section.parent
+                previous_section.children.pop()
+                while previous_section is not section and previous_section.title_index is None and previous_section.first_piece() is None and not previous_section.children:
+                    previous_section = previous_section.parent
+                    previous_section.children.pop()
+                while previous_section.children:
+                    previous_section = previous_section.children[-1]
+                previous_section.tail = (whole_match_start, whole_match_end, section.parent.parent is not None, previous_section is not section)
+        for sub_section in section.children[:-1]:
+            self._merge_unterminated_titles(page, sub_section, whole_matches)
+        if section.children:
+            self._merge_unterminated_titles_of_last(page, section.children[-1], whole_matches)
+
+    #the last sub section of a section shares its last title, only its own sub sections (but the last one) are checked
+    def _merge_unterminated_titles_of_last(self, page, section, whole_matches):
+        for sub_section in section.children[:-1]:
+            self._merge_unterminated_titles(page, sub_section, whole_matches)
+        if section.children:
+            self._merge_unterminated_titles_of_last(page, section.children[-1], whole_matches)
+
+    """returns the content of a section (text before its sub sections)
+
+    Args:
+    page (str): full page
+    section (_Section): section
+
+    Returns:
+    str : content of the section
+    """
+    def _section_content(self, page, section):
+        #content of the page itself is kept as it is
+        first_piece = section.first_piece()
+        if section.parent is None:
+            return page[first_piece[0]:first_piece[1]]
+        if first_piece is not None and section.more_pieces is None and not section.tail:
+            start, end = first_piece
+            while end > start and page[end-1] == "\n":
+                end -= 1
+            return page[start:end]
+        content = "\n".join([page[start:end] for start, end in section.pieces()])
+        #blank lines following a title are not part of its content
+        if section.absorb:
+            content = self._strip_leading_blank_lines(content)
+        if not section.tail:
+            return content.rstrip("\n")
+
+        #a title merged at the end of the content
+        tail_start, tail_end, strip_blanks, absorb = section.tail
+        if first_piece is None:
+            content = "\n" + page[tail_start:tail_end]
+        else:
+            #blanks preceding the title were part of it in enclosing sections
+            if strip_blanks:
+                content = content.rstrip()
+            content = "".join([content, "\n\n", page[tail_start:tail_end]])
+        if absorb:
+            content = self._strip_leading_blank_lines(content)
+        return content
+
+    #removes blank lines at the beginning of a content, as a title preceding it would have matched them
+    def _strip_leading_blank_lines(self, content):
+        blank_lines = self.regex_leading_blank_lines.match(content)
+        if blank_lines:
+            return content[blank_lines.end():]
+        return content
+
+    """builds the dictionary of a section : its content then its sub sections, parsed one after the other as their titles are normalized
+
+    Args:
+    page (str): full page
+    section (_Section): section to transform
+    local_context_titles (list(str)): succesion of titles in which the section is nested (including its own)
+    check_titles (funct): function int -> None checking titles of the page up to given index, or all of them if None (only for the page itself)
+    (other args as in toDict)
+
+    Returns:
+    dictionary: a dictionary representing the content of the section
+    """
+    def _section_to_dict(self, page, section, local_context_titles, section_titles_normalisation_funct, content_extraction_funct, add_empty_contents, content_attribute_name, default_attribute_name, check_titles=None):
+        parsed_dict = {}
+        content = self._section_content(page, section)
+        #content of a section with sub sections is only kept if not empty
+        if content or not section.children:
+            content = content_extraction_funct(content, local_context_titles)
+            if not(len(content) == 0 and not add_empty_contents):
+                parsed_dict[content_attribute_name] = content
 
+        #adds a parsed sub section to dict
+        def add_sub_section(sub_section, title, is_last):
+            local_context_titles.append(title)
+            if title == "" and not is_last:
+                title = default_attribute_name
+            parsed_dict[title] = self._section_to_dict(page, sub_section, local_context_titles, section_titles_normalisation_funct, content_extraction_funct, add_empty_contents, content_attribute_name, default_attribute_name)
+            local_context_titles.pop(-1)
+
+        last_sub_section = None
+        last_title = ""
+        for sub_section in section.children:
+            if check_titles and sub_section.title_index is not None:
+                check_titles(sub_section.title_index + 1)
+            current_title = self._normalized_title(page, sub_section, local_context_titles, section_titles_normalisation_funct)
+            if last_sub_section:
+                add_sub_section(last_sub_section, last_title, False)
+            last_sub_section = sub_section
+            last_title = current_title
+
+        if check_titles:
+            check_titles(None)
+        if last_sub_section:
+            add_sub_section(last_sub_section, last_title, True)
         return parsed_dict
 
+    """normalized title of a section, as key of its dict and in context titles of its sub sections
+
+    Args:
+    page (str): full page
+    section (_Section): section
+    context_titles (list(str)): succesion of titles in which the section is nested
+    section_titles_normalisation_funct (funct): function normalizing titles (see toDict)
+
+    Returns:
+    str : normalized title, the title itself if it could not be normalized, "" for untitled sections
+    """
+    def _normalized_title(self, page, section, context_titles, section_titles_normalisation_funct):
+        title = section.title(page)
+        if title is None:
+            return ""
+        return self._normalized_title_of(title, context_titles, section_titles_normalisation_funct)
+
+    #normalized title (see _normalized_title), the title itself if it could not be normalized
+    def _normalized_title_of(self, title, context_titles, section_titles_normalisation_funct):
+        #normalization function outputs a set, title normalization should be of only one element
+        try:
+            set_output_normalization_function = section_titles_normalisation_funct(title, context_titles)
+            if len(set_output_normalization_function) > 1:
+                #TODO(2) find a better exception type
+                raise Exception("normalization function for title unexpectedly returned a set of more than 1 element : " + str(set_output_normalization_function))
+            return set_output_normalization_function.pop()
+        except(InputError):
+            return title
+
+    """this function lazily parses all wiki pages from an xml dump, yielding them as they are parsed instead of writing them (see parse_dump for the arguments shared with it)
+    
+    Args:
+    path_to_dump (str): path to dump that is to be parsed (xml, or bz2 which is decompressed while it is parsed), or http(s) url of dump, or "-" for standard input : such dumps are streamed into the parsing without intermediate file
+    section_titles_normalisation_funct (funct): function str, list(str) -> set(str) applied on section titles to normalize them, returning a set of the normalized title (default is left unchanged)
+    content_extraction_funct (funct): function  (str:content, list_str:titles_context) -> printable_object ; applied on values of "content" keys with information of titles context in which section is nested (default is left unchanged) 
+    add_empty_contents (bool) : set to True if you want to keep (key, value) pairs for "content" key when value is empty (default is set to False)
+    content_attribute_name (str) : if you want "content" section to be named differently change this argement (default : "content")
+    default_attribute_name (str) : Default name of title variables when none found (default 'unnamed')
+    workers (int) : number of worker processes parsing pages, pages are still yielded in the order of the dump (default 1)
+    pages_per_task (int) : number of pages sent at once to a worker process (default 64)
+    page_filter (PageFilter) : filter of pages, rejected pages are neither extracted, parsed nor yielded (default None : all pages are parsed)
+    stats (ParseStats) : stats in which time spent in each stage, counters and slowest pages are recorded, and periodically reported (default None : no instrumentation)
+    error_callback (funct) : function InputError -> None called with errors of pages (default None : errors are yielded)
+    path_to_tee (str) : path of the file in which a dump streamed from an url or standard input is copied as it is parsed (default None : no copy)
 
+    Returns:
+    generator : for each page in the order of the dump, a tuple (title, id, ns, parsed_dict) with parsed_dict as returned by toDict, or the InputError raised while parsing it (if there is no error_callback)
+    """
+    def iter_pages(self, path_to_dump, section_titles_normalisation_funct=lambda expr, context_titles: {expr}, content_extraction_funct=lambda content, context_titles : content, add_empty_contents=False, content_attribute_name="content", default_attribute_name="unnamed", workers=1, pages_per_task=64, page_filter=None, stats=None, error_callback=None, path_to_tee=None):
+        parsing_args = (section_titles_normalisation_funct, content_extraction_funct, add_empty_contents, content_attribute_name, default_attribute_name)
+        for page_mark, (is_error, parsed) in self._iter_results(path_to_dump, parsing_args, None, workers, pages_per_task, page_filter, stats, path_to_tee=path_to_tee):
+            if is_error and error_callback:
+                error_callback(parsed)
+            else:
+                yield parsed
 
     """this function parses all wiki pages from an xml dump 
     
     Args:
     lang (str): language of wiki dump
-    path_to_dump (str): path to dump that is to be parsed
+    path_to_dump (str): path to dump that is to be parsed (xml, or bz2 which is decompressed while it is parsed), or http(s) url of dump, or "-" for standard input : such dumps are streamed into the parsing without intermediate file
     path_to_output (str): path to output file which will contain the json resulting from the parsing
     path_to_errors (str): path to file which will contain syntax errors detected during the parsing
-    section_titles_normalisation_funct (funct): function str, list(str) -> str applied on section titles to normalize them (default is left unchanged)
+    section_titles_normalisation_funct (funct): function str, list(str) -> set(str) applied on section titles to normalize them, returning a set of the normalized title (default is left unchanged)
     content_extraction_funct (funct): function  (str:content, list_str:titles_context) -> printable_object ; applied on values of "content" keys with information of titles context in which section is nested (default is left unchanged) 
     add_empty_contents (bool) : set to True if you want to keep (key, value) pairs for "content" key when value is empty (default is set to False)
     content_attribute_name (str) : if you want "content" section to be named differently change this argement (default : "content")
     refresh_bar_frequency (int) : number of parsed pages after which progress bar is refreshed 
     default_attribute_name (str) : Default name of title variables when none found (default 'unnamed')
+    workers (int) : number of worker processes parsing pages. With more than one worker, the main process only streams pages out of the dump while a pool of forked processes runs toDict and serialization; output keeps the order of the dump. Independent streams of multistream bz2 dumps are also decompressed by that many processes (default 1 : everything runs in the main process)
+    pages_per_task (int) : number of pages sent at once to a worker process (default 64)
+    output_format (str) : either "pretty" for indented '"title": {...},' entries (easier to read while debugging), or "jsonl" for one compact {"title", "id", "ns", "content"} object per line, serialized with orjson when it is installed, or "sqlite" for a database of pages and extracted values written by batches of output_buffer_size pages (see SqliteSink) (default "pretty")
+    output_buffer_size (int) : number of parsed pages written at once to output file (default 1000)
+    page_filter (PageFilter) : filter of pages checked as soon as their title, namespace and redirection are read, rejected pages are neither extracted, parsed nor written (default None : all pages are parsed)
+    checkpoint_frequency (int) : number of written pages after which a checkpoint is saved in path_to_output + ".checkpoint" : position in the dump before the last written page, id of this page and positions of output and errors files (default None : no checkpoint). The checkpoint is removed once the dump is fully parsed
+    resume (bool) : should parsing restart from the checkpoint of a previous run (if there is one), appending to its output and errors files truncated to their checkpointed positions, instead of starting over (default False)
+    stats (ParseStats) : stats in which time spent in each stage, counters and slowest pages are recorded, and periodically reported (default None : no instrumentation)
+    path_to_store (str) : path of RevisionStore database for incremental parsing : pages whose revision id and sha1 are the same as in previous run reuse their result instead of being parsed again, and pages of previous run missing from the dump are written in path_to_output + ".deleted" (default None : every page is parsed)
+    config (object) : json serializable description of parsing functions (i.e. their options), hashed with other parsing arguments and the code of parsing functions so that results are only reused with the same configuration (required with path_to_store : options held by parsing functions, as those of an ExtractionPlan, are not seen in their code)
+    path_to_tee (str) : path of the file in which a dump streamed from an url or standard input is copied as it is parsed, written as path_to_tee + ".part" until the whole stream is read (default None : no copy)
     
     Returns:
     None
     """
-    def parse_dump(self, lang, path_to_dump, path_to_output, path_to_errors, section_titles_normalisation_funct=lambda expr, context_titles: expr, content_extraction_funct=lambda content, context_titles : content, add_empty_contents=False, content_attribute_name="content", default_attribute_name="unnamed", refresh_bar_frequency = 100000):
-        
-        def strip_tag_name(t):
-            t = elem.tag
-            idx = k = t.rfind("}")
-            if idx != -1:
-                t = t[idx + 1:]
-            return t
+    def parse_dump(self, lang, path_to_dump, path_to_output, path_to_errors, section_titles_normalisation_funct=lambda expr, context_titles: {expr}, content_extraction_funct=lambda content, context_titles : content, add_empty_contents=False, content_attribute_name="content", default_attribute_name="unnamed", refresh_bar_frequency = 100000, workers=1, pages_per_task=64, output_format="pretty", output_buffer_size=1000, page_filter=None, checkpoint_frequency=None, resume=False, stats=None, path_to_store=None, config=None, path_to_tee=None):
+
+        #arguments of toDict which are the same for every page
+        parsing_args = (section_titles_normalisation_funct, content_extraction_funct, add_empty_contents, content_attribute_name, default_attribute_name)
+
+        if output_format not in ["pretty", "jsonl", "sqlite"]:
+            raise ValueError("output_format should be either 'pretty', 'jsonl' or 'sqlite'.")
 
-        #init ouput files handler
-        out = open(path_to_output, "w")
-        errors = open(path_to_errors, "w")
+        #checkpoint of a previous run to resume from
+        path_to_checkpoint = path_to_output + ".checkpoint"
+        checkpoint = None
+        if resume and os.path.exists(path_to_checkpoint):
+            with open(path_to_checkpoint) as checkpoint_file:
+                checkpoint = json.load(checkpoint_file)
+            if not checkpoint["dump"] == path_to_dump or not checkpoint["output_format"] == output_format:
+                raise ValueError("checkpoint " + path_to_checkpoint + " was saved while parsing " + checkpoint["dump"] + " with '" + checkpoint["output_format"] + "' output format.")
 
-        #files headers
-        if self.print_to_std:
-            print("[")
-        out.write("[\n")
-        errors.write("\t".join(["error", "localization", "expression"])+"\n")
+        #results of previous runs with the same configuration
+        revision_store = None
+        if path_to_store:
+            if config is None:
+                raise ValueError("config should describe parsing functions (i.e. their options) when path_to_store is given, so that results of other options are not reused.")
+            config_hash = RevisionStore.hash_config([config, output_format, RevisionStore.describe_function(section_titles_normalisation_funct), RevisionStore.describe_function(content_extraction_funct)] + list(parsing_args[2:]))
+            revision_store = RevisionStore(path_to_store, config_hash, checkpoint is not None)
 
-        #retrieve size of dump for progressbar and init it (if output isn't printed in terminal)
+        #init ouput files handler (truncated to their checkpointed positions when resuming)
+        if output_format == "sqlite":
+            out = SqliteSink(self, path_to_output, content_attribute_name, checkpoint["output_position"] if checkpoint else None)
+        elif checkpoint:
+            out = open(path_to_output, "r+")
+            out.truncate(checkpoint["output_position"])
+            out.seek(0, os.SEEK_END)
+        else:
+            out = open(path_to_output, "w")
+        if checkpoint:
+            errors = open(path_to_errors, "r+")
+            errors.truncate(checkpoint["errors_position"])
+            errors.seek(0, os.SEEK_END)
+        else:
+            errors = open(path_to_errors, "w")
+
+        #parsed pages waiting to be written at once in output file
+        out_buffer = []
+        separator = "\n" if output_format == "jsonl" else ""
+        def flush_out_buffer():
+            if stats:
+                start = time.perf_counter()
+            if output_format == "sqlite":
+                out.write_pages(out_buffer)
+            else:
+                out.write(separator.join(out_buffer) + separator)
+            out_buffer.clear()
+            if stats:
+                stats.add_time("writing", time.perf_counter() - start)
+
+        #saves positions from which parsing can restart (once all written pages are on disk)
+        last_written_page = None
+        pages_since_checkpoint = 0
+        def write_checkpoint():
+            if out_buffer:
+                flush_out_buffer()
+            out.flush()
+            errors.flush()
+            if revision_store:
+                revision_store.flush()
+            page_id, input_offset = last_written_page
+            checkpoint = {"dump":path_to_dump, "output_format":output_format, "input_offset":input_offset, "last_page_id":page_id, "output_position":out.position() if output_format == "sqlite" else out.buffer.tell(), "errors_position":errors.buffer.tell()}
+            with open(path_to_checkpoint + ".tmp", "w") as checkpoint_file:
+                json.dump(checkpoint, checkpoint_file)
+            os.replace(path_to_checkpoint + ".tmp", path_to_checkpoint)
+
+        #files headers (already written when resuming)
+        if not checkpoint:
+            if output_format == "pretty":
+                if self.print_to_std:
+                    print("[")
+                out.write("[\n")
+            errors.write("\t".join(["error", "localization", "expression"])+"\n")
+
+        #retrieve size of dump for progressbar and init it (if output isn't printed in terminal, and the dump is on disk)
         bar = None
-        if not self.print_to_std:
+        if not self.print_to_std and not _is_streamed(path_to_dump):
             dump_total_size = os.path.getsize(path_to_dump)
             bar = progressbar.ProgressBar(maxval = dump_total_size, widgets=[progressbar.Bar("=", '[', ']'), ' ', progressbar.Percentage(), " ", progressbar.ETA()])
-        
-        #keep unexpected error messages to print in std after parse
-        unexpected_errors = []
+            bar.start()
 
-        #loop through wiki pages
-        page_id = None
-        i = 0
-        if bar:
-            bar.start()
-        with open(path_to_dump, 'rb') as f:
-            event_context = etree.iterparse(f, events=('end', ))
-            try:
-                for event, elem in event_context:
-                    tname = strip_tag_name(elem.tag)
-                    i += 1
-                    if event == 'end':
-                        #new page to parse
-                        if tname == 'text':
-                            page = etree.tostring(elem, encoding = "unicode", method='text')
-                            context_titles = [title]
-                            try:
-                                parsed_page = self.toDict(page, context_titles, section_titles_normalisation_funct, content_extraction_funct, add_empty_contents, content_attribute_name, default_attribute_name)
-                                full_parsed_page = {'id':page_id, 'ns':ns, 'content':parsed_page}
-                                page_id = None
-                                to_print = "".join(['"', title, '": ', self.pretty_str(full_parsed_page), ","])
-                                if self.print_to_std:
-                                    print(to_print)
-                                out.write(to_print)
-                            except(InputError):
-                                e = sys.exc_info()[1]
-                                errors.write(str(e))
-                        #title to parse
-                        elif tname == 'title':
-                            title = elem.text
-                        #ns
-                        elif tname == 'ns':
-                            ns = elem.text
-                        #id (of page, not to be overritten when parsing id of user)
-                        elif tname == 'id' and not page_id:
-                            page_id = elem.text
-
-                    elem.clear()
-                    if bar and i % refresh_bar_frequency == 0:
-                        bar.update(f.tell())
-
-            except(etree.XMLSyntaxError):
-                e = sys.exc_info()[1]
-                unexpected_errors.append(str(e))
-                event_context.next()
+        #writes the result of each parsed page (or its error) in adequate file, page_mark being the id of the page and the position before it in the dump
+        resume_from = (checkpoint["input_offset"], checkpoint["last_page_id"]) if checkpoint else None
+        for page_mark, (is_error, to_print) in self._iter_results(path_to_dump, parsing_args, output_format, workers, pages_per_task, page_filter, stats, resume_from, bar.update if bar else None, refresh_bar_frequency, revision_store, path_to_tee):
+            if is_error:
+                errors.write(to_print)
+            else:
+                if self.print_to_std:
+                    print(to_print)
+                out_buffer.append(to_print)
+                if len(out_buffer) >= output_buffer_size:
+                    flush_out_buffer()
+            if checkpoint_frequency:
+                last_written_page = page_mark
+                pages_since_checkpoint += 1
+                if pages_since_checkpoint >= checkpoint_frequency:
+                    write_checkpoint()
+                    pages_since_checkpoint = 0
         if bar:
             bar.finish()
 
+        #files footers
+        if out_buffer:
+            flush_out_buffer()
+        if output_format == "pretty":
+            if self.print_to_std:
+                print("]")
+            out.write("]\n")
+        out.close()
+        errors.close()
+
+        #pages of previous run which are not in the dump anymore
+        if revision_store:
+            deleted_pages = revision_store.pop_deleted_pages()
+            revision_store.close()
+            with open(path_to_output + ".deleted", "w") as deleted:
+                deleted.write("\t".join(["id", "title"])+"\n")
+                for page_id, title in deleted_pages:
+                    deleted.write("\t".join([page_id, title])+"\n")
+            if stats:
+                stats.counters["deleted_pages"] = len(deleted_pages)
+                stats.report()
+
+        #dump is fully parsed
+        if os.path.exists(path_to_checkpoint):
+            os.remove(path_to_checkpoint)
+
+    """streams the pages of a dump, parsing them (in worker processes if many) and yielding their results in the order of the dump, for parse_dump and iter_pages
+
+    Args:
+    path_to_dump (str): path to dump (.xml or .bz2), url of dump or "-" for standard input
+    parsing_args (tuple): arguments of toDict following context titles (normalisation function, extraction function, add_empty_contents, content_attribute_name, default_attribute_name)
+    output_format (str): "pretty", "jsonl" or "sqlite" for serialized pages, None for (title, id, ns, parsed_dict) tuples (see _parse_page)
+    workers, pages_per_task, page_filter, stats : see parse_dump
+    resume_from (tuple(int, str)): position in the dump before the last page already parsed and id of that page (from a checkpoint), None to parse the whole dump
+    progress (funct): function int -> None called with the position in the dump file every refresh_bar_frequency elements (None for no progress)
+    refresh_bar_frequency (int): number of elements between two calls of progress
+    revision_store (RevisionStore): store of results of previous runs, reused for pages whose revision is unchanged, in which results of other pages are saved (None to parse every page)
+    path_to_tee (str): path of the file in which a streamed dump is copied (see open_dump)
+
+    Returns:
+    generator(tuple(tuple(str, int), tuple(bool, object))) : for each parsed page, its id and a position before it in the dump, and the result of _parse_page
+    """
+    def _iter_results(self, path_to_dump, parsing_args, output_format, workers=1, pages_per_task=64, page_filter=None, stats=None, resume_from=None, progress=None, refresh_bar_frequency=100000, revision_store=None, path_to_tee=None):
+
+        def strip_tag_name(t):
+            t = elem.tag
+            idx = k = t.rfind("}")
+            if idx != -1:
+                t = t[idx + 1:]
+            return t
+
+        #time spent in user functions is recorded in stats
+        if stats:
+            section_titles_normalisation_funct, content_extraction_funct = parsing_args[:2]
+            parsing_args = (stats.timed("title_normalisation", section_titles_normalisation_funct), stats.timed("content_extraction", content_extraction_funct)) + parsing_args[2:]
+
+        #hits and misses of caches are counted in stats (by workers as well)
+        if self.caches:
+            for cache in self.caches.values():
+                cache.stats = stats
+
+        #pool of workers parsing pages (forked so that parsing functions, often lambdas, do not need to be picklable)
+        pool = None
+        if workers > 1:
+            pool = multiprocessing.get_context("fork").Pool(workers, initializer=_init_parse_worker, initargs=(self, parsing_args, output_format, stats))
+        #pages waiting to be sent to a worker (and their marks : id, position, title and revision), and tasks sent to workers whose results are not yielded yet (in order of the dump)
+        #results reused from revision_store while tasks are pending wait in a task without async result (None)
+        pending_pages = []
+        pending_marks = []
+        pending_tasks = collections.deque()
+
+        #results of the oldest task sent to workers (saved in revision_store, unless they were reused from it)
+        def oldest_task_results():
+            task, page_marks, results = pending_tasks.popleft()
+            if task is not None:
+                if stats:
+                    start = time.perf_counter()
+                    results, stats_delta = task.get()
+                    stats.add_time("waiting_workers", time.perf_counter() - start)
+                    stats.merge(stats_delta)
+                else:
+                    results = task.get()
+                if revision_store:
+                    for (page_id, page_offset, title, revision), result in zip(page_marks, results):
+                        revision_store.save(page_id, title, revision, result)
+            for (page_id, page_offset, title, revision), result in zip(page_marks, results):
+                yield (page_id, page_offset), result
+
+        #sends pending pages to the pool
+        def flush_pending_pages():
+            pending_tasks.append((pool.apply_async(_parse_pages_in_worker, (pending_pages.copy(),)), pending_marks.copy(), None))
+            pending_pages.clear()
+            pending_marks.clear()
+
+        #keep unexpected error messages to print in std after parse
+        unexpected_errors = []
+
+        #loop through wiki pages
+        page_id = None
+        revision_id = None
+        sha1 = None
+        keep_page = True
+        text_elem = None
+        #id of the last page parsed before the checkpoint, pages are skipped until it is met
+        skip_until_page_id = resume_from[1] if resume_from else None
+        i = 0
+        raw_dump, dump = open_dump(path_to_dump, workers, path_to_tee)
+        try:
+            with raw_dump:
+                if resume_from:
+                    reader = self._resumed_dump_reader(dump, resume_from[0])
+                else:
+                    reader = _OffsetTrackingReader(dump)
+                #only elements read by the loop give events (in any namespace, the one of the dump or none when resuming)
+                event_context = etree.iterparse(reader, events=('end', ), tag=self.dump_tags)
+                if stats:
+                    stats.start_loop()
+                try:
+                    for event, elem in event_context:
+                        tname = strip_tag_name(elem.tag)
+                        i += 1
+                        if event == 'end':
+                            #text of a page is parsed at the end of the page, once its tail is read whatever the chunks read by iterparse (and its sha1 is known)
+                            if tname == 'page' and text_elem is not None:
+                                #redirections of dumps without redirect element
+                                if keep_page and page_filter and page_filter.skip_redirects and page_filter.is_redirect_text(text_elem.text):
+                                    keep_page = False
+                                if revision_store:
+                                    revision_store.mark_seen(page_id)
+                                #pages parsed before checkpoint
+                                if skip_until_page_id is not None:
+                                    if page_id == skip_until_page_id:
+                                        skip_until_page_id = None
+                                elif not keep_page:
+                                    if stats:
+                                        stats.count("filtered_pages")
+                                else:
+                                    #result of previous run, if revision of page is unchanged
+                                    revision = revision_id + ":" + (sha1 or "") if revision_id else None
+                                    reused_result = revision_store.lookup(page_id, revision) if revision_store else None
+                                    if reused_result:
+                                        if stats:
+                                            stats.count("reused_pages")
+                                        #results are yielded after those of pages sent to workers before
+                                        if pool and (pending_pages or pending_tasks):
+                                            if pending_pages:
+                                                flush_pending_pages()
+                                            if pending_tasks[-1][0] is None:
+                                                pending_tasks[-1][1].append((page_id, page_offset, title, revision))
+                                                pending_tasks[-1][2].append(reused_result)
+                                            else:
+                                                pending_tasks.append((None, [(page_id, page_offset, title, revision)], [reused_result]))
+                                            while len(pending_tasks) > 2 * workers:
+                                                yield from oldest_task_results()
+                                        else:
+                                            yield (page_id, page_offset), reused_result
+                                    else:
+                                        if stats:
+                                            start = time.perf_counter()
+                                        page = etree.tostring(text_elem, encoding = "unicode", method='text')
+                                        if stats:
+                                            stats.add_time("tostring", time.perf_counter() - start)
+                                        if pool:
+                                            pending_pages.append((title, page_id, ns, page))
+                                            pending_marks.append((page_id, page_offset, title, revision))
+                                            if len(pending_pages) >= pages_per_task:
+                                                flush_pending_pages()
+                                                #only a bounded number of pages are in memory
+                                                while len(pending_tasks) > 2 * workers:
+                                                    yield from oldest_task_results()
+                                        else:
+                                            result = self._parse_page(title, page_id, ns, page, parsing_args, output_format, stats)
+                                            if revision_store:
+                                                revision_store.save(page_id, title, revision, result)
+                                            yield (page_id, page_offset), result
+                                    if stats and stats.is_report_due():
+                                        stats.input_bytes = reader.offset
+                                        stats.report()
+                                page_id = None
+                                revision_id = None
+                                sha1 = None
+                                keep_page = True
+                                text_elem.clear()
+                                text_elem = None
+                            #new page to parse
+                            if tname == 'text':
+                                text_elem = elem
+                            #title to parse
+                            elif tname == 'title':
+                                title = elem.text
+                                page_offset = reader.position()
+                            #ns (following title), from which page can be filtered
+                            elif tname == 'ns':
+                                ns = elem.text
+                                if page_filter:
+                                    keep_page = page_filter.accepts(title, ns)
+                            #redirection page
+                            elif tname == 'redirect':
+                                if page_filter and page_filter.skip_redirects:
+                                    keep_page = False
+                            #id (of page, not to be overritten when parsing id of user)
+                            elif tname == 'id' and not page_id:
+                                page_id = elem.text
+                            #id of revision (following the one of page, before the one of user)
+                            elif tname == 'id' and not revision_id:
+                                revision_id = elem.text
+                            #hash of text of revision (following text)
+                            elif tname == 'sha1':
+                                sha1 = elem.text
+
+                        if text_elem is not elem:
+                            elem.clear()
+                        #parsed pages are detached from the root, so that memory does not grow along the dump
+                        if tname == 'page':
+                            while elem.getprevious() is not None:
+                                del elem.getparent()[0]
+                        if progress and i % refresh_bar_frequency == 0:
+                            progress(raw_dump.tell())
+
+                except(etree.XMLSyntaxError):
+                    e = sys.exc_info()[1]
+                    unexpected_errors.append(str(e))
+                    event_context.next()
+
+            #results of the pages still handled by workers
+            if pool:
+                if pending_pages:
+                    flush_pending_pages()
+                while pending_tasks:
+                    yield from oldest_task_results()
+        finally:
+            if pool:
+                pool.terminate()
+            if dump is not raw_dump:
+                dump.close()
+
         #print error messages
         for e in unexpected_errors:
             print(e)
 
-        #files footers
-        if self.print_to_std:
-            print("]")
-        out.write("[\n")
+        if stats:
+            stats.input_bytes = reader.offset
+            stats.end_loop()
+            stats.report()
+
+    """finds where to restart parsing a dump from a checkpoint : the first page after the checkpointed position, wrapped in a root element as the rest of the dump is
+
+    Args:
+    dump (file): decompressed dump
+    input_offset (int): checkpointed position in the dump, before the last written page
+
+    Returns:
+    _OffsetTrackingReader : reader of the dump from the first page after input_offset
+    """
+    def _resumed_dump_reader(self, dump, input_offset):
+        #move to checkpointed position (bz2 files seek decompressing from their beginning, parallel reader of multistream dumps is read through)
+        if getattr(dump, "seekable", None) and dump.seekable():
+            dump.seek(input_offset)
+        else:
+            to_skip = input_offset
+            while to_skip > 0:
+                skipped = len(dump.read(min(to_skip, 1024*1024)))
+                if not skipped:
+                    break
+                to_skip -= skipped
+        #look for the beginning of next page
+        root = b"<mediawiki>"
+        data = b""
+        offset = input_offset
+        page_start = -1
+        while page_start == -1:
+            read_data = dump.read(1024*1024)
+            if not read_data:
+                raise ValueError("no page found in dump after checkpointed position " + str(input_offset) + ".")
+            data += read_data
+            page_start = data.find(b"<page>")
+            if page_start == -1:
+                #keep the end of data, which could be the beginning of a split tag
+                offset += len(data) - 5
+                data = data[-5:]
+        return _OffsetTrackingReader(dump, offset + page_start - len(root), root + data[page_start:])
+
+    """builds the page index of a dump in a single pass over its bytes (pages are found without parsing xml) : a text file of "offset:id:title" lines, in the order of the dump. Offsets are those of the pages in xml dumps, of the streams holding them in multistream bz2 dumps (as wikimedia's *-multistream-index.txt), and of the pages in decompressed data of other bz2 dumps
+
+    Args:
+    path_to_dump (str): path to dump (.xml or .bz2)
+    path_to_index (str): path to index file (default path_to_dump + ".index")
+
+    Returns:
+    str : path to index file
+    """
+    def build_page_index(self, path_to_dump, path_to_index=None):
+        if path_to_index is None:
+            path_to_index = path_to_dump + ".index"
+        #offsets of the index are the ones of the compressed streams of multistream dumps, so the dump is read from disk as it is rather than by open_dump
+        with open(path_to_dump, "rb") as raw_dump, open(path_to_index + ".tmp", "w", encoding="utf-8") as index:
+            if not path_to_dump.endswith(".bz2"):
+                page_heads = _scan_page_heads(raw_dump)
+            elif _is_multistream(raw_dump):
+                page_heads = ((stream_offset, page_id, title) for stream_offset, stream in _bz2_streams(raw_dump) for page_offset, page_id, title in _scan_page_heads(io.BytesIO(stream)))
+            else:
+                page_heads = _scan_page_heads(bz2.BZ2File(raw_dump))
+            for offset, page_id, title in page_heads:
+                index.write("".join([str(offset), ":", page_id, ":", title, "\n"]))
+        os.replace(path_to_index + ".tmp", path_to_index)
+        return path_to_index
+
+    #loads (once) an index file (possibly bz2 compressed) into a dictionary : title -> (offset, id)
+    def _load_page_index(self, path_to_index):
+        page_index = self.page_indexes.get(path_to_index)
+        if page_index is None:
+            page_index = {}
+            with (bz2.open if path_to_index.endswith(".bz2") else open)(path_to_index, "rt", encoding="utf-8") as index:
+                for line in index:
+                    offset, page_id, title = line.rstrip("\n").split(":", 2)
+                    page_index[title] = (int(offset), page_id)
+            self.page_indexes[path_to_index] = page_index
+        return page_index
+
+    """parses a single page of a dump into its dictionary form (see toDict), seeking it through the page index of the dump (built by build_page_index if missing)
+
+    Args:
+    path_to_dump (str): path to dump (.xml or .bz2)
+    title (str): title of the page
+    section_titles_normalisation_funct, content_extraction_funct, add_empty_contents, content_attribute_name, default_attribute_name : see parse_dump
+    path_to_index (str): path to page index of the dump, either built by build_page_index or downloaded along a multistream dump (default path_to_dump + ".index")
+
+    Returns:
+    dict : the page as returned by toDict
+    """
+    def parse_page(self, path_to_dump, title, section_titles_normalisation_funct=lambda expr, context_titles: {expr}, content_extraction_funct=lambda content, context_titles : content, add_empty_contents=False, content_attribute_name="content", default_attribute_name="unnamed", path_to_index=None):
+        for parsed_title, parsed_page in self.parse_pages(path_to_dump, [title], section_titles_normalisation_funct, content_extraction_funct, add_empty_contents, content_attribute_name, default_attribute_name, path_to_index):
+            return parsed_page
+
+    """parses many pages of a dump into their dictionary form (see toDict), seeking them through the page index of the dump (built by build_page_index if missing). Pages are read in the order of the dump, each stream of multistream dumps being decompressed once
+
+    Args:
+    path_to_dump (str): path to dump (.xml or .bz2)
+    titles (iterable(str)): titles of the pages
+    section_titles_normalisation_funct, content_extraction_funct, add_empty_contents, content_attribute_name, default_attribute_name : see parse_dump
+    path_to_index (str): path to page index of the dump (default path_to_dump + ".index")
+
+    Returns:
+    generator(tuple(str, dict)) : title of each page and the page as returned by toDict, in the order of the dump
+    """
+    def parse_pages(self, path_to_dump, titles, section_titles_normalisation_funct=lambda expr, context_titles: {expr}, content_extraction_funct=lambda content, context_titles : content, add_empty_contents=False, content_attribute_name="content", default_attribute_name="unnamed", path_to_index=None):
+        if path_to_index is None:
+            path_to_index = path_to_dump + ".index"
+        if not os.path.exists(path_to_index):
+            self.build_page_index(path_to_dump, path_to_index)
+        page_index = self._load_page_index(path_to_index)
+        missing_titles = [title for title in titles if title not in page_index]
+        if missing_titles:
+            raise KeyError("pages not found in index " + path_to_index + " : " + ", ".join(missing_titles))
+        #pages to read, grouped by offset (the one of their stream in multistream dumps)
+        ids_by_offset = collections.defaultdict(set)
+        for title in titles:
+            offset, page_id = page_index[title]
+            ids_by_offset[offset].add(page_id)
+
+        #pages are sought at offsets of the dump on disk (see build_page_index)
+        with open(path_to_dump, "rb") as raw_dump:
+            if not path_to_dump.endswith(".bz2"):
+                dump, is_multistream = raw_dump, False
+            elif _is_multistream(raw_dump):
+                dump, is_multistream = raw_dump, True
+            else:
+                #decompressed sequentially, pages being read in order
+                dump, is_multistream = bz2.BZ2File(raw_dump), False
+            for offset in sorted(ids_by_offset):
+                dump.seek(offset)
+                if is_multistream:
+                    data = next(_bz2_streams(dump))[1]
+                else:
+                    data = self._read_page_data(dump)
+                for matcher in _PAGE_HEAD.finditer(data):
+                    if matcher.group(2).decode("utf-8") in ids_by_offset[offset]:
+                        page_end = data.find(b"</page>", matcher.end()) + len(b"</page>")
+                        title, page = self._page_title_and_text(data[matcher.start():page_end])
+                        yield title, self.toDict(page, [title], section_titles_normalisation_funct, content_extraction_funct, add_empty_contents, content_attribute_name, default_attribute_name)
+
+    #reads the data of a dump from the beginning of a page to its end
+    def _read_page_data(self, dump, chunk_size=64*1024):
+        data = b""
+        page_end = -1
+        while page_end == -1:
+            read_data = dump.read(chunk_size)
+            if not read_data:
+                raise EOFError("dump ended before the end of page.")
+            #"</page>" may be cut between two reads
+            search_start = max(0, len(data) - len(b"</page>"))
+            data += read_data
+            page_end = data.find(b"</page>", search_start)
+        return data[:page_end + len(b"</page>")]
+
+    #title and text of a <page> element, text being serialized as parse_dump does
+    def _page_title_and_text(self, page_data):
+        page = etree.fromstring(page_data)
+        text = page.find("revision/text")
+        return page.findtext("title"), etree.tostring(text, encoding = "unicode", method='text')
+
+    """parses a single page of the dump and serializes it the way parse_dump writes it
+    
+    Args:
+    title (str): title of the page
+    page_id (str): id of the page
+    ns (str): namespace of the page
+    page (str): text of the page
+    parsing_args (tuple): arguments of toDict following context titles (normalisation function, extraction function, add_empty_contents, content_attribute_name, default_attribute_name)
+    output_format (str): "pretty", "jsonl" or "sqlite" (see parse_dump), or None for the page not to be serialized
+    stats (ParseStats): stats in which time spent parsing and serializing the page is added (None for no stats)
+
+    Returns:
+    tuple(bool, str) : whether the page raised an InputError, and the string to write in errors file if it did or in output file otherwise (without output_format : the InputError itself or the tuple (title, id, ns, parsed_dict))
+    """
+    def _parse_page(self, title, page_id, ns, page, parsing_args, output_format="pretty", stats=None):
+        if stats:
+            start = time.perf_counter()
+        try:
+            parsed_page = self.toDict(page, [title], *parsing_args)
+        except(InputError):
+            e = sys.exc_info()[1]
+            if stats:
+                seconds = time.perf_counter() - start
+                stats.add_time("toDict", seconds)
+                stats.add_page(title, seconds, is_error=True)
+            return (True, e if output_format is None else str(e))
+        if stats:
+            parsed = time.perf_counter()
+            stats.add_time("toDict", parsed - start)
+        if output_format is None:
+            result = (False, (title, page_id, ns, parsed_page))
+        #pages written in sqlite are sent to SqliteSink as jsonl lines
+        elif output_format in ["jsonl", "sqlite"]:
+            result = (False, self.compact_str({'title':title, 'id':page_id, 'ns':ns, 'content':parsed_page}))
+        else:
+            full_parsed_page = {'id':page_id, 'ns':ns, 'content':parsed_page}
+            result = (False, "".join(['"', title, '": ', self.pretty_str(full_parsed_page), ","]))
+        if stats:
+            serialized = time.perf_counter()
+            stats.add_time("serialization", serialized - parsed)
+            stats.add_page(title, serialized - start)
+        return result
 
     """This function normalizes a bracketed expression either from a function indicating which indexes to extract, or from a regular expression retrieving all values of a "var = val" assignement, where var matches the regular expression. Note that even if the function is called normalization, it can be used to extract a part of the bracketed expression.
     
@@ -280,115 +1710,119 @@ class WikiPageParser:
         or regex_attr (str): regex to be applied on each var of "var = val" assignements to know which values to extract
     post_processing_funct (function) : function  str, list(str) -> str ; after extraction of relevent substring, which function is to be applied for postprocessing
     brackets (couple(str)) : a couple indicating which is left and right bracket for expression
+    nested (bool) : should the expression be split with scan_bracket_expr (respecting nested bracketed expressions) rather than with regular expressions
 
 
     Returns:
     set : a set of string object which are the valid normalized strings for the bracketed expression
     """
-    def norm_bracket_expr(self, expr, context_titles, regex_attr_or_funct_splitted2elems, post_processing_funct=lambda expr, context_titles : expr, brackets = ("{{","}}")):
-        
-        """Both form of normalization requires the same init steps to split the expression correctly
-        Args:
-        expr (str): expression we want to normalize
-        brackets (couple(str)) : a couple indicating which is left and right bracket for expression
-
-        Returns:
-        list : a splitted form of the expression
-        """
-        def init_norm(expr, brackets):
-            left_bra = brackets[0]
-            right_bra = brackets[1]
-
-            #assign correct reg expr
-            if brackets[0] == "{{" and brackets[1] == "}}":
-                bracketed_expr = self.curly_bracketed_expr
-            elif brackets[0] == "[[" and brackets[1] == "]]":
-                bracketed_expr = self.square_bracketed_expr
-            else:
-                bracketed_expr = re.compile("".join([left_bra, "([^}])*", right_bra]))
+    def norm_bracket_expr(self, expr, context_titles, regex_attr_or_funct_splitted2elems, post_processing_funct=_unchanged, brackets = ("{{","}}"), nested=False):
+        #results are memoized when both functions are cacheable (regular expressions always are), depending on the context titles both depend on
+        is_regex = isinstance(regex_attr_or_funct_splitted2elems, str)
+        if self.caches and (is_regex or hasattr(regex_attr_or_funct_splitted2elems, "cache_context")) and hasattr(post_processing_funct, "cache_context"):
+            contexts = [0 if is_regex else regex_attr_or_funct_splitted2elems.cache_context, post_processing_funct.cache_context]
+            context = None if None in contexts else max(contexts)
+            cache = self.caches["bracket_normalisation"]
+            key = (expr, regex_attr_or_funct_splitted2elems, post_processing_funct, brackets, nested, self._relevant_context(context_titles, context))
+            result = cache.get(key)
+            if result is None:
+                result = self._norm_bracket_expr(expr, context_titles, regex_attr_or_funct_splitted2elems, post_processing_funct, brackets, nested)
+                cache.put(key, result)
+            return result.copy()
+        return self._norm_bracket_expr(expr, context_titles, regex_attr_or_funct_splitted2elems, post_processing_funct, brackets, nested)
 
-            #change expr to bracketed expression
-            matcher = bracketed_expr.search(expr)
-            #if there is no bracketed expression, expr is left unchanges
-            if matcher :
-                expr = matcher.group(0)
-            else:
-                raise InputError("/".join(context_titles), expr, "expected bracketed expression")
+    #norm_bracket_expr, without cache
+    def _norm_bracket_expr(self, expr, context_titles, regex_attr_or_funct_splitted2elems, post_processing_funct, brackets, nested):
+        #splitted expression
+        splitted = self._split_bracket_expr(expr, context_titles, brackets, nested)
 
-            #strip brackets
-            expr = expr.rstrip(right_bra).lstrip(left_bra)
-            #split over pipes
-            splitted = expr.split("|")
+        #if regex_attr_or_funct_splitted2elems is string, use it as a regex retrieving values of "var = val" assignements
+        if isinstance(regex_attr_or_funct_splitted2elems, str):
+            return set(post_processing_funct(value, context_titles) for value in self._attribute_values(splitted, self._compile(regex_attr_or_funct_splitted2elems), nested))
 
-            return splitted
-            
-        """normalizes a bracketed expression, splitting it along the pipes and retrieving a list of elements (using a function)
-        
-        Args:
-        expr (str): expression we want to normalize
-        context_titles (list(str)): succesion of titles in which current section is nested
-        funct_splitted2elems (funct): function (list(str), list(str)) -> list(str) ; applied on a splitted string, gives a list of elements to return
-        post_processing_funct (function) : function  str, list(str) -> str ; after extraction of relevent substring, which function is to be applied for postprocessing
-        brackets (couple(str)) : a couple indicating which is left and right bracket for expression
-
-        Returns:
-        set : a set of one unique str object which is the normalized str for the bracketed expression
-        """
-        def norm_bracket_expr_by_lambda_over_splitted(expr, context_titles, funct_splitted_and_context_titles_2elems, post_processing_funct, brackets):
-            #splitted expression
-            splitted = init_norm(expr, brackets)
-            #the return object
-            return_set = set()
-            #get index of splitted element to return
-            #try:
-            try:
-                list_elems = funct_splitted_and_context_titles_2elems(splitted, context_titles)
-            except(IndexError):
-                if self.ignore:
-                    raise InputError("/".join(context_titles), "|".join(splitted), "list index out of range")
-                else:
-                    e = sys.exc_info()[1]
-                    raise IndexError(str(e))
-            #add pron to return set
-            for elem in list_elems:
-                return_set.add(post_processing_funct(elem, context_titles))
-            return return_set
+        #else use it as a function over splitted expression, retrieving a list of elements
+        try:
+            list_elems = regex_attr_or_funct_splitted2elems(splitted, context_titles)
+        except(IndexError):
+            raise self._index_error(splitted, context_titles)
+        return set(post_processing_funct(elem, context_titles) for elem in list_elems)
 
-        """normalizes a bracketed expression retrieving the value of a "var = val" assignement (using a regex over var)
-        
-        Args:
-        expr (str): expression we want to normalize
-        context_titles (list(str)): succesion of titles in which current section is nested
-        regex_attr (str): regex to be applied on each var of "var = val" assignements to know which values to extract
-        post_processing_funct (function) : function  str, list(str) -> str ; after extraction of relevent substring, which function is to be applied for postprocessing
-        brackets (couple(str)) : a couple indicating which is left and right bracket for expression
-
-        Returns:
-        set : a set of all string values assigned to variables matching the regex_attr
-        """
-        def norm_bracket_expr_by_attribute_name(expr, context_titles, regex_attr, post_processing_funct, brackets):
-            #splitted expression
-            splitted = init_norm(expr, brackets)
-            #the return object
-            return_set = set()
-            for spl in splitted:
-                subspl = spl.split("=")
-                if len(subspl) > 1:
-                    #check if the left side of assignement matches the regex
-                    matcher = re.compile(regex_attr).match(subspl[0])
-                    #if it does, add the right part (after post-processing)
-                    if matcher:
-                        return_set.add(post_processing_funct(subspl[1], context_titles))
-            return return_set
-
-
-        #if regex_attr_or_funct_splitted2elems is string, use it as a regex for norm_bracket_expr_by_attribute_name method
-        if isinstance(regex_attr_or_funct_splitted2elems, str):
-            norm_function = norm_bracket_expr_by_attribute_name
-        #else use it as a function for norm_bracket_expr_by_lambda_over_splitted method
+    """Both form of normalization requires the same init steps to split the expression correctly : finds the first bracketed expression of expr and splits it over its pipes
+
+    Args:
+    expr (str): expression we want to normalize
+    context_titles (list(str)): succesion of titles in which current section is nested
+    brackets (couple(str)) : a couple indicating which is left and right bracket for expression
+    nested (bool) : should the expression be split with scan_bracket_expr (respecting nested bracketed expressions) rather than with regular expressions
+
+    Returns:
+    list : a splitted form of the expression
+    """
+    def _split_bracket_expr(self, expr, context_titles, brackets, nested):
+        #first (outermost) bracketed expression, split over its own pipes only
+        if nested:
+            scanned_exprs = self.scan_bracket_expr(expr, brackets)
+            if not scanned_exprs:
+                raise InputError("/".join(context_titles), expr, "expected bracketed expression")
+            start, end, name, args = scanned_exprs[0]
+            return [name] + args
+
+        #change expr to bracketed expression
+        matcher = self._bracketed_expr_regex(brackets).search(expr)
+        #if there is no bracketed expression, expr is left unchanges
+        if matcher :
+            expr = matcher.group(0)
         else:
-            norm_function = norm_bracket_expr_by_lambda_over_splitted
-        return norm_function(expr, context_titles, regex_attr_or_funct_splitted2elems, post_processing_funct, brackets)
+            raise InputError("/".join(context_titles), expr, "expected bracketed expression")
+
+        #strip brackets, then split over pipes
+        return expr.rstrip(brackets[1]).lstrip(brackets[0]).split("|")
+
+    #regular expression of any bracketed expression of given brackets
+    def _bracketed_expr_regex(self, brackets):
+        if brackets[0] == "{{" and brackets[1] == "}}":
+            return self.curly_bracketed_expr
+        if brackets[0] == "[[" and brackets[1] == "]]":
+            return self.square_bracketed_expr
+        return self._compile("".join([brackets[0], "([^}])*", brackets[1]]))
+
+    #regular expression of bracketed expressions of given name (of any name if empty), which stops at first closing bracket
+    def _bracket_expr_by_name_regex(self, name, brackets):
+        left_bra = brackets[0]
+        right_bra = brackets[1]
+        pipe = "\\|" if name else ""
+        if left_bra == "{{" and right_bra == "}}":
+            return self._compile("{{"+name+pipe+"([^}])*}}")
+        if left_bra == "[[" and right_bra == "]]":
+            return self._compile("\\[\\["+name+pipe+"([^\\]])*\\]\\]")
+        return self._compile("".join([left_bra, name, pipe, "([^", right_bra,"])*", right_bra]))
+
+    #error raised when an index is out of range of a splitted expression (raised from the handler of the IndexError) : an InputError written in error file if out of range errors are ignored, the IndexError otherwise
+    def _index_error(self, splitted, context_titles):
+        if self.ignore:
+            return InputError("/".join(context_titles), "|".join(splitted), "list index out of range")
+        e = sys.exc_info()[1]
+        return IndexError(str(e))
+
+    """values of "var = val" assignements of a splitted expression, whose variable name matches a regular expression
+
+    Args:
+    splitted (list(str)): splitted expression
+    reg_attr (re.Pattern): compiled regular expression which variable names should match
+    nested (bool) : was the expression split respecting nested bracketed expressions (whose values may hold "=" themselves)
+
+    Returns:
+    list(str) : values of matching assignements, in order of the expression
+    """
+    def _attribute_values(self, splitted, reg_attr, nested):
+        values = []
+        for spl in splitted:
+            #values of nested expressions may hold "=" themselves
+            subspl = spl.split("=", 1) if nested else spl.split("=")
+            #check if the left side of assignement matches the regex, if it does, add the right part
+            if len(subspl) > 1 and reg_attr.match(subspl[0]):
+                values.append(subspl[1])
+        return values
 
 
     """given a string content, retrieves all bracketed expressions out of it of matching name
@@ -400,23 +1834,32 @@ class WikiPageParser:
     brackets (couple(str)) : a couple indicating which is left and right bracket for expression
     norm_function (funct) : function  str, list(str) -> str ; a normalization function to apply on all extracted bracket expression
     keep_empty_expr (bool) : should empty extracated (& normalized) elements be kept in result
+    nested (bool) : should expressions be found with scan_bracket_expr (nested ones included) rather than with regular expressions, which stop at the first closing bracket
 
     Returns:
     list(str) : a list of all bracketed expressions matching required name
     """
-    def extr_all_bracket_expr_by_name(self, content, context_titles, name, brackets = ("{{","}}"), norm_function=lambda expr, context_titles: expr, keep_empty_expr=False):
-        left_bra = brackets[0]
-        right_bra = brackets[1]
-        #TODO(5): following regex could lead to bugs if nested bracketed expression exist
-        pipe = "\|" if name else ""
-        if left_bra == "{{" and right_bra == "}}":
-            regex = self.titled_curly_bracketed_expr
-        elif left_bra == "[[" and right_bra == "]]":
-            regex = self.titled_square_bracketed_expr
+    def extr_all_bracket_expr_by_name(self, content, context_titles, name, brackets = ("{{","}}"), norm_function=lambda expr, context_titles: expr, keep_empty_expr=False, nested=False):
+        if nested:
+            return_list_bracket_expr_by_name = []
+            for start, end, expr_name, args in self.scan_bracket_expr(content, brackets):
+                if name and not expr_name == name:
+                    continue
+                normalized_match = list(norm_function(content[start:end], context_titles))
+                #do not add if empty and keep_empty_expr=False
+                if not keep_empty_expr and not normalized_match:
+                    continue
+                return_list_bracket_expr_by_name += normalized_match
+            return return_list_bracket_expr_by_name
+
+        #following regex stops at first closing bracket, nested bracketed expressions require nested=True
+        if brackets == ("{{","}}"):
+            reg_bracket_expr_by_name = self.titled_curly_bracketed_expr
+        elif brackets == ("[[","]]"):
+            reg_bracket_expr_by_name = self.titled_square_bracketed_expr
         else:
-            regex = "".join([left_bra, name, pipe, "([^", right_bra,"])*", right_bra])
-        reg_bracket_expr_by_name = re.compile(regex)
-        matcher = re.finditer(reg_bracket_expr_by_name, content)
+            reg_bracket_expr_by_name = self._bracket_expr_by_name_regex(name, brackets)
+        matcher = reg_bracket_expr_by_name.finditer(content)
         return_list_bracket_expr_by_name = []
         if matcher :
             for m in matcher:
@@ -424,7 +1867,7 @@ class WikiPageParser:
                 normalized_match = list(norm_function(m.group(0), context_titles))
                 #do not add if empty and keep_empty_expr=False
                 if not keep_empty_expr and not normalized_match:
-                    break
+                    continue
                 return_list_bracket_expr_by_name += normalized_match
         return return_list_bracket_expr_by_name
 
@@ -436,23 +1879,656 @@ class WikiPageParser:
     brackets (couple(str)) : a couple indicating which is left and right bracket for expression
     norm_function (funct) : a normalization function to apply on all extracted bracket expression
     keep_empty_expr (bool) : should empty extracated (& normalized) elements be kept in result
+    nested (bool) : should expressions be found with scan_bracket_expr (nested ones included) rather than with regular expressions
 
     Returns:
     list(str) : a list of all bracketed expressions
     """
-    def extr_all_bracket_expr(self, content, context_titles, brackets = ("{{","}}"), norm_function=lambda expr, context_titles: expr, keep_empty_expr=False):
-        return self.extr_all_bracket_expr_by_name(content, context_titles, "", brackets, norm_function, keep_empty_expr)
+    def extr_all_bracket_expr(self, content, context_titles, brackets = ("{{","}}"), norm_function=lambda expr, context_titles: expr, keep_empty_expr=False, nested=False):
+        return self.extr_all_bracket_expr_by_name(content, context_titles, "", brackets, norm_function, keep_empty_expr, nested)
+
+    """scans a content once, keeping track of the nesting of {{...}} and [[...]] expressions (and of those of given brackets), and retrieves all bracketed expressions of given brackets, nested ones included. Each expression is split over its own pipes only, pipes of nested expressions are left in its arguments. Expressions left unclosed are considered as text.
+
+    Args:
+    content (str): content we want to scan bracketed expressions of
+    brackets (couple(str)) : a couple indicating which is left and right bracket for expression
+
+    Returns:
+    list(tuple(int, int, str, list(str))) : for each bracketed expression, in order of appearance, its start and end in content, its name (first element of split, stripped) and its arguments (following elements of split)
+    """
+    def scan_bracket_expr(self, content, brackets = ("{{","}}")):
+        left_bra = brackets[0]
+        right_bra = brackets[1]
+        if left_bra not in content:
+            return []
+        bracket_tokens = self.bracket_tokens.get(brackets)
+        if bracket_tokens is None:
+            closing_to_opening = {"}}": "{{", "]]": "[["}
+            closing_to_opening[right_bra] = left_bra
+            tokens = sorted(set(closing_to_opening) | set(closing_to_opening.values()), key=len, reverse=True)
+            reg_tokens = re.compile("|".join([re.escape(token) for token in tokens] + ["\\|"]))
+            bracket_tokens = self.bracket_tokens[brackets] = (reg_tokens, closing_to_opening)
+        reg_tokens, closing_to_opening = bracket_tokens
+
+        #stack of open expressions : [left bracket, start, positions of pipes]
+        stack = []
+        #number of open expressions of each left bracket in the stack
+        open_counts = dict.fromkeys(closing_to_opening.values(), 0)
+        spans = []
+        for matcher in reg_tokens.finditer(content):
+            token = matcher.group(0)
+            if token == "|":
+                if stack:
+                    stack[-1][2].append(matcher.start())
+            elif token in open_counts:
+                stack.append([token, matcher.start(), []])
+                open_counts[token] += 1
+            else:
+                opening = closing_to_opening[token]
+                #closing bracket of no open expression is text
+                if not open_counts[opening]:
+                    continue
+                opened, start, pipes = stack.pop()
+                open_counts[opened] -= 1
+                #unclosed expressions inside are text, their pipes belong to the expression they are in
+                while not opened == opening:
+                    unclosed_pipes = pipes
+                    opened, start, pipes = stack.pop()
+                    open_counts[opened] -= 1
+                    pipes += unclosed_pipes
+                if opened == left_bra:
+                    spans.append((start, matcher.end(), pipes))
+
+        #outer expressions are closed after the ones they contain
+        spans.sort()
+        scanned_exprs = []
+        for start, end, pipes in spans:
+            splitted = []
+            previous_end = start + len(left_bra)
+            for pipe in pipes:
+                splitted.append(content[previous_end:pipe])
+                previous_end = pipe + 1
+            splitted.append(content[previous_end:end - len(right_bra)])
+            scanned_exprs.append((start, end, splitted[0].strip(), splitted[1:]))
+        return scanned_exprs
+
+    """memoized version of a cacheable function, keyed on expression and context titles it depends on (results are copied, as normalized sets are consumed by toDict)
+
+    Args:
+    funct (funct): cacheable function (str:expr, list(str):context_titles) -> object
+    cache (MemoCache): cache of results
+
+    Returns:
+    funct : function (str:expr, list(str):context_titles) -> object
+    """
+    def _memoized(self, funct, cache):
+        context = funct.cache_context
+        def memoized(expr, context_titles):
+            key = (funct, expr, self._relevant_context(context_titles, context))
+            result = cache.get(key)
+            if result is None:
+                result = funct(expr, context_titles)
+                cache.put(key, result)
+            return copy.copy(result)
+        return memoized
+
+    #innermost context titles a cached result depends on (all of them if context is None)
+    def _relevant_context(self, context_titles, context):
+        if context is None:
+            return tuple(context_titles)
+        return tuple(context_titles[len(context_titles) - context:]) if context else ()
+
+    #hits, misses and hit rate of each cache of the parser (in this process)
+    def cache_stats(self):
+        return {name:cache.to_dict() for name, cache in self.caches.items()} if self.caches else {}
+
+    #regular expressions built on the go (custom brackets, attribute names) are compiled once and kept
+    def _compile(self, regex):
+        if isinstance(regex, re.Pattern):
+            return regex
+        compiled_regex = self.compiled_regexes.get(regex)
+        if compiled_regex is None:
+            compiled_regex = self.compiled_regexes[regex] = re.compile(regex)
+        return compiled_regex
 
     #in order to make the dictionary more easy to read when printed this functions returns a correctly indented string
     def pretty_str(self, parsed_dict):
         return json.dumps(parsed_dict, ensure_ascii=False, indent=4)
 
+    #in order to make output as small and fast to write as possible, this function returns a one line string (using orjson when installed)
+    def compact_str(self, parsed_dict):
+        if orjson:
+            return orjson.dumps(parsed_dict).decode("utf-8")
+        return json.dumps(parsed_dict, ensure_ascii=False, separators=(",", ":"))
+
+
+#A filter of pages, checked by parse_dump as soon as the title, namespace and redirection of a page are read : rejected pages are neither extracted from the dump, parsed nor written.
+class PageFilter:
+
+    """constructor
+
+    Args:
+    namespaces (list(int or str)): namespaces of pages to keep (i.e. [0] for main namespace), all if None
+    titles (iterable(str)): titles of pages to keep, all if None
+    title_regex (str): regular expression which titles of pages to keep should match (searched), all if None
+    skip_redirects (bool): should redirection pages be rejected
+    """
+    def __init__(self, namespaces=None, titles=None, title_regex=None, skip_redirects=False):
+        self.namespaces = set(str(ns) for ns in namespaces) if namespaces is not None else None
+        self.titles = set(titles) if titles is not None else None
+        self.title_regex = re.compile(title_regex) if title_regex else None
+        self.skip_redirects = skip_redirects
+
+    """reads titles of pages to keep from a file (one title per line)
+
+    Args:
+    path_to_titles (str): path to file of titles
+
+    Returns:
+    set(str) : titles of file
+    """
+    @staticmethod
+    def read_titles(path_to_titles):
+        with open(path_to_titles, encoding="utf-8") as titles_file:
+            return set(line.rstrip("\n") for line in titles_file if line.strip())
+
+    """checks whether a page is to be kept from its title and namespace
+
+    Args:
+    title (str): title of the page
+    ns (str): namespace of the page
+
+    Returns:
+    bool : True if the page is to be parsed
+    """
+    def accepts(self, title, ns):
+        if self.namespaces is not None and ns not in self.namespaces:
+            return False
+        if self.titles is not None and title not in self.titles:
+            return False
+        if self.title_regex and not self.title_regex.search(title):
+            return False
+        return True
+
+    #text of redirection pages begins with "#REDIRECT" (or "#REDIRECTION"...), whatever the case
+    def is_redirect_text(self, text):
+        return bool(text) and text.lstrip()[:9].upper() == "#REDIRECT"
+
+
+#Instrumentation of parse_dump : cumulative time spent in each stage, counters, throughput and slowest pages, reported periodically in a json file and to a callback.
+#Stages are "xml" (reading and decompressing the dump, iterparse), "tostring", "toDict" (sections, without user functions), "title_normalisation" and "content_extraction" (user functions), "serialization", "writing" and "waiting_workers". With many workers, stages run by workers add up their time in all processes.
+class ParseStats:
+
+    """constructor
+
+    Args:
+    path_to_stats (str): path of json file in which stats are written at each report (None for no file)
+    callback (funct): function dict -> None called with stats at each report (None for no callback)
+    report_interval (float): seconds between two reports while parsing (a last one is made at the end)
+    slowest_pages (int): number of slowest pages kept (by time spent parsing and serializing them)
+    """
+    def __init__(self, path_to_stats=None, callback=None, report_interval=10, slowest_pages=10):
+        self.path_to_stats = path_to_stats
+        self.callback = callback
+        self.report_interval = report_interval
+        self.slowest_pages = slowest_pages
+        self.timers = collections.defaultdict(float)
+        self.counters = collections.defaultdict(int)
+        #heap of (seconds, title) of slowest pages
+        self.slowest = []
+        #time spent in stages of the main process, the remaining time of the loop over the dump being spent in xml
+        self.main_seconds = 0
+        self.loop_start = None
+        self.loop_end = None
+        self.next_report = None
+        self.input_bytes = 0
+
+    def start_loop(self):
+        self.loop_start = time.perf_counter()
+        self.next_report = self.loop_start + self.report_interval
+
+    def end_loop(self):
+        self.loop_end = time.perf_counter()
+
+    def add_time(self, stage, seconds):
+        self.timers[stage] += seconds
+        self.main_seconds += seconds
+
+    def count(self, counter, number=1):
+        self.counters[counter] += number
+
+    #a parsed page, in the heap of slowest pages if it is one of them
+    def add_page(self, title, seconds, is_error=False):
+        self.counters["parsed_pages"] += 1
+        if is_error:
+            self.counters["error_pages"] += 1
+        self._keep_if_slowest(title, seconds)
+
+    def _keep_if_slowest(self, title, seconds):
+        if len(self.slowest) < self.slowest_pages:
+            heapq.heappush(self.slowest, (seconds, title))
+        elif self.slowest and seconds > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, (seconds, title))
+
+    """wraps a function so that time spent in it is added to a stage (user functions are called inside toDict, whose time they are removed from)
+
+    Args:
+    stage (str): name of stage
+    funct (funct): function to time
+
+    Returns:
+    funct : function timing funct
+    """
+    def timed(self, stage, funct):
+        timers = self.timers
+        def timed_funct(*args):
+            start = time.perf_counter()
+            try:
+                return funct(*args)
+            finally:
+                timers[stage] += time.perf_counter() - start
+        #timed cacheable functions stay cacheable
+        if hasattr(funct, "cache_context"):
+            timed_funct.cache_context = funct.cache_context
+        return timed_funct
+
+    #stats recorded by a worker process since its last batch, which are then reset
+    def pop_delta(self):
+        delta = (dict(self.timers), dict(self.counters), self.slowest)
+        self.timers.clear()
+        self.counters.clear()
+        self.slowest = []
+        return delta
+
+    #adds stats recorded by a worker process (not in main process time)
+    def merge(self, delta):
+        timers, counters, slowest = delta
+        for stage, seconds in timers.items():
+            self.timers[stage] += seconds
+        for counter, number in counters.items():
+            self.counters[counter] += number
+        for seconds, title in slowest:
+            self._keep_if_slowest(title, seconds)
+
+    def is_report_due(self):
+        return self.next_report is not None and time.perf_counter() >= self.next_report
+
+    """stats as a dictionary : seconds spent in each stage, counters, pages and bytes per second, and slowest pages
+
+    Returns:
+    dict : stats
+    """
+    def to_dict(self):
+        now = self.loop_end if self.loop_end else time.perf_counter()
+        elapsed = now - self.loop_start if self.loop_start else 0
+        timers = dict(self.timers)
+        if "toDict" in timers:
+            timers["toDict"] -= timers.get("title_normalisation", 0) + timers.get("content_extraction", 0)
+        timers["xml"] = max(0, elapsed - self.main_seconds)
+        pages = self.counters["parsed_pages"]
+        #hit rates of caches of parser, from their counters
+        cache_hit_rates = {}
+        for counter in self.counters:
+            if counter.endswith("_cache_misses"):
+                name = counter[:-len("_cache_misses")]
+                hits = self.counters.get(name + "_cache_hits", 0)
+                cache_hit_rates[name] = round(hits / (hits + self.counters[counter]), 4)
+        return {"elapsed_seconds":round(elapsed, 3),
+                "pages":pages,
+                "pages_per_sec":round(pages / elapsed, 1) if elapsed else None,
+                "input_bytes":self.input_bytes,
+                "input_bytes_per_sec":round(self.input_bytes / elapsed) if elapsed else None,
+                "seconds":{stage:round(seconds, 3) for stage, seconds in sorted(timers.items())},
+                "counters":dict(self.counters),
+                "cache_hit_rates":cache_hit_rates,
+                "slowest_pages":[{"title":title, "seconds":round(seconds, 4)} for seconds, title in sorted(self.slowest, reverse=True)]}
+
+    #writes stats in json file and gives them to callback
+    def report(self):
+        stats_dict = self.to_dict()
+        if self.path_to_stats:
+            with open(self.path_to_stats + ".tmp", "w") as stats_file:
+                json.dump(stats_dict, stats_file, ensure_ascii=False, indent=4)
+            os.replace(self.path_to_stats + ".tmp", self.path_to_stats)
+        if self.callback:
+            self.callback(stats_dict)
+        if self.next_report is not None:
+            self.next_report = time.perf_counter() + self.report_interval
+
+
+#Store of the pages parsed by previous runs of parse_dump (sqlite database), for incremental parsing : each page is kept with the revision it was parsed from (its revision id and sha1) and its result, under a hash of the parsing configuration.
+#Pages whose revision is unchanged reuse their result instead of being parsed again, and pages of previous runs missing from the dump are reported as deleted.
+class RevisionStore:
+
+    """constructor
+
+    Args:
+    path_to_store (str): path of sqlite database (created if missing)
+    config_hash (str): hash of parsing configuration, results of other configurations are neither reused nor overwritten
+    resume (bool): are pages seen in the dump before the checkpoint of an interrupted run to be kept (default False : a new run over the dump starts)
+    batch_size (int): number of saved pages written at once in database
+    """
+    def __init__(self, path_to_store, config_hash, resume=False, batch_size=10000):
+        self.config_hash = config_hash
+        self.batch_size = batch_size
+        self.connection = sqlite3.connect(path_to_store)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS pages (config_hash TEXT, page_id TEXT, title TEXT, revision TEXT, is_error INTEGER, result TEXT, PRIMARY KEY (config_hash, page_id))")
+        #ids of pages met in the dump by the current run (kept on disk, so that an interrupted run can be resumed)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS seen (config_hash TEXT, page_id TEXT, PRIMARY KEY (config_hash, page_id))")
+        if not resume:
+            self.connection.execute("DELETE FROM seen WHERE config_hash = ?", (config_hash,))
+        self.connection.commit()
+        #first run with this configuration, no page is looked up
+        self.is_empty = self.connection.execute("SELECT 1 FROM pages WHERE config_hash = ? LIMIT 1", (config_hash,)).fetchone() is None
+        self.pending_saves = []
+        self.pending_seen = []
+
+    """hash of a parsing configuration, to be given to the constructor
+
+    Args:
+    config (object): any json serializable description of parsing arguments (options of extraction, output format...)
+
+    Returns:
+    str : sha1 of configuration
+    """
+    @staticmethod
+    def hash_config(config):
+        return hashlib.sha1(json.dumps(config, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    #description of a parsing function to be hashed in a configuration : its qualified name and a hash of its bytecode, so that results are not reused once it is changed (values it holds, as its closure or instance, are not described)
+    @staticmethod
+    def describe_function(funct):
+        funct = getattr(funct, "__func__", funct)
+        code = getattr(funct, "__code__", None)
+        return [getattr(funct, "__module__", None), getattr(funct, "__qualname__", type(funct).__qualname__), hashlib.sha1(code.co_code).hexdigest() if code else None]
+
+    """result saved for a page, if it was parsed from the same revision
+
+    Args:
+    page_id (str): id of page
+    revision (str): revision of page in the dump (None if unknown, the page is then always parsed again)
+
+    Returns:
+    tuple(bool, str) : result of page as given by _parse_page (is_error, serialized page or error), None if page is new or changed
+    """
+    def lookup(self, page_id, revision):
+        if revision is None or self.is_empty:
+            return None
+        row = self.connection.execute("SELECT is_error, result FROM pages WHERE config_hash = ? AND page_id = ? AND revision = ?", (self.config_hash, page_id, revision)).fetchone()
+        if row is None:
+            return None
+        return bool(row[0]), row[1]
+
+    #saves result of a (new or changed) parsed page
+    def save(self, page_id, title, revision, result):
+        is_error, to_print = result
+        self.pending_saves.append((self.config_hash, page_id, title, revision, int(is_error), to_print))
+        if len(self.pending_saves) >= self.batch_size:
+            self.flush()
+
+    #records that a page is in the dump
+    def mark_seen(self, page_id):
+        self.pending_seen.append((self.config_hash, page_id))
+        if len(self.pending_seen) >= self.batch_size:
+            self.flush()
+
+    #writes pending pages in database, in one transaction
+    def flush(self):
+        with self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)", self.pending_saves)
+            self.connection.executemany("INSERT OR IGNORE INTO seen VALUES (?, ?)", self.pending_seen)
+        self.pending_saves.clear()
+        self.pending_seen.clear()
+
+    """removes pages which were not seen in the dump by the current run (once it is over)
+
+    Returns:
+    list(tuple(str, str)) : id and title of deleted pages
+    """
+    def pop_deleted_pages(self):
+        self.flush()
+        query = "FROM pages WHERE config_hash = ? AND page_id NOT IN (SELECT page_id FROM seen WHERE config_hash = ?)"
+        with self.connection:
+            deleted_pages = self.connection.execute("SELECT page_id, title " + query, (self.config_hash, self.config_hash)).fetchall()
+            self.connection.execute("DELETE " + query, (self.config_hash, self.config_hash))
+        return deleted_pages
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+
+#Output of parse_dump in a sqlite database, in which pages can be looked up by title or id and extracted values by the sections they are found in :
+#table "pages" (page_id, ns, title, content) holds the json of the sections of each page, and table "page_values" (page_id, section_path, value) each value of their content attributes, with the path of titles of the sections it is in ("fr/nom/traductions"). Indexes are built once all pages are written.
+class SqliteSink:
+
+    """constructor
+
+    Args:
+    parser (WikiPageParser): parser whose compact_str serializes contents of pages
+    path_to_db (str): path of database (tables of a previous output are replaced)
+    content_attribute_name (str): name of content attributes, whose values are written in "page_values"
+    resume_position (list(int)): position returned by position() at the checkpoint of an interrupted run, rows written after it are removed (default None : a new output is started)
+    """
+    def __init__(self, parser, path_to_db, content_attribute_name="content", resume_position=None):
+        self.parser = parser
+        self.content_attribute_name = content_attribute_name
+        self.connection = sqlite3.connect(path_to_db)
+        #pages written by a batch are only committed with it
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        with self.connection:
+            if resume_position:
+                self.connection.execute("DELETE FROM pages WHERE rowid > ?", (resume_position[0],))
+                self.connection.execute("DELETE FROM page_values WHERE rowid > ?", (resume_position[1],))
+            else:
+                self.connection.execute("DROP TABLE IF EXISTS pages")
+                self.connection.execute("DROP TABLE IF EXISTS page_values")
+                self.connection.execute("CREATE TABLE pages (page_id INTEGER, ns INTEGER, title TEXT, content TEXT)")
+                self.connection.execute("CREATE TABLE page_values (page_id INTEGER, section_path TEXT, value TEXT)")
+
+    """writes a batch of pages in one transaction
+
+    Args:
+    lines (list(str)): pages serialized as compact json objects {"title", "id", "ns", "content"} (as jsonl output of parse_dump)
+    """
+    def write_pages(self, lines):
+        loads = orjson.loads if orjson else json.loads
+        page_rows = []
+        value_rows = []
+        for line in lines:
+            page = loads(line)
+            page_id = page["id"]
+            page_rows.append((page_id, page["ns"], page["title"], self.parser.compact_str(page["content"])))
+            for section_path, value in self.flatten(page["content"]):
+                value_rows.append((page_id, section_path, value))
+        with self.connection:
+            self.connection.executemany("INSERT INTO pages VALUES (?, ?, ?, ?)", page_rows)
+            self.connection.executemany("INSERT INTO page_values VALUES (?, ?, ?)", value_rows)
+
+    """values of content attributes of sections of a page, one per element when they are lists (values which are not strings are serialized)
+
+    Args:
+    sections (dict): sections of a page (as returned by toDict)
+    section_path (tuple(str)): titles of sections in which sections are nested
+
+    Returns:
+    generator(tuple(str, str)) : path of titles of section joined by "/", and value
+    """
+    def flatten(self, sections, section_path=()):
+        for name, value in sections.items():
+            if name == self.content_attribute_name:
+                path = "/".join(section_path)
+                for element in (value if isinstance(value, list) else [value]):
+                    yield path, element if isinstance(element, str) else self.parser.compact_str(element)
+            elif isinstance(value, dict):
+                yield from self.flatten(value, section_path + (name,))
+
+    #last rows written in tables (committed), from which a checkpointed output can be resumed
+    def position(self):
+        return [self.connection.execute("SELECT max(rowid) FROM " + table).fetchone()[0] or 0 for table in ["pages", "page_values"]]
+
+    def flush(self):
+        self.connection.commit()
+
+    #builds indexes on titles and ids of pages and on section paths of values, once all pages are written
+    def close(self):
+        with self.connection:
+            self.connection.execute("CREATE INDEX IF NOT EXISTS pages_title ON pages (title)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS pages_id ON pages (page_id)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS page_values_path ON page_values (section_path, value)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS page_values_id ON page_values (page_id)")
+        self.connection.close()
+
+
+#A compiled plan of extraction, built once from the options of the command line (-b/-k/-t/-x/-n) or from library arguments.
+#It holds compiled regular expressions and index/slice selectors, and offers specialized functions to be given to toDict or parse_dump as section_titles_normalisation_funct and content_extraction_funct, giving the same results as composing norm_bracket_expr and extr_all_bracket_expr_by_name.
+class ExtractionPlan:
+
+    """constructor
+
+    Args:
+    parser (WikiPageParser): parser whose 'ignore' attribute decides what to do with out of range errors
+    name (str): name of bracketed expressions to extract content from (all bracketed expressions if None)
+    extractor (str, int, slice or funct): either an index or a slice (or their string form "x" or "x:y") of element of split, a regular expression (any other string) which variable names of "var = val" assignements should match to extract their value, or a function (list(str), list(str)) -> list(str) applied on splitted expression. If None, whole bracketed expressions are extracted.
+    brackets (couple(str)): a couple indicating which is left and right bracket for expression
+    title_index (int): index of bracketed expressions to normalize titles into (titles are left unchanged if None)
+    keep_empty_expr (bool): should empty extracated (& normalized) elements be kept in result
+    nested (bool): should bracketed expressions be found with scan_bracket_expr (nested ones included) rather than with regular expressions
+    """
+    def __init__(self, parser, name=None, extractor=None, brackets=("{{","}}"), title_index=None, keep_empty_expr=False, nested=False):
+        self.parser = parser
+        self.name = name if name else ""
+        self.brackets = brackets
+        self.title_index = title_index
+        self.keep_empty_expr = keep_empty_expr
+        self.nested = nested
+
+        #regex matching bracketed expressions of given name, compiled once by the parser
+        self.regex_bracket_expr_by_name = parser._bracket_expr_by_name_regex(self.name, brackets)
+
+        #string form of index or slice
+        if isinstance(extractor, str):
+            extractor = self.parse_index(extractor)
+        self.extractor = extractor
+        self.extract = self._build_extract()
+
+    """turns a command line index ("x") or slice ("x:y", "x:") into an int or a slice, other strings are left unchanged (regular expressions on variable names)
+
+    Args:
+    param_str (str): index, slice or regular expression
+
+    Returns:
+    int, slice or str : selector of elements of splitted expressions
+    """
+    @staticmethod
+    def parse_index(param_str):
+        reg_valid_index = re.compile("^(\\-?[0-9]+):?(\\-?[0-9]+)?$")
+        if not reg_valid_index.search(param_str):
+            return param_str
+        index_double_colon = param_str.find(":")
+        if index_double_colon == -1:
+            return int(param_str)
+        x = int(param_str[:index_double_colon])
+        y = int(param_str[index_double_colon+1:]) if not index_double_colon == len(param_str) - 1 else None
+        return slice(x, y, 1)
+
+    #splitted form of all bracketed expressions of given name in a content
+    def _splitted_exprs(self, content, context_titles):
+        if self.nested:
+            for start, end, name, args in self.parser.scan_bracket_expr(content, self.brackets):
+                if not self.name or name == self.name:
+                    yield [name] + args
+        else:
+            split_bracket_expr = self.parser._split_bracket_expr
+            for matcher in self.regex_bracket_expr_by_name.finditer(content):
+                yield split_bracket_expr(matcher.group(0), context_titles, self.brackets, False)
+
+    """builds the content extraction function specialized for the kind of extractor
+
+    Returns:
+    funct : function (str:content, list_str:titles_context) -> list(str) extracting values out of all matching bracketed expressions of a content
+    """
+    def _build_extract(self):
+        parser = self.parser
+        splitted_exprs = self._splitted_exprs
+        extractor = self.extractor
+        keep_empty_expr = self.keep_empty_expr
+
+        #a single element per expression, never empty
+        if isinstance(extractor, int):
+            def extract(content, context_titles):
+                extracted = []
+                for splitted in splitted_exprs(content, context_titles):
+                    try:
+                        extracted.append(splitted[extractor])
+                    except(IndexError):
+                        raise parser._index_error(splitted, context_titles)
+                return extracted
+            return extract
+
+        #values of "var = val" assignements whose variable name matches regular expression
+        if isinstance(extractor, str):
+            reg_attr = parser._compile(extractor)
+            nested = self.nested
+            def extract(content, context_titles):
+                extracted = []
+                for splitted in splitted_exprs(content, context_titles):
+                    normalized_match = set(parser._attribute_values(splitted, reg_attr, nested))
+                    #do not add if empty and keep_empty_expr=False
+                    if not keep_empty_expr and not normalized_match:
+                        continue
+                    extracted += list(normalized_match)
+                return extracted
+            return extract
+
+        #a slice, a function or whole expressions
+        if isinstance(extractor, slice):
+            select = lambda splitted, context_titles: splitted[extractor]
+        elif extractor is None:
+            select = lambda splitted, context_titles: ["|".join(splitted)]
+        else:
+            select = extractor
+        def extract(content, context_titles):
+            extracted = []
+            for splitted in splitted_exprs(content, context_titles):
+                try:
+                    elems = select(splitted, context_titles)
+                except(IndexError):
+                    raise parser._index_error(splitted, context_titles)
+                normalized_match = set(elems)
+                #do not add if empty and keep_empty_expr=False
+                if not keep_empty_expr and not normalized_match:
+                    continue
+                extracted += list(normalized_match)
+            return extracted
+        return extract
+
+    """normalizes a section title into the element of given index of its first {{...}} expression (titles are left unchanged if title_index is None)
+
+    Args:
+    title (str): section title
+    context_titles (list(str)): succesion of titles in which current section is nested
+
+    Returns:
+    set : a set of one unique str object which is the normalized title
+    """
+    @cacheable
+    def normalize_title(self, title, context_titles):
+        if self.title_index is None:
+            return {title}
+        splitted = self.parser._split_bracket_expr(title, context_titles, ("{{","}}"), self.nested)
+        try:
+            return {splitted[self.title_index]}
+        except(IndexError):
+            raise self.parser._index_error(splitted, context_titles)
+
 
 if __name__ == '__main__': 
 
     parser = argparse.ArgumentParser(description='A general parser for wiki pages.')
     parser.add_argument("-l", "--lang", help="Language targeted. (i.e. 'en', 'fr', 'de', 'es'...)", default=None)
-    parser.add_argument("-p", "--path", help="Path for dump.", default=None)
+    parser.add_argument("-p", "--path", help="Path for dump (.xml or .bz2), or http(s) url of dump, or '-' to read it from standard input (i.e. piped from WikimediaDumpDownloader.py -s), streamed into the parsing without intermediate file.", default=None)
     parser.add_argument("-o", "--out", help="Path for output of parsing.", default=None)
     parser.add_argument("-s", "--std", help="Print output on terminal", action='store_true', default=False)
     parser.add_argument("-e", "--err", help="Path for log of errors in parsing.", default=None)
@@ -464,61 +2540,64 @@ if __name__ == '__main__':
     parser.add_argument("-n", "--norm", help="Index of bracketed expressions to normalize titles into.", default=None)
     parser.add_argument("-t", "--title", help="Name of bracketed expressions to extract content from.", default=None)
     parser.add_argument("-x", "--extr", help="Either a index or slice in format x:y (of element of split) or a regular expression (which variable name should match to extract value of)", default=None)
+    parser.add_argument("-m", "--nested", help="Include param to find bracketed expressions respecting their nesting (i.e. {{a|{{b|c}}}}), instead of stopping at first closing bracket.", action='store_true', default=False)
+    parser.add_argument("-f", "--format", help="Format of output : 'pretty' (indented, for debugging) or 'jsonl' (one compact json object per line) or 'sqlite' (database of pages and extracted values, indexed by title and section path) (default \"pretty\")", choices=["pretty", "jsonl", "sqlite"], default="pretty")
+    parser.add_argument("-w", "--workers", help="Number of worker processes parsing pages (default 1)", type=int, default=1)
+    parser.add_argument("-q", "--ns", help="Namespaces of pages to parse, separated by commas (i.e. '0' for main namespace only). All namespaces are parsed by default.", default=None)
+    parser.add_argument("-u", "--titles", help="Path to file of titles of pages to parse (one per line).", default=None)
+    parser.add_argument("-r", "--regex", help="Regular expression which titles of pages to parse should match.", default=None)
+    parser.add_argument("-z", "--no_redirects", help="Include param to skip redirection pages.", action='store_true', default=False)
+    parser.add_argument("-y", "--checkpoint", help="Number of written pages after which a checkpoint is saved next to output file (no checkpoint by default).", type=int, default=None)
+    parser.add_argument("-g", "--resume", help="Include param to restart parsing from the checkpoint of a previous run, appending to its output and errors files.", action='store_true', default=False)
+    parser.add_argument("-j", "--index", help="Include param to build the page index of the dump (written next to it as '<dump>.index'), instead of parsing it.", action='store_true', default=False)
+    parser.add_argument("-v", "--page", help="Title of a single page to parse (found through page index of the dump, built if missing) and print, instead of parsing the whole dump.", default=None)
+    parser.add_argument("--store", help="Path for database of parsed pages (created if missing), for incremental parsing : pages whose revision is unchanged since previous run reuse their result, deleted pages are written next to output file (as '<out>.deleted').", default=None)
+    parser.add_argument("--tee", help="Path for copy of a dump streamed from an url or standard input, written as it is parsed (no copy by default).", default=None)
+    parser.add_argument("--cache", help="Number of normalized titles kept in cache, so that titles repeated over pages (i.e. '=== {{S|nom|fr}} ===') are normalized once (no cache by default).", type=int, default=0)
+    parser.add_argument("--stats", help="Path for json file of stats of parsing (time spent in each stage, pages and bytes per second, slowest pages), written every 10 seconds.", default=None)
     parser.add_argument("-i", "--ign", help="Include param not to 'ignore' out of range errors during title normalization. Such errors will than stop execution, and title won't be normalized (instead of only being printed in error file).", action='store_false', default=True)
 
     args = parser.parse_args()
-    wpp = WikiPageParser(args.ign, args.title, args.std)
+    wpp = WikiPageParser(args.ign, args.title, args.std, args.cache)
 
-    #define section titles normalisation function
-    if args.norm:
-        index = int(args.norm)
-        section_titles_normalisation_funct = lambda title, context_titles: wpp.norm_bracket_expr(title, context_titles, lambda splitted, context_titles: [splitted[index]])
-    else:
-        section_titles_normalisation_funct = lambda title, context_titles: [title]
+    #compile extraction once from command line options
+    plan = ExtractionPlan(wpp, args.title, args.extr, (args.bra, args.ket), int(args.norm) if args.norm else None, args.add, args.nested)
+    section_titles_normalisation_funct = plan.normalize_title
+    content_extraction_funct = plan.extract
 
-    #a function to check if args.extr is a valid input for list index
-    def valid_index(param_str):
-        reg_valid_index = re.compile("^(\-?[0-9]+):?(\-?[0-9]+)?$")
-        return reg_valid_index.search(param_str)
-
-    #if only one element is returned by extraction function, turn into a list
-    def include_in_list_if_not_one(elem):
-        if not isinstance(elem, list):
-            return [elem]
-        else:
-            return elem
-
-    #define content extraction function if numerical
-    if valid_index(args.extr):
-        index_double_colon = args.extr.find(":")
-        if not index_double_colon == -1:
-            x = int(args.extr[:index_double_colon])
-            if not index_double_colon == len(args.extr) - 1:
-                y = int(args.extr[index_double_colon+1:])
-            else:
-                y = None
-            index = slice(x,y,1)
-        else:
-            index = int(args.extr)
-
-        args.extr = lambda splitted, context_titles: include_in_list_if_not_one(splitted[index])
-        
-
-    norm_function = lambda expr, context_titles: wpp.norm_bracket_expr(expr, context_titles, args.extr, lambda expr, context_titles: expr, (args.bra, args.ket))
-    if args.title:
-        content_extraction_funct = lambda content, context_titles : wpp.extr_all_bracket_expr_by_name(content, context_titles, args.title, (args.bra, args.ket), norm_function, args.add)
-    else:
-        content_extraction_funct = lambda content, context_titles : wpp.extr_all_bracket_expr(content, context_titles, (args.bra, args.ket), norm_function, args.add)
+    #pages to parse
+    page_filter = None
+    if args.ns is not None or args.titles or args.regex or args.no_redirects:
+        page_filter = PageFilter(args.ns.split(",") if args.ns is not None else None, 
+                                 PageFilter.read_titles(args.titles) if args.titles else None, 
+                                 args.regex, 
+                                 args.no_redirects)
 
+    #build page index of dump
+    if args.index:
+        wpp.build_page_index(args.path)
+    #parse a single page, found through page index of dump
+    elif args.page:
+        print(wpp.pretty_str(wpp.parse_page(args.path, args.page, section_titles_normalisation_funct, content_extraction_funct, args.add, args.cont, args.default)))
     #parse
-    wpp.parse_dump( lang=args.lang, 
-                    path_to_dump=args.path, 
-                    path_to_output=args.out, 
-                    path_to_errors=args.err, 
-                    section_titles_normalisation_funct=section_titles_normalisation_funct,
-                    content_extraction_funct=content_extraction_funct,
-                    add_empty_contents=args.add,
-                    content_attribute_name=args.cont,
-                    default_attribute_name=args.default
-                    )
+    else:
+        wpp.parse_dump( lang=args.lang, 
+                        path_to_dump=args.path, 
+                        path_to_output=args.out, 
+                        path_to_errors=args.err, 
+                        section_titles_normalisation_funct=section_titles_normalisation_funct,
+                        content_extraction_funct=content_extraction_funct,
+                        add_empty_contents=args.add,
+                        content_attribute_name=args.cont,
+                        default_attribute_name=args.default,
+                        workers=args.workers,
+                        output_format=args.format,
+                        page_filter=page_filter,
+                        checkpoint_frequency=args.checkpoint,
+                        resume=args.resume,
+                        stats=ParseStats(args.stats) if args.stats else None,
+                        path_to_store=args.store,
+                        config={"title":args.title, "extr":args.extr, "bra":args.bra, "ket":args.ket, "norm":args.norm, "nested":args.nested, "ign":args.ign},
+                        path_to_tee=args.tee
+                        )
 
@@ -0,0 +1,387 @@
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+import xml.sax.saxutils
+
+import WikiPageParser as wpp
+
+#header and footer of a dump in MediaWiki export schema
+DUMP_HEADER = """<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.10/" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:schemaLocation="http://www.mediawiki.org/xml/export-0.10/ http://www.mediawiki.org/xml/export-0.10.xsd" version="0.10" xml:lang="fr">
+  <siteinfo>
+    <sitename>Wiktionnaire</sitename>
+    <dbname>frwiktionary</dbname>
+    <base>https://fr.wiktionary.org/wiki/Wiktionnaire:Page_d%E2%80%99accueil</base>
+    <generator>MediaWiki 1.35.0-wmf.36</generator>
+    <case>case-sensitive</case>
+    <namespaces>
+      <namespace key="0" case="case-sensitive" />
+      <namespace key="10" case="case-sensitive">Modèle</namespace>
+    </namespaces>
+  </siteinfo>
+"""
+DUMP_FOOTER = "</mediawiki>\n"
+
+PAGE_TEMPLATE = """  <page>
+    <title>{title}</title>
+    <ns>{ns}</ns>
+    <id>{page_id}</id>
+    <revision>
+      <id>{revision_id}</id>
+      <parentid>{parent_id}</parentid>
+      <timestamp>2020-06-01T00:00:00Z</timestamp>
+      <contributor>
+        <username>Bot</username>
+        <id>1</id>
+      </contributor>
+      <model>wikitext</model>
+      <format>text/x-wiki</format>
+      <text bytes="{size}" xml:space="preserve">{text}</text>
+      <sha1>{sha1}</sha1>
+    </revision>
+  </page>
+"""
+
+#section titles by level, as in french wiktionary
+SECTION_NAMES = ["langue", "nom", "traductions", "synonymes", "dérivés", "notes"]
+WORDS = ["chat", "chien", "maison", "arbre", "soleil", "lune", "pain", "eau", "feu", "terre"]
+
+"""generates a bracketed expression, nesting other ones into its arguments
+
+Args:
+rnd (random.Random): random generator
+nesting (int): number of nested levels of bracketed expressions
+
+Returns:
+str : a template expression (i.e. {{pron|ʃa|fr}})
+"""
+def random_template(rnd, nesting):
+    word = rnd.choice(WORDS)
+    if nesting > 0 and rnd.random() < 0.5:
+        argument = "{{lien|" + random_template(rnd, nesting - 1) + "|fr}}"
+    else:
+        argument = word
+    kind = rnd.random()
+    if kind < 0.4:
+        return "{{pron|" + argument + "|fr}}"
+    if kind < 0.7:
+        return "{{trad+|en|" + argument + "}}"
+    if kind < 0.85:
+        return "[[" + word + "|" + argument + "]]"
+    return "{{ébauche-déf|fr|nocat=1|titre=" + argument + "}}"
+
+"""generates the text of a page, made of nested sections whose lines hold bracketed expressions
+
+Args:
+rnd (random.Random): random generator
+depth (int): deepest level of sections (2 for "== ... ==" only)
+template_density (float): mean number of bracketed expressions per line
+nesting (int): number of nested levels of bracketed expressions
+lines_per_section (int): number of lines of content of each section
+
+Returns:
+str : text of a page
+"""
+def random_page_text(rnd, depth, template_density, nesting, lines_per_section):
+    lines = ["{{voir|" + rnd.choice(WORDS) + "}}"]
+    def add_section(level):
+        equals = "=" * level
+        name = SECTION_NAMES[min(level - 2, len(SECTION_NAMES) - 1)]
+        lines.append(" ".join([equals, "{{S|" + name + "|fr}}", equals]))
+        for line_index in range(lines_per_section):
+            words = [rnd.choice(WORDS) for word_index in range(8)]
+            #about template_density expressions per line
+            templates = int(template_density) + (1 if rnd.random() < template_density - int(template_density) else 0)
+            for template_index in range(templates):
+                words.insert(rnd.randrange(len(words) + 1), random_template(rnd, nesting))
+            lines.append("# " + " ".join(words) + ".")
+        if level < depth:
+            for sub_section_index in range(rnd.randint(1, 2)):
+                add_section(level + 1)
+    for language_index in range(rnd.randint(1, 2)):
+        add_section(2)
+        lines.append("")
+    return "\n".join(lines)
+
+"""writes a synthetic dump in MediaWiki export schema (as those of wikimedia dumps)
+
+Args:
+path_to_dump (str): path of dump to write
+pages (int): number of pages
+depth (int): deepest level of sections (2 for "== ... ==" only)
+template_density (float): mean number of bracketed expressions per line
+nesting (int): number of nested levels of bracketed expressions
+lines_per_section (int): number of lines of content of each section
+seed (int): seed of random generator, the same seed giving the same dump
+
+Returns:
+None
+"""
+def generate_dump(path_to_dump, pages, depth=4, template_density=1.0, nesting=0, lines_per_section=2, seed=0):
+    rnd = random.Random(seed)
+    with open(path_to_dump, "w", encoding="utf-8") as dump:
+        dump.write(DUMP_HEADER)
+        for page_index in range(pages):
+            text = random_page_text(rnd, depth, template_density, nesting, lines_per_section)
+            dump.write(PAGE_TEMPLATE.format(title="mot" + str(page_index),
+                                            ns=0 if rnd.random() < 0.9 else 10,
+                                            page_id=page_index + 1,
+                                            revision_id=page_index + 1000000,
+                                            parent_id=page_index + 500000,
+                                            size=len(text.encode("utf-8")),
+                                            text=xml.sax.saxutils.escape(text),
+                                            sha1="%031x" % page_index))
+        dump.write(DUMP_FOOTER)
+
+#peak resident memory of the process (and of its terminated children, as workers of parse_dump), in KB
+def peak_rss_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss + resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+
+"""times a function, keeping best of many runs
+
+Args:
+funct (funct): function without argument to time
+repeat (int): number of runs
+
+Returns:
+float : seconds of the fastest run
+"""
+def best_time(funct, repeat):
+    best = None
+    for run_index in range(repeat):
+        start = time.perf_counter()
+        funct()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+"""measures memory allocated by a function which is still held by its result
+
+Args:
+funct (funct): function without argument
+
+Returns:
+int : KB allocated by funct and not freed once it returned (its result being kept)
+"""
+def retained_kb(funct):
+    tracemalloc.start()
+    result = funct()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return retained // 1024
+
+#measures of a stage : seconds, throughput and peak memory
+def stage_report(seconds, items, item_name, size):
+    return {"seconds":round(seconds, 4), item_name:items, item_name+"_per_sec":round(items / seconds, 1) if seconds else None, "mb_per_sec":round(size / seconds / 1024 / 1024, 2) if seconds else None, "peak_rss_kb":peak_rss_kb()}
+
+"""runs the benchmark of WikiPageParser over a dump : parse_dump as a whole, then toDict (with an ExtractionPlan against the same extraction composed from norm_bracket_expr and extr_all_bracket_expr_by_name, and against toTree, its section trees being kept for the whole dump or only one section being read), extr_all_bracket_expr_by_name, norm_bracket_expr and pretty_str separately on pages held in memory
+
+Args:
+path_to_dump (str): path to dump
+workers (int): number of worker processes of parse_dump
+repeat (int): number of runs of each stage (best one is reported)
+nested (bool): should bracketed expressions be found respecting their nesting
+
+Returns:
+dict : measures of each stage
+"""
+def run_benchmark(path_to_dump, workers=1, repeat=3, nested=False):
+    parser = wpp.WikiPageParser(targeted_title="pron")
+    plan = wpp.ExtractionPlan(parser, "pron", "1", title_index=1, nested=nested)
+    norm_function = lambda expr, context_titles: parser.norm_bracket_expr(expr, context_titles, lambda splitted, context_titles: [splitted[1]], nested=nested)
+    parsing_args = (plan.normalize_title, plan.extract, False, "content", "unnamed")
+    report = {"dump":path_to_dump, "dump_mb":round(os.path.getsize(path_to_dump) / 1024 / 1024, 2), "workers":workers, "repeat":repeat, "nested":nested, "python":sys.version.split()[0], "orjson":wpp.orjson is not None}
+
+    #whole dump
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        run_parse_dump = lambda: parser.parse_dump("fr", path_to_dump, os.path.join(tmp_dir, "out.json"), os.path.join(tmp_dir, "errors.tsv"), plan.normalize_title, plan.extract, workers=workers)
+        seconds = best_time(run_parse_dump, repeat)
+    report["parse_dump"] = stage_report(seconds, count_pages(path_to_dump), "pages", os.path.getsize(path_to_dump))
+
+    #pages and their sections in memory
+    pages = read_pages(path_to_dump)
+    pages_size = sum(len(page.encode("utf-8")) for title, page in pages)
+    parsed_pages = []
+    def run_to_dict():
+        parsed_pages.clear()
+        for title, page in pages:
+            try:
+                parsed_pages.append(parser.toDict(page, [title], *parsing_args))
+            except(wpp.InputError):
+                pass
+    report["toDict"] = stage_report(best_time(run_to_dict, repeat), len(pages), "pages", pages_size)
+    #same extraction composed from norm_bracket_expr and extr_all_bracket_expr_by_name, as the command line did before extraction plans
+    composed_title_funct = lambda title, context_titles: parser.norm_bracket_expr(title, context_titles, lambda splitted, context_titles: [splitted[1]], nested=nested)
+    composed_extraction_funct = lambda content, context_titles: parser.extr_all_bracket_expr_by_name(content, context_titles, "pron", norm_function=norm_function, nested=nested)
+    def run_to_dict_composed():
+        for title, page in pages:
+            try:
+                parser.toDict(page, [title], composed_title_funct, composed_extraction_funct, False, "content", "unnamed")
+            except(wpp.InputError):
+                pass
+    report["toDict_composed"] = stage_report(best_time(run_to_dict_composed, repeat), len(pages), "pages", pages_size)
+    report["toDict"]["speedup_of_plan"] = round(report["toDict_composed"]["seconds"] / report["toDict"]["seconds"], 2) if report["toDict"]["seconds"] else None
+
+    #section trees, kept for all pages (memory retained against dicts of toDict), turned into the same dicts, or only read for the content of one section
+    run_to_tree = lambda: [parser.toTree(page, [title]) for title, page in pages]
+    report["toTree"] = stage_report(best_time(run_to_tree, repeat), len(pages), "pages", pages_size)
+    memory = compare_memory(parser, plan, pages)
+    report["toTree"]["retained_kb"] = memory["toTree_kb"]
+    report["toDict"]["retained_kb"] = memory["toDict_kb"]
+    report["toDict"]["retained_kb_whole_contents"] = memory["toDict_whole_contents_kb"]
+    def run_tree_to_dict():
+        for title, page in pages:
+            try:
+                parser.toTree(page, [title]).to_dict(*parsing_args)
+            except(wpp.InputError):
+                pass
+    report["toTree.to_dict"] = stage_report(best_time(run_tree_to_dict, repeat), len(pages), "pages", pages_size)
+    def run_one_section():
+        for title, page in pages:
+            section = parser.toTree(page, [title]).find("S\\|nom")
+            if section:
+                plan.extract(section.content, [title])
+    report["toTree.find"] = stage_report(best_time(run_one_section, repeat), len(pages), "pages", pages_size)
+
+    run_extraction = lambda: [parser.extr_all_bracket_expr_by_name(page, [title], "pron", norm_function=norm_function, nested=nested) for title, page in pages]
+    report["extr_all_bracket_expr_by_name"] = stage_report(best_time(run_extraction, repeat), len(pages), "pages", pages_size)
+
+    expressions = [page[start:end] for title, page in pages for start, end, name, args in parser.scan_bracket_expr(page) if name == "pron"]
+    expressions_size = sum(len(expr.encode("utf-8")) for expr in expressions)
+    run_normalization = lambda: [norm_function(expr, ["bench"]) for expr in expressions]
+    report["norm_bracket_expr"] = stage_report(best_time(run_normalization, repeat), len(expressions), "expressions", expressions_size)
+
+    run_serialization = lambda: [parser.pretty_str(parsed_page) for parsed_page in parsed_pages]
+    serialized_size = sum(len(parser.pretty_str(parsed_page).encode("utf-8")) for parsed_page in parsed_pages)
+    report["pretty_str"] = stage_report(best_time(run_serialization, repeat), len(parsed_pages), "pages", serialized_size)
+    return report
+
+#parses a dump with parse_dump, as a process of check_memory_ceiling
+def _parse_dump_in_process(path_to_dump, workers):
+    parser = wpp.WikiPageParser(targeted_title="pron")
+    plan = wpp.ExtractionPlan(parser, "pron", "1", title_index=1)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        parser.parse_dump("fr", path_to_dump, os.path.join(tmp_dir, "out.jsonl"), os.path.join(tmp_dir, "errors.tsv"), plan.normalize_title, plan.extract, output_format="jsonl", workers=workers)
+
+"""parses a dump with parse_dump in a new process (so that memory of the benchmark itself is not counted), and checks that peak resident memory of its processes stays under a ceiling, whatever the size of the dump
+
+Args:
+path_to_dump (str): path to dump
+ceiling_mb (int): highest peak resident memory allowed, in MB
+workers (int): number of worker processes of parse_dump
+
+Returns:
+dict : peak resident memory (of the largest process), ceiling and time of parsing
+"""
+def check_memory_ceiling(path_to_dump, ceiling_mb, workers=1):
+    start = time.perf_counter()
+    process = multiprocessing.get_context("spawn").Process(target=_parse_dump_in_process, args=(path_to_dump, workers))
+    process.start()
+    process.join()
+    if process.exitcode != 0:
+        raise Exception("Parsing of " + path_to_dump + " failed (exit code " + str(process.exitcode) + ").")
+    report = {"dump":path_to_dump, "dump_mb":round(os.path.getsize(path_to_dump) / 1024 / 1024, 2), "workers":workers, "seconds":round(time.perf_counter() - start, 4), "peak_rss_kb":resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss, "ceiling_kb":ceiling_mb * 1024}
+    if report["peak_rss_kb"] > report["ceiling_kb"]:
+        raise MemoryError("Peak resident memory of parse_dump over " + path_to_dump + " is " + str(report["peak_rss_kb"]) + " KB, above the ceiling of " + str(report["ceiling_kb"]) + " KB.")
+    return report
+
+"""measures memory kept by section trees of toTree for all pages, against dicts of toDict (with values extracted by an extraction plan, or with whole contents of sections, as trees can give them)
+
+Args:
+parser (WikiPageParser): parser
+plan (ExtractionPlan): extraction plan of dicts
+pages (list(tuple(str))): title and text of pages
+
+Returns:
+dict : KB retained by trees and by dicts, and bytes per page of trees
+"""
+def compare_memory(parser, plan, pages):
+    def run_to_dict(content_extraction_funct):
+        parsed_pages = []
+        for title, page in pages:
+            try:
+                parsed_pages.append(parser.toDict(page, [title], plan.normalize_title, content_extraction_funct, False, "content", "unnamed"))
+            except(wpp.InputError):
+                pass
+        return parsed_pages
+    tree_kb = retained_kb(lambda: [parser.toTree(page, [title]) for title, page in pages])
+    return {"pages":len(pages), "toTree_kb":tree_kb, "toTree_bytes_per_page":round(tree_kb * 1024 / len(pages)) if pages else None, "toDict_kb":retained_kb(lambda: run_to_dict(plan.extract)), "toDict_whole_contents_kb":retained_kb(lambda: run_to_dict(lambda content, context_titles: content))}
+
+#number of pages of a dump
+def count_pages(path_to_dump):
+    with open(path_to_dump, "rb") as dump:
+        return sum(1 for page_head in wpp._scan_page_heads(dump))
+
+#(title, text) of all pages of a dump, as given to toDict by parse_dump
+def read_pages(path_to_dump):
+    pages = []
+    title = None
+    for event, elem in wpp.etree.iterparse(path_to_dump, events=("end", )):
+        tname = elem.tag[elem.tag.rfind("}") + 1:]
+        if tname == "title":
+            title = elem.text
+        elif tname == "text":
+            pages.append((title, elem.text or ""))
+        elif tname == "page":
+            elem.clear()
+    return pages
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark of WikiPageParser over a synthetic dump.')
+    parser.add_argument("-p", "--path", help="Path for dump to benchmark on (a synthetic dump is generated there if missing, or in a temporary file if not given).", default=None)
+    parser.add_argument("-n", "--pages", help="Number of pages of generated dump (default 5000)", type=int, default=5000)
+    parser.add_argument("-d", "--depth", help="Deepest level of sections of generated pages, 2 for '== ... ==' only (default 4)", type=int, default=4)
+    parser.add_argument("-t", "--templates", help="Mean number of bracketed expressions per line of generated pages (default 1.0)", type=float, default=1.0)
+    parser.add_argument("-m", "--nesting", help="Number of nested levels of generated bracketed expressions (default 0)", type=int, default=0)
+    parser.add_argument("-s", "--seed", help="Seed of generated dump (default 0)", type=int, default=0)
+    parser.add_argument("-w", "--workers", help="Number of worker processes of parse_dump (default 1)", type=int, default=1)
+    parser.add_argument("-r", "--repeat", help="Number of runs of each stage, best one is reported (default 3)", type=int, default=3)
+    parser.add_argument("-x", "--nested", help="Include param to find bracketed expressions respecting their nesting.", action='store_true', default=False)
+    parser.add_argument("-k", "--memory", help="Include param to only compare memory kept by section trees of toTree against dicts of toDict, without timing stages.", action='store_true', default=False)
+    parser.add_argument("-c", "--ceiling", help="Only parse the dump with parse_dump in a new process, failing if its peak resident memory exceeds this ceiling in MB (i.e. 64, on a dump of 300000 pages).", type=int, default=None)
+    parser.add_argument("-o", "--out", help="Path for json report (printed on terminal by default).", default=None)
+
+    args = parser.parse_args()
+
+    #generate dump
+    tmp_dump = None
+    path_to_dump = args.path
+    generation = None
+    if path_to_dump is None:
+        tmp_dump = tempfile.NamedTemporaryFile(suffix=".xml", delete=False)
+        tmp_dump.close()
+        path_to_dump = tmp_dump.name
+    if tmp_dump or not os.path.exists(path_to_dump):
+        start = time.perf_counter()
+        generate_dump(path_to_dump, args.pages, args.depth, args.templates, args.nesting, seed=args.seed)
+        generation = {"seconds":round(time.perf_counter() - start, 4), "pages":args.pages, "depth":args.depth, "templates":args.templates, "nesting":args.nesting, "seed":args.seed}
+
+    try:
+        if args.ceiling:
+            report = {"memory_ceiling":check_memory_ceiling(path_to_dump, args.ceiling, args.workers)}
+        elif args.memory:
+            bench_parser = wpp.WikiPageParser(targeted_title="pron")
+            report = {"dump":path_to_dump, "memory":compare_memory(bench_parser, wpp.ExtractionPlan(bench_parser, "pron", "1", title_index=1, nested=args.nested), read_pages(path_to_dump))}
+        else:
+            report = run_benchmark(path_to_dump, args.workers, args.repeat, args.nested)
+        report["generation"] = generation
+    finally:
+        if tmp_dump:
+            os.remove(path_to_dump)
+
+    report_str = json.dumps(report, ensure_ascii=False, indent=4)
+    if args.out:
+        with open(args.out, "w") as out:
+            out.write(report_str + "\n")
+    else:
+        print(report_str)
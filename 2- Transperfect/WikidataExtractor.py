@@ -0,0 +1,246 @@
+import argparse
+import collections
+import json
+import multiprocessing
+import re
+import sys
+
+import WikiPageParser as wpp
+
+#faster json parser and serializer, if installed
+try:
+    import orjson
+except(ImportError):
+    orjson = None
+
+#fields of entities which can be written besides their id and type
+FIELDS = ["labels", "descriptions", "aliases", "claims", "sitelinks"]
+
+#sites of sitelinks, as a language and a project (i.e. "frwiktionary", "zh_yuewiki")
+_SITE = re.compile("^(.+?)(wiki|wiktionary|wikisource|wikiquote|wikibooks|wikinews|wikiversity|wikivoyage)$")
+
+
+#state of a worker process of extract_entities : the filter of entities (inherited through fork)
+_worker_entity_filter = None
+
+#initializer of extract_entities' worker processes
+def _init_extract_worker(entity_filter):
+    global _worker_entity_filter
+    _worker_entity_filter = entity_filter
+
+#task of extract_entities' worker processes : extracts a batch of lines of the dump
+def _extract_in_worker(lines):
+    return _worker_entity_filter.extract_lines(lines)
+
+
+"""simple value of a snak (main value of a claim)
+
+Args:
+snak (dict): snak as written in wikidata's json dumps
+
+Returns:
+object : id of an entity ("Q5"), string, time ("+1952-03-11T00:00:00Z"), amount of a quantity ("+42", or {"amount", "unit"} with the id of its unit), {"text", "language"} of a monolingual text, {"latitude", "longitude"} of coordinates (None for an unknown or no value)
+"""
+def _snak_value(snak):
+    datavalue = snak.get("datavalue")
+    if datavalue == None:
+        return None
+    value = datavalue["value"]
+    value_type = datavalue["type"]
+    if value_type == "wikibase-entityid":
+        return value.get("id") or ("Q" + str(value["numeric-id"]))
+    if value_type == "time":
+        return value["time"]
+    if value_type == "quantity":
+        if value.get("unit", "1") == "1":
+            return value["amount"]
+        return {"amount": value["amount"], "unit": value["unit"].split("/")[-1]}
+    if value_type == "globecoordinate":
+        return {"latitude": value["latitude"], "longitude": value["longitude"]}
+    return value
+
+
+#Filter and projection of wikidata entities : which entities are kept (by type, properties of their claims and languages of their labels) and which of their fields are written, in a compact form (labels as strings, claims as their simple values, sitelinks as titles)
+class EntityFilter:
+
+    """constructor
+
+    Args:
+    types (list(str)): types of entities to keep (i.e. "item", "property", "lexeme"), all types if None
+    properties (list(str)): ids of properties (i.e. "P31") : entities having no claim of any of them are left out, and only their claims are written (all entities and claims if None)
+    languages (list(str)): languages (i.e. "fr") : entities having no label in any of them are left out, and only labels, descriptions and aliases in those languages and sitelinks to wikis of those languages (i.e. "frwiki", "frwiktionary") are written (all if None)
+    fields (list(str)): fields written besides id and type, amongst "labels", "descriptions", "aliases", "claims" and "sitelinks" (default labels, claims and sitelinks)
+    """
+    def __init__(self, types=None, properties=None, languages=None, fields=("labels", "claims", "sitelinks")):
+        unknown_fields = [field for field in fields if not field in FIELDS]
+        if unknown_fields:
+            raise ValueError("fields should be amongst " + ", ".join(FIELDS) + " (not " + ", ".join(unknown_fields) + ").")
+        self.types = set(types) if types else None
+        self.properties = set(properties) if properties else None
+        self.languages = set(languages) if languages else None
+        #languages of sitelinks are written with underscores
+        self.site_languages = set(language.replace("-", "_") for language in languages) if languages else None
+        self.fields = list(fields)
+
+    """filters and projects an entity
+
+    Args:
+    entity (dict): entity as written in wikidata's json dumps
+
+    Returns:
+    dict : compact entity ({"id", "type"} and requested fields), None if entity is left out
+    """
+    def project(self, entity):
+        if self.types and not entity.get("type") in self.types:
+            return None
+        claims = entity.get("claims") or {}
+        if self.properties and not any(prop in self.properties for prop in claims):
+            return None
+        #lemmas of lexemes are their labels
+        labels = entity.get("labels") or entity.get("lemmas") or {}
+        if self.languages and not any(language in self.languages for language in labels):
+            return None
+
+        projected = {"id": entity["id"], "type": entity.get("type")}
+        for field in self.fields:
+            if field == "labels":
+                projected["labels"] = {language: label["value"] for language, label in labels.items() if self._is_kept_language(language)}
+            elif field == "descriptions":
+                projected["descriptions"] = {language: description["value"] for language, description in (entity.get("descriptions") or {}).items() if self._is_kept_language(language)}
+            elif field == "aliases":
+                projected["aliases"] = {language: [alias["value"] for alias in aliases] for language, aliases in (entity.get("aliases") or {}).items() if self._is_kept_language(language)}
+            elif field == "claims":
+                projected["claims"] = {prop: self._claim_values(statements) for prop, statements in claims.items() if not self.properties or prop in self.properties}
+            elif field == "sitelinks":
+                projected["sitelinks"] = {site: sitelink["title"] for site, sitelink in (entity.get("sitelinks") or {}).items() if self._is_kept_site(site)}
+        return projected
+
+    def _is_kept_language(self, language):
+        return not self.languages or language in self.languages
+
+    def _is_kept_site(self, site):
+        if not self.site_languages:
+            return True
+        matcher_site = _SITE.search(site)
+        return matcher_site != None and matcher_site.group(1) in self.site_languages
+
+    #simple values of the statements of a property having the best rank (preferred ones if any, normal ones otherwise, never deprecated ones), unknown and no values being left out
+    def _claim_values(self, statements):
+        best_rank = "preferred" if any(statement.get("rank") == "preferred" for statement in statements) else "normal"
+        values = []
+        for statement in statements:
+            if statement.get("rank", "normal") == best_rank:
+                value = _snak_value(statement["mainsnak"])
+                if value != None:
+                    values.append(value)
+        return values
+
+    """extracts entities of a batch of lines of a dump (one entity per line, inside a json array)
+
+    Args:
+    lines (bytes): whole lines of the dump
+
+    Returns:
+    tuple(bytes, int, int) : json lines of kept entities, number of entities read and number of entities kept
+    """
+    def extract_lines(self, lines):
+        loads = orjson.loads if orjson else json.loads
+        output = []
+        read = 0
+        for line in lines.split(b"\n"):
+            line = line.strip()
+            if line.endswith(b","):
+                line = line[:-1]
+            #opening and closing brackets of the array
+            if line in [b"", b"[", b"]"]:
+                continue
+            read += 1
+            projected = self.project(loads(line))
+            if projected != None:
+                output.append(orjson.dumps(projected) if orjson else json.dumps(projected, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        return b"".join(line + b"\n" for line in output), read, len(output)
+
+
+"""extracts entities of a wikidata json dump (i.e. latest-all.json.bz2) into json lines, one compact entity per line (see EntityFilter), without decompressing the dump to disk : the dump is streamed (from disk, an url or standard input) and split into batches of lines parsed by a pool of processes, a bounded number of batches being in memory at once
+
+Args:
+path_to_dump (str): path to dump (.json or .json.bz2), http(s) url of dump, or "-" for standard input
+path_to_output (str): path of json lines of entities, or "-" for standard output
+entity_filter (EntityFilter): filter and projection of entities (default None : every entity, with its labels, claims and sitelinks)
+workers (int): number of processes parsing entities
+batch_size (int): size in bytes of batches of lines sent at once to a process
+path_to_tee (str): path of the file in which a streamed dump is copied as it is read (None for no copy)
+decompression_workers (int): number of processes decompressing multistream bz2 dumps, besides the ones parsing entities (default 1 : the dump is decompressed as it is read)
+
+Returns:
+dict : number of entities read and written
+"""
+def extract_entities(path_to_dump, path_to_output, entity_filter=None, workers=1, batch_size=4*1024*1024, path_to_tee=None, decompression_workers=1):
+    entity_filter = entity_filter or EntityFilter()
+    counts = {"entities": 0, "written": 0}
+
+    def write(result):
+        lines, read, written = result
+        output.write(lines)
+        counts["entities"] += read
+        counts["written"] += written
+
+    #pool of workers parsing batches (forked so that the filter needs not be picklable)
+    pool = None
+    if workers > 1:
+        pool = multiprocessing.get_context("fork").Pool(workers, initializer=_init_extract_worker, initargs=(entity_filter,))
+    output = sys.stdout.buffer if path_to_output == "-" else open(path_to_output, "wb")
+    raw_dump, dump = wpp.open_dump(path_to_dump, decompression_workers, path_to_tee)
+    try:
+        with raw_dump:
+            pending_batches = collections.deque()
+            buffer = bytearray()
+            eof = False
+            while not eof:
+                data = dump.read(batch_size)
+                eof = not data
+                buffer += data
+                if len(buffer) < batch_size and not eof:
+                    continue
+                #batches end with a whole line (the rest of the buffer begins the next one)
+                cut = len(buffer) if eof else buffer.rfind(b"\n") + 1
+                if cut > 0:
+                    if pool:
+                        pending_batches.append(pool.apply_async(_extract_in_worker, (bytes(buffer[:cut]),)))
+                    else:
+                        write(entity_filter.extract_lines(bytes(buffer[:cut])))
+                    del buffer[:cut]
+                while pending_batches and (eof or len(pending_batches) > 2 * workers):
+                    write(pending_batches.popleft().get())
+    finally:
+        if pool:
+            pool.terminate()
+        if dump is not raw_dump:
+            dump.close()
+        if output is sys.stdout.buffer:
+            output.flush()
+        else:
+            output.close()
+    return counts
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Extraction of compact entities from a wikidata json dump.')
+    parser.add_argument("-p", "--path", help="Path for wikidata json dump (.json or .json.bz2, i.e. latest-all.json.bz2), or http(s) url of dump, or '-' to read it from standard input, streamed without intermediate file.", default=None)
+    parser.add_argument("-o", "--out", help="Path for json lines of entities, or '-' for standard output.", default="-")
+    parser.add_argument("-t", "--types", help="Types of entities to keep, separated by commas (i.e. 'item', 'property', 'lexeme'). All types by default.", default=None)
+    parser.add_argument("-q", "--properties", help="Ids of properties, separated by commas (i.e. 'P31,P279') : only entities having claims of one of them are kept, with those claims only. All by default.", default=None)
+    parser.add_argument("-l", "--languages", help="Languages, separated by commas (i.e. 'fr,en') : only entities having a label in one of them are kept, with labels, descriptions, aliases and sitelinks in those languages only. All by default.", default=None)
+    parser.add_argument("-f", "--fields", help="Fields written besides id and type, separated by commas, amongst " + ", ".join(FIELDS) + " (default 'labels,claims,sitelinks')", default="labels,claims,sitelinks")
+    parser.add_argument("-w", "--workers", help="Number of worker processes parsing entities (default 1)", type=int, default=1)
+    parser.add_argument("-x", "--decompression_workers", help="Number of processes decompressing a multistream bz2 dump, besides the ones of -w (default 1 : decompressed as it is read)", type=int, default=1)
+    parser.add_argument("-b", "--batch", help="Size in MB of batches of lines sent at once to a worker (default 4)", type=int, default=4)
+    parser.add_argument("--tee", help="Path for copy of a dump streamed from an url or standard input, written as it is read (no copy by default).", default=None)
+    args = parser.parse_args()
+
+    if not args.path:
+        raise ValueError("Please specify a path (or url) of wikidata dump to command line arguments (-p).")
+    split = lambda arg: arg.split(",") if arg else None
+    entity_filter = EntityFilter(split(args.types), split(args.properties), split(args.languages), split(args.fields) or [])
+    counts = extract_entities(args.path, args.out, entity_filter, args.workers, args.batch*1024*1024, args.tee, args.decompression_workers)
+    print(json.dumps(counts), file=sys.stderr)
@@ -0,0 +1,17 @@
+import os
+
+import WikiPageParserBenchmark as bench
+
+#ceiling of resident memory of parse_dump, in MB
+CEILING_MB = 48
+#number of pages of the synthetic dump, whose size (about 60 MB) is above the ceiling, so that a dump held in memory would exceed it
+PAGES = 40000
+
+#parse_dump streams the dump : its peak resident memory stays under a fixed ceiling whatever the size of the dump
+def test_parse_dump_under_memory_ceiling(tmp_path):
+    path_to_dump = str(tmp_path / "dump.xml")
+    bench.generate_dump(path_to_dump, PAGES)
+    assert os.path.getsize(path_to_dump) > CEILING_MB * 1024 * 1024
+
+    report = bench.check_memory_ceiling(path_to_dump, CEILING_MB)
+    assert report["peak_rss_kb"] <= CEILING_MB * 1024